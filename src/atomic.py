@@ -0,0 +1,121 @@
+import contextlib
+import hashlib
+import io
+import os
+import shutil
+import tempfile
+from typing import IO, Iterator
+
+
+# mkstemp and mkdtemp create private files, published output gets the usual permissions;
+# the umask they derive from is looked up on first use, not at import
+_umask:int|None = None
+
+
+def _read_proc_umask() -> int|None:
+    try:
+        with open("/proc/self/status", 'r', encoding='ascii') as f:
+            for line in f:
+                if line.startswith("Umask:"):
+                    return int(line.split()[1], 8)
+    except (OSError, ValueError):
+        pass
+    return None
+
+
+def current_umask() -> int:
+    """The process umask, read from /proc/self/status where the kernel reports it.
+
+    Elsewhere it is found by setting the umask and putting it back, which briefly
+    changes it for every thread, so that is only a fallback."""
+    global _umask
+    if _umask is None:
+        umask = _read_proc_umask()
+        if umask is None:
+            umask = os.umask(0)
+            os.umask(umask)
+        _umask = umask
+    return _umask
+
+
+def file_mode() -> int:
+    return 0o666 & ~current_umask()
+
+
+def dir_mode() -> int:
+    return 0o777 & ~current_umask()
+
+
+class _DigestWriter(io.RawIOBase):
+    """A raw file that also feeds the bytes written through it to a hash"""
+    def __init__(self, raw:io.FileIO, digest:'hashlib._Hash') -> None:
+        self._raw = raw
+        self._digest = digest
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        written = self._raw.write(data)
+        self._digest.update(memoryview(data)[:written])
+        return written
+
+    def close(self) -> None:
+        self._raw.close()
+        super().close()
+
+
+@contextlib.contextmanager
+def atomic_open(path:str, mode:str='w', encoding:str='utf-8', digest:'hashlib._Hash|None'=None) -> Iterator[IO]:
+    """Open a temporary file next to path for writing, which replaces path when the block exits cleanly.
+
+    Readers of path see either the old file or the complete new one, never a partial write.
+    If the block raises, the temporary file is removed and path is left as it was.
+    When digest is given, the bytes written to the file are also fed to it."""
+    fd, tmp_path = tempfile.mkstemp(prefix=f".{os.path.basename(path)}.", suffix=".tmp", dir=os.path.dirname(path) or ".")
+    try:
+        if digest is None:
+            f = os.fdopen(fd, mode, encoding=None if 'b' in mode else encoding)
+        else:
+            f = io.BufferedWriter(_DigestWriter(io.FileIO(fd, 'w'), digest))
+            if 'b' not in mode:
+                f = io.TextIOWrapper(f, encoding=encoding)
+        with f:
+            yield f
+        os.chmod(tmp_path, file_mode())
+        os.replace(tmp_path, path)
+    except BaseException:
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(tmp_path)
+        raise
+
+
+def atomic_write(path:str, text:str) -> str:
+    """Write text to path atomically, returning the sha256 hex digest of the bytes written"""
+    digest = hashlib.sha256()
+    with atomic_open(path, digest=digest) as f:
+        f.write(text)
+    return digest.hexdigest()
+
+
+def make_staging_directory(dest_dir:str) -> str:
+    """Create an empty directory next to dest_dir (so on the same filesystem) to build into"""
+    parent_dir = os.path.dirname(os.path.abspath(dest_dir))
+    staging_dir = tempfile.mkdtemp(prefix=f".{os.path.basename(dest_dir)}-build-", dir=parent_dir)
+    os.chmod(staging_dir, dir_mode())
+    return staging_dir
+
+
+def swap_directory(new_dir:str, dest_dir:str) -> None:
+    """Put new_dir in place of dest_dir as a whole and remove the old dest_dir.
+
+    Both are renames within one filesystem: dest_dir is only missing for the instant
+    between them and never holds a mix of old and new files."""
+    old_dir = None
+    if os.path.exists(dest_dir):
+        # an empty directory can be renamed over, this reserves a unique name for the old tree
+        old_dir = tempfile.mkdtemp(prefix=f".{os.path.basename(dest_dir)}-old-", dir=os.path.dirname(os.path.abspath(dest_dir)))
+        os.replace(dest_dir, old_dir)
+    os.replace(new_dir, dest_dir)
+    if old_dir is not None:
+        shutil.rmtree(old_dir)
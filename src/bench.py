@@ -0,0 +1,259 @@
+import os
+import re
+import sys
+import tempfile
+import time
+import timeit
+import tracemalloc
+from typing import Callable
+
+from frontmatter import split_front_matter
+import htmlnode
+from htmlnode import block_to_html, blocks_to_html, markdown_to_html, markdown_to_html_node, TableOfContents
+from build import render_page, write_large_page
+from parsing import BLANK_LINE_PATTERN, CODE_BLOCK_PATTERN, ParseError, block_text, markdown_to_blocks
+from templates import TemplateCache
+
+
+BENCHMARKS:dict[str, Callable[[], None]] = {}
+
+
+def benchmark(func:Callable[[], None]) -> Callable[[], None]:
+    """Register a benchmark under its function name, minus the bench_ prefix"""
+    BENCHMARKS[func.__name__.removeprefix("bench_")] = func
+    return func
+
+
+def load_corpus() -> list[str]:
+    """The markdown bodies under content/, plus a page heavy on characters that need escaping"""
+    content_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "content")
+    corpus = []
+    for root, _, files in os.walk(content_dir):
+        for name in sorted(files):
+            if name.endswith(".md"):
+                with open(os.path.join(root, name), 'r', encoding='utf-8') as f:
+                    corpus.append(split_front_matter(f.read())[1])
+    code_lines = "\n".join(f"if a < b && c > {i}: print(\"<{i}>\")" for i in range(50))
+    corpus.append(f"# Escaping & <friends>\n\n```python\n{code_lines}\n```\n\nFish & chips < pie, [a & b](/q?a=1&b=2)")
+    return corpus
+
+
+def best_time(func:Callable[[], object], number:int, repeat:int=7) -> float:
+    """Best per-call time in seconds over several repeats"""
+    return min(timeit.repeat(func, number=number, repeat=repeat)) / number
+
+
+def _unescaped_leaf_html(node:htmlnode.LeafNode) -> str:
+    value = node.value or ""
+    return f"<{node.tag}{node.props_to_html()}>{value}</{node.tag}>" if node.tag else value
+
+
+def _unescaped_props_html(node:htmlnode.HTMLNode) -> str:
+    return "".join(f' {key}="{value}"' for key, value in node.props.items()) if node.props else ""
+
+
+def without_escaping(func:Callable[[], object], number:int) -> float:
+    """Time func with pass-through escapers swapped in for the real ones, and leaves
+    and attributes rendered without the checks for characters to escape.
+
+    Only meaningful for trees built without interning, a shared leaf keeps the HTML it
+    rendered first, escaped or not."""
+    originals = (htmlnode.escape_html, htmlnode.escape_attr, htmlnode.LeafNode.to_html, htmlnode.HTMLNode.props_to_html)
+    htmlnode.escape_html = htmlnode.escape_attr = lambda text: text
+    htmlnode.LeafNode.to_html = _unescaped_leaf_html
+    htmlnode.HTMLNode.props_to_html = _unescaped_props_html
+    try:
+        return best_time(func, number=number)
+    finally:
+        htmlnode.escape_html, htmlnode.escape_attr, htmlnode.LeafNode.to_html, htmlnode.HTMLNode.props_to_html = originals
+
+
+@benchmark
+def bench_escape() -> None:
+    """How much escaping text and attribute values adds to rendering"""
+    corpus = load_corpus()
+    # shared leaves cache their HTML, which would hide escaping from the second run
+    # and leave unescaped HTML in the process wide table after the first
+    interner = htmlnode.LEAF_NODES
+    htmlnode.LEAF_NODES = None
+    try:
+        trees = [markdown_to_html_node(md) for md in corpus]
+
+        def serialize():
+            for tree in trees:
+                tree.to_html()
+
+        def render():
+            for md in corpus:
+                markdown_to_html(md)
+
+        for label, func, number in [("tree to_html", serialize, 200), ("markdown_to_html", render, 20)]:
+            # alternated, so that a slow patch of the machine doesn't land on one side only
+            unescaped_time = escaped_time = float("inf")
+            for _ in range(5):
+                unescaped_time = min(unescaped_time, without_escaping(func, number))
+                escaped_time = min(escaped_time, best_time(func, number))
+            print(f"{label:<17} without escaping: {unescaped_time * 1e3:.3f} ms, with: {escaped_time * 1e3:.3f} ms ({escaped_time / unescaped_time - 1:+.1%})")
+    finally:
+        htmlnode.LEAF_NODES = interner
+
+
+
+def peak_memory(func:Callable[[], object]) -> tuple[float, int]:
+    """Run func once, returning its run time and the peak bytes it allocated"""
+    tracemalloc.start()
+    start = time.perf_counter()
+    try:
+        func()
+        return time.perf_counter() - start, tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+@benchmark
+def bench_large_page() -> None:
+    """Peak memory of reading a large page whole versus streaming it from a memory map"""
+    corpus = "\n\n".join(load_corpus())
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        template_path = os.path.join(tmp_dir, "template.html")
+        with open(template_path, 'w', encoding='utf-8') as f:
+            f.write("<title>{{ Title }}</title>{{ Content }}")
+        for copies in [100, 400]:
+            md_path = os.path.join(tmp_dir, "large.md")
+            with open(md_path, 'w', encoding='utf-8') as f:
+                f.write("# Large page\n\n")
+                for _ in range(copies):
+                    f.write(corpus + "\n\n")
+            size = os.path.getsize(md_path)
+
+            def stream():
+                with open(os.devnull, 'w', encoding='utf-8') as out:
+                    write_large_page(md_path, template_path, out)
+
+            for label, func in [("read whole", lambda: render_page(md_path, template_path)), ("mmap stream", stream)]:
+                seconds, peak = peak_memory(func)
+                print(f"{size / 2**20:6.1f} MiB source, {label:<11}: {seconds:.2f} s, peak {peak / 2**20:7.1f} MiB allocated")
+
+
+
+@benchmark
+def bench_templates() -> None:
+    """Templating cost of 20k pages spread over 30 layouts that share a base layout and partials"""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        def write(name, text):
+            with open(os.path.join(tmp_dir, name), 'w', encoding='utf-8') as f:
+                f.write(text)
+        write("header.html", "<header><h1>{{ site }}</h1>{% include \"nav.html\" %}</header>")
+        write("nav.html", "<nav><a href=\"/\">Home</a> <a href=\"/blog\">Blog</a></nav>")
+        write("footer.html", "<footer>{{ site }}</footer>")
+        write("base.html", "<!doctype html><html><head><title>{% block title %}{{ Title }}{% endblock %}</title></head>"
+              "<body>{% include \"header.html\" %}{% block content %}{% endblock %}{% include \"footer.html\" %}</body></html>")
+        layouts = [f"layout{index}.html" for index in range(30)]
+        for index, name in enumerate(layouts):
+            write(name, f"{{% extends \"base.html\" %}}{{% block content %}}<main class=\"l{index}\"><time>{{{{ date }}}}</time>{{{{ Content }}}}</main>{{% endblock %}}")
+        paths = [os.path.join(tmp_dir, name) for name in layouts]
+        variables = {"Title": "A page", "site": "Site", "date": "2024-01-01", "Content": "<p>" + "content " * 200 + "</p>"}
+
+        def render_pages():
+            cache = TemplateCache()
+            for page in range(20_000):
+                cache.get(paths[page % len(paths)]).render(variables)
+
+        seconds = best_time(render_pages, number=1, repeat=3)
+        print(f"20000 pages over {len(layouts)} layouts: {seconds * 1e3:.1f} ms, {seconds / 20_000 * 1e6:.2f} us per page")
+
+
+@benchmark
+def bench_lazy_tree() -> None:
+    """Collecting the headings of every page from a full tree versus a lazy one"""
+    corpus = load_corpus() * 20
+
+    def headings(lazy:bool) -> None:
+        for md in corpus:
+            [child.tag for child in markdown_to_html_node(md, lazy=lazy).children if child.tag[0] == "h"]
+
+    full_time = best_time(lambda: headings(False), number=5)
+    lazy_time = best_time(lambda: headings(True), number=5)
+    print(f"{len(corpus)} pages, full tree: {full_time * 1e3:.2f} ms, lazy tree: {lazy_time * 1e3:.2f} ms ({lazy_time / full_time:.0%} of full)")
+
+
+@benchmark
+def bench_interning() -> None:
+    """Memory and to_html time of navigation-heavy page trees with and without shared leaf nodes"""
+    nav = "\n".join(f"- [Section {i}](/section-{i}) `v{i % 3}`" for i in range(30))
+    footer = " | ".join(f"[{name}](/{name.lower()})" for name in ["Home", "Blog", "About", "Contact"])
+    pages = [f"# Page {page}\n\n{nav}\n\nThe body of page {page}, see [Home](/) and **notes**.\n\n{footer}" for page in range(500)]
+    original_interner = htmlnode.LEAF_NODES
+    try:
+        for label, interner in [("plain leaves", None), ("shared leaves", htmlnode.LeafInterner())]:
+            htmlnode.LEAF_NODES = interner
+            trees = []
+            parse_seconds, peak = peak_memory(lambda: trees.extend(markdown_to_html_node(md) for md in pages))
+            serialize_seconds = best_time(lambda: [tree.to_html() for tree in trees], number=3)
+            print(f"{len(pages)} pages, {label:<13}: parse {parse_seconds * 1e3:6.1f} ms, trees {peak / 2**20:5.1f} MiB peak, to_html {serialize_seconds * 1e3:6.1f} ms")
+    finally:
+        htmlnode.LEAF_NODES = original_interner
+
+
+def plain_markdown_to_blocks(md_text:str) -> list[str]:
+    """markdown_to_blocks returning plain strings, without working out any block offsets"""
+    blocks = []
+    for part in CODE_BLOCK_SPLIT_PATTERN.split(md_text):
+        if part.startswith("```") and CODE_BLOCK_PATTERN.fullmatch(part):
+            blocks.append(part)
+        else:
+            blocks.extend(block_text(text) for text in BLANK_LINE_PATTERN.split(part) if text.strip())
+    return blocks
+
+
+# the capturing group keeps the code blocks in the split
+CODE_BLOCK_SPLIT_PATTERN = re.compile(f"({CODE_BLOCK_PATTERN.pattern})", flags=re.DOTALL)
+
+
+@benchmark
+def bench_diagnostics() -> None:
+    """What tracking the failing block costs on pages that render, and what locating an error costs"""
+    sources = load_corpus() * 20
+
+    def untracked() -> None:
+        # split into plain strings with no offsets, and rendered without the handler that attaches the failing block to errors
+        for md in sources:
+            toc = TableOfContents()
+            "".join(block_to_html(block, toc=toc) for block in plain_markdown_to_blocks(md))
+
+    def tracked() -> None:
+        for md in sources:
+            blocks_to_html(markdown_to_blocks(md))
+
+    comparisons = [
+        ("splitting", lambda: [plain_markdown_to_blocks(md) for md in sources], lambda: [markdown_to_blocks(md) for md in sources]),
+        ("splitting and rendering", untracked, tracked),
+    ]
+    print(f"{len(sources)} pages")
+    for label, plain, with_offsets in comparisons:
+        # alternated, so that a slow patch of the machine doesn't land on one side only
+        plain_time = tracked_time = float("inf")
+        for _ in range(5):
+            plain_time = min(plain_time, best_time(plain, number=5))
+            tracked_time = min(tracked_time, best_time(with_offsets, number=5))
+        print(f"{label:<23} untracked: {plain_time * 1e3:.2f} ms, tracked: {tracked_time * 1e3:.2f} ms ({tracked_time / plain_time - 1:+.1%})")
+    source = "\n\n".join(load_corpus()) + "\n\nan _unmatched\ndelimiter at the end"
+    try:
+        markdown_to_html(source)
+    except ParseError as e:
+        error = e
+    locate_time = best_time(lambda: error.locate(source, "page.md"), number=100)
+    print(f"locating {error.locate(source, 'page.md')} in {len(source)} chars: {locate_time * 1e6:.1f} us")
+
+
+def main(names:list[str]) -> None:
+    for name in names or list(BENCHMARKS):
+        if name not in BENCHMARKS:
+            print(f"Unknown benchmark {name}, choose from: {', '.join(BENCHMARKS)}")
+            sys.exit(1)
+        print(f"== {name}: {BENCHMARKS[name].__doc__}")
+        BENCHMARKS[name]()
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,640 @@
+import contextlib
+import hashlib
+import itertools
+import mmap
+import os
+import shutil
+import time
+from typing import IO, Callable, Iterable, Iterator
+
+from atomic import atomic_open, atomic_write, make_staging_directory, swap_directory
+from cache import PAGE_CACHE, RenderCache, source_key
+from config import BUILD_STAGES
+from deps import DEPS_NAME, GROUP_PREFIX, DependencyGraph, local_asset_path
+from feeds import write_atom_feed, write_sitemaps
+from frontmatter import MetaValue, read_front_matter, skip_front_matter, split_front_matter, split_front_matter_buffer
+import htmlnode
+from htmlnode import LeafInterner, TableOfContents, blocks_to_html, blocks_to_html_node, collect_headings, escape_html, iter_blocks_html
+from listing import ListingPage, PageRecord, generate_listing_pages
+from manifest import DELTA_NAME, MANIFEST_NAME, Manifest, ManifestDelta, copy_hashed, copy_verified, deploy, read_manifest, write_delta, write_manifest
+from parsing import CODE_FENCE, ParseError, buffer_text_offset, extract_markdown_images, extract_title_from_blocks, find_title_line, iter_buffer_blocks, markdown_to_blocks
+from pipeline import DEFAULT_IO_WORKERS, run_pipeline
+from shards import SHARD_NAME, SHARD_OUTPUT_DIR, ShardBuild, find_shard_builds, shard_directory, shard_of
+from stats import ParseStats, SiteStats
+from templates import TEMPLATES, CompiledTemplate, preload_templates
+
+# absolute urls in the sitemap and feed are built from this, main.sh serves the site here
+SITE_URL = "http://localhost:8888"
+SITE_TITLE = "Tolkien Fan Club"
+# sources at least this big are memory mapped and streamed block by block, smaller ones are read whole
+MMAP_MIN_SIZE = 4 * 1024 * 1024
+
+
+def set_cache_limits(render_cache_bytes:int|None=None, intern_entries:int|None=None, mmap_min_size:int|None=None) -> None:
+    """Size this process's caches: the rendered page cache in bytes, the table of shared
+    leaf nodes (0 stops sharing them) and the source size from which pages are streamed
+    from a memory map. A limit given as None is left as it is."""
+    global MMAP_MIN_SIZE
+    if render_cache_bytes is not None:
+        PAGE_CACHE.resize(render_cache_bytes)
+    if intern_entries is not None:
+        htmlnode.LEAF_NODES = LeafInterner(intern_entries) if intern_entries else None
+    if mmap_min_size is not None:
+        MMAP_MIN_SIZE = mmap_min_size
+
+
+def cache_limits() -> tuple[int, int, int]:
+    """The current limits, in set_cache_limits order"""
+    return PAGE_CACHE.max_bytes, htmlnode.LEAF_NODES.max_entries if htmlnode.LEAF_NODES is not None else 0, MMAP_MIN_SIZE
+
+
+def _start_worker(templates:list[CompiledTemplate], limits:tuple[int, int, int]) -> None:
+    """Process pool initializer: start a worker with the parent's compiled templates and cache limits"""
+    preload_templates(templates)
+    set_cache_limits(*limits)
+
+
+def resolve_template_path(metadata:dict[str, MetaValue], template_path:str) -> str:
+    """Pick the template for a page: its front matter `template` field, relative to the default template's directory"""
+    page_template = metadata.get("template")
+    if not page_template:
+        return template_path
+    return os.path.join(os.path.dirname(template_path), str(page_template))
+
+
+def escape_template_value(value:MetaValue) -> MetaValue:
+    """HTML escape a plain text template variable (strings and each item of lists)"""
+    if isinstance(value, list):
+        return [escape_html(item) for item in value]
+    if isinstance(value, str):
+        return escape_html(value)
+    return value
+
+
+def page_variables(metadata:dict[str, MetaValue], title_text:str) -> dict[str, MetaValue]:
+    """The escaped template variables of a page, all but its Content"""
+    # front matter fields are available to the template under their own names
+    variables = {key: value for key, value in metadata.items() if key != "template"}
+    variables["Title"] = title_text
+    # everything but the rendered content is plain text
+    return {key: escape_template_value(value) for key, value in variables.items()}
+
+
+def render_page(from_path:str, template_path:str, cache:RenderCache|None=None, stats:ParseStats|None=None) -> str:
+    """Render a markdown file into the template and return the output html.
+
+    When a cache is given, the output is cached under the source file's path, mtime and
+    size plus the content hash of the template and its layouts and partials, so unchanged
+    pages skip the whole pipeline.
+    When stats are given, the page is counted into them and rendered through the node
+    tree, which the counts describe, instead of the cache and the direct renderer."""
+    if stats is not None:
+        cache = None
+    key = None
+    if cache is not None:
+        # only the header is read here, the page may pick its own template
+        page_template = TEMPLATES.get(resolve_template_path(read_front_matter(from_path), template_path))
+        key = source_key(from_path) + (page_template.digest,)
+        cached_html = cache.get(key)
+        if cached_html is not None:
+            return cached_html
+
+    # read the source file
+    with open(from_path, 'r', encoding='utf-8') as f:
+        source = f.read()
+    metadata, content_md = split_front_matter(source)
+    try:
+        output_html = render_document(metadata, markdown_to_blocks(content_md), template_path, stats)
+    except ParseError as e:
+        # block offsets count from the start of the body
+        raise e.locate(source, from_path, len(source) - len(content_md)) from e
+
+    if cache is not None:
+        cache.put(key, output_html)
+    return output_html
+
+
+def render_document(metadata:dict[str, MetaValue], blocks:list[str], template_path:str, stats:ParseStats|None=None) -> str:
+    """Render a page's front matter and markdown blocks into its template and return the output html.
+
+    When stats are given, the page is counted into them and rendered through the node tree."""
+    start = time.perf_counter()
+    # compiled once per template, not per page
+    page_template = TEMPLATES.get(resolve_template_path(metadata, template_path))
+
+    # the document is split once and the blocks reused for both the title and the content
+    title_text = metadata.get("title") or extract_title_from_blocks(blocks)
+    # the headings are collected into the table of contents as they are rendered
+    toc = TableOfContents()
+    if stats is None:
+        content_html = blocks_to_html(blocks, toc=toc)
+    else:
+        content_html = blocks_to_html_node(blocks, stats=stats, toc=toc).to_html()
+
+    variables = page_variables(metadata, title_text)
+    # placeholders inside the rendered markdown are left alone, templates fill in one pass
+    variables["Content"] = content_html
+    variables["TOC"] = toc.to_html()
+    output_html = page_template.render(variables)
+
+    if stats is not None:
+        stats.pages += 1
+        stats.count_output(output_html)
+        stats.render_seconds += time.perf_counter() - start
+    return output_html
+
+
+def is_large_source(size:int) -> bool:
+    """Whether a source of size bytes is memory mapped and streamed rather than read whole"""
+    # an empty file cannot be memory mapped, whatever MMAP_MIN_SIZE is set to
+    return size > 0 and size >= MMAP_MIN_SIZE
+
+
+@contextlib.contextmanager
+def source_buffer(path:str) -> Iterator[bytes|mmap.mmap]:
+    """The raw bytes of a source file, memory mapped when it is at least MMAP_MIN_SIZE"""
+    with open(path, 'rb') as f:
+        if not is_large_source(os.fstat(f.fileno()).st_size):
+            yield f.read()
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+            yield buffer
+
+
+def write_large_page(from_path:str, template_path:str, stream:IO[str]) -> None:
+    """Render a large markdown file into the template, writing the output html to stream.
+
+    The file is memory mapped and split into blocks over the mapped bytes. Each block is
+    decoded and rendered on its own, so neither the source nor the output is held whole.
+    The output is the same as render_page's."""
+    with open(from_path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+        metadata, body_start = split_front_matter_buffer(buffer)
+        page_template = TEMPLATES.get(resolve_template_path(metadata, template_path))
+        # only the blocks up to the title are decoded for it
+        title_text = metadata.get("title") or extract_title_from_blocks(iter_buffer_blocks(buffer, body_start))
+        variables = page_variables(metadata, title_text)
+        variables["Content"] = lambda: iter_blocks_html(iter_buffer_blocks(buffer, body_start))
+        # the content is streamed after anything above it in the template, so a table of
+        # contents needs its own scan over the headings, done only when the template uses one
+        if "TOC" in page_template.segments[1::2]:
+            variables["TOC"] = collect_headings(iter_buffer_blocks(buffer, body_start)).to_html()
+        try:
+            for html in page_template.iter_render(variables):
+                stream.write(html)
+        except ParseError as e:
+            # the whole source is only read to place an error, the blocks' offsets are in bytes of the file
+            if e.offset is not None:
+                e.offset = buffer_text_offset(buffer, e.offset)
+            with open(from_path, 'r', encoding='utf-8') as source_file:
+                raise e.locate(source_file.read(), from_path) from e
+
+
+def generate_page(from_path:str, template_path:str, dest_path:str, cache:RenderCache|None=PAGE_CACHE, stats:ParseStats|None=None) -> str:
+    """Render a page to dest_path, returning the sha256 hex digest of the output"""
+    print (f"Generating page from {from_path}  to {dest_path} using {template_path}")
+    # stats are counted over the node tree, so they always take the in memory path
+    if stats is None and is_large_source(os.path.getsize(from_path)):
+        digest = hashlib.sha256()
+        with atomic_open(dest_path, digest=digest) as f:
+            write_large_page(from_path, template_path, f)
+        return digest.hexdigest()
+    output_html = render_page(from_path, template_path, cache, stats)
+
+    # write output_html to dest_path, readers never see a partly written page
+    return atomic_write(dest_path, output_html)
+
+
+def find_files(directory:str, extension:str="") -> list[str]:
+    """Return the paths of all files under directory ending with extension, relative to it and sorted"""
+    paths = []
+    for root, dirs, files in os.walk(directory):
+        dirs.sort()
+        for name in sorted(files):
+            if name.endswith(extension):
+                paths.append(os.path.relpath(os.path.join(root, name), directory))
+    return paths
+
+
+def copy_static_files(static_dir:str, dest_dir:str, graph:DependencyGraph|None=None, manifest:Manifest|None=None) -> None:
+    """Copy the files under static_dir into dest_dir, adding each copy's digest to manifest
+    and its source to graph"""
+    if not os.path.isdir(static_dir):
+        raise ValueError(f"Static directory {static_dir} does not exist")
+    for rel_path in find_files(static_dir):
+        source_path = os.path.join(static_dir, rel_path)
+        target_path = os.path.join(dest_dir, rel_path)
+        os.makedirs(os.path.dirname(target_path), exist_ok=True)
+        digest = copy_hashed(source_path, target_path)
+        key = rel_path.replace(os.sep, "/")
+        if manifest is not None:
+            manifest[key] = digest
+        if graph is not None:
+            graph.add_output(key, [source_path])
+
+
+def find_content_pages(content_dir:str) -> list[str]:
+    """Return the paths of all markdown files under content_dir, relative to it and sorted"""
+    return find_files(content_dir, ".md")
+
+
+def content_url(rel_path:str) -> str:
+    """Map a content path to the url it is served at: blog/tom/index.md -> /blog/tom"""
+    path, _ = os.path.splitext(rel_path.replace(os.sep, "/"))
+    if path == "index":
+        return "/"
+    if path.endswith("/index"):
+        path = path[:-len("/index")]
+    else:
+        path += ".html"
+    return "/" + path
+
+
+def output_path(dest_dir:str, url:str) -> str:
+    """Map a page url to the html file it is written to under dest_dir"""
+    if url.endswith(".html"):
+        return os.path.join(dest_dir, *url.strip("/").split("/"))
+    return os.path.join(dest_dir, *[part for part in url.split("/") if part], "index.html")
+
+
+def page_record(from_path:str, url:str, metadata:dict[str, MetaValue]|None=None, body:str|None=None) -> PageRecord:
+    """Build the listing record for a page from its front matter.
+
+    Falls back to the first level 1 heading of the body for the title, which only reads
+    up to that heading, or looks for it in body when the file was already read."""
+    if metadata is None:
+        metadata = read_front_matter(from_path)
+    title = metadata.get("title")
+    if not title and body is not None:
+        title = find_title_line(body.split("\n")) or ""
+    elif not title:
+        # a heading-like line in the front matter is not the page's title
+        with open(from_path, 'r', encoding='utf-8') as f:
+            title = find_title_line(skip_front_matter(line.rstrip("\n") for line in f)) or ""
+    return PageRecord.from_metadata(url, str(title), metadata, source=from_path)
+
+
+def build_page(from_path:str, template_path:str, dest_path:str, url:str, stats:ParseStats|None=None) -> tuple[PageRecord, str]|None:
+    """Render one content page, returning its record and the digest of its output, or None
+    for drafts that are not published"""
+    metadata = read_front_matter(from_path)
+    if metadata.get("draft") is True:
+        return None
+    os.makedirs(os.path.dirname(dest_path), exist_ok=True)
+    digest = generate_page(from_path, template_path, dest_path, stats=stats)
+    return page_record(from_path, url, metadata), digest
+
+
+def page_dependencies(from_path:str, template_path:str, url:str, static_dir:str) -> list[str]:
+    """The inputs a page's output depends on: its markdown, its template and the static images it shows"""
+    with source_buffer(from_path) as buffer:
+        metadata, body_start = split_front_matter_buffer(buffer)
+        # the template's layouts and partials are inputs too
+        inputs = [from_path, *TEMPLATES.get(resolve_template_path(metadata, template_path)).files]
+        inputs.extend(image_dependencies(iter_buffer_blocks(buffer, body_start), url, static_dir))
+    return inputs
+
+
+def image_dependencies(blocks:Iterable[str], url:str, static_dir:str) -> list[str]:
+    """The static files shown as images by the blocks of the page at url"""
+    inputs = []
+    for block in blocks:
+        if block.startswith(CODE_FENCE):
+            continue
+        for _, _, src in extract_markdown_images(block):
+            asset_path = local_asset_path(static_dir, url, src)
+            if asset_path is not None:
+                inputs.append(asset_path)
+    return inputs
+
+
+def _build_page_task(args:tuple[str, str, str, str, bool, str|None]) -> tuple[PageRecord|None, str|None, ParseStats|None, list[str]|None]:
+    # the output digest, stats and dependencies are collected in the worker and sent back along with the record
+    from_path, template_path, dest_path, url, collect_stats, deps_static_dir = args
+    stats = ParseStats() if collect_stats else None
+    built = build_page(from_path, template_path, dest_path, url, stats=stats)
+    if built is None:
+        return None, None, stats, None
+    record, digest = built
+    inputs = page_dependencies(from_path, template_path, url, deps_static_dir) if deps_static_dir is not None else None
+    return record, digest, stats, inputs
+
+
+# a page build split into pipeline stages: read the source, render it, write the output
+
+def _read_page_task(args:tuple[str, str, str, str, bool, str|None]) -> tuple[bytes, tuple[str, int, int]]|None:
+    from_path, _, _, _, collect_stats, _ = args
+    # large sources are not read whole, the render stage streams them from a memory map
+    if not collect_stats and is_large_source(os.path.getsize(from_path)):
+        return None
+    key = source_key(from_path)
+    # decoded by the render stage, where a page that is not utf-8 fails on its own
+    with open(from_path, 'rb') as f:
+        return f.read(), key
+
+
+def _render_page_task(args:tuple[str, str, str, str, bool, str|None], loaded:tuple[bytes, tuple[str, int, int]]|None) -> tuple[PageRecord|None, str|None, str|None, ParseStats|None, list[str]|None, ParseError|None]:
+    # a page that fails is reported along with every other failing page, instead of stopping the build
+    try:
+        if loaded is None:
+            # streamed straight to its output, only the digest of what was written comes back
+            record, digest, stats, inputs = _build_page_task(args)
+            return record, None, digest, stats, inputs, None
+        record, output_html, stats, inputs = _render_page_source(args, *loaded)
+        return record, output_html, None, stats, inputs, None
+    except ValueError as e:
+        error = e if isinstance(e, ParseError) and e.path is not None else ParseError(str(e), path=args[0])
+        return None, None, None, None, None, error
+
+
+def _render_page_source(args:tuple[str, str, str, str, bool, str|None], data:bytes, key:tuple[str, int, int]) -> tuple[PageRecord|None, str|None, ParseStats|None, list[str]|None]:
+    from_path, template_path, _, url, collect_stats, deps_static_dir = args
+    # the same text as a text mode open() reads
+    source = data.decode('utf-8').replace("\r\n", "\n").replace("\r", "\n")
+    metadata, content_md = split_front_matter(source)
+    if metadata.get("draft") is True:
+        return None, None, None, None
+    page_template = TEMPLATES.get(resolve_template_path(metadata, template_path))
+    blocks = markdown_to_blocks(content_md)
+    stats = ParseStats() if collect_stats else None
+    # the same cache entries as render_page, stats are counted over a fresh render
+    key += (page_template.digest,)
+    output_html = PAGE_CACHE.get(key) if stats is None else None
+    if output_html is None:
+        try:
+            output_html = render_document(metadata, blocks, template_path, stats)
+        except ParseError as e:
+            raise e.locate(source, from_path, len(source) - len(content_md)) from e
+        if stats is None:
+            PAGE_CACHE.put(key, output_html)
+    inputs = None
+    if deps_static_dir is not None:
+        inputs = [from_path, *page_template.files, *image_dependencies(blocks, url, deps_static_dir)]
+    return page_record(from_path, url, metadata, content_md), output_html, stats, inputs
+
+
+def _write_page_task(args:tuple[str, str, str, str, bool, str|None], rendered:tuple[PageRecord|None, str|None, str|None, ParseStats|None, list[str]|None, ParseError|None]) -> tuple[PageRecord|None, str|None, ParseStats|None, list[str]|None, ParseError|None]:
+    from_path, template_path, dest_path, _, _, _ = args
+    record, output_html, digest, stats, inputs, error = rendered
+    # drafts and failed pages are not written, large pages were already streamed to dest_path
+    if output_html is not None:
+        print (f"Generating page from {from_path}  to {dest_path} using {template_path}")
+        os.makedirs(os.path.dirname(dest_path), exist_ok=True)
+        digest = atomic_write(dest_path, output_html)
+    return record, digest, stats, inputs, error
+
+
+class BuildError(ValueError):
+    """The errors of every page that failed to build, reported together"""
+    def __init__(self, errors:list[ParseError]) -> None:
+        self.errors = errors
+        pages = "1 page" if len(errors) == 1 else f"{len(errors)} pages"
+        super().__init__("\n".join([f"{pages} failed to build:"] + [f"  {error}" for error in errors]))
+
+
+def output_key(dest_dir:str, path:str) -> str:
+    """The name of an output file in manifests and the dependency graph"""
+    return os.path.relpath(path, dest_dir).replace(os.sep, "/")
+
+
+def generate_pages_recursive(content_dir:str, template_path:str, dest_dir:str, workers:int=1, site_stats:SiteStats|None=None, graph:DependencyGraph|None=None, static_dir:str|None=None, io_workers:int=DEFAULT_IO_WORKERS, pages:list[str]|None=None, manifest:Manifest|None=None) -> list[PageRecord]:
+    """Render every markdown page under content_dir into dest_dir, or only the pages
+    given by their paths relative to content_dir.
+
+    Sources are read and outputs written by a pool of io_workers threads while other
+    pages render, so filesystem latency overlaps with the rendering and with itself.
+    With more than one worker the pages are rendered in a process pool. Returns the
+    records of all published pages in content order. When site_stats is given, each
+    published page's ParseStats is added to it. When graph is given, each page's inputs
+    are added to it, with images resolved against static_dir. When manifest is given, the
+    digest of each page's output, taken as it was written, is added to it. Pages that fail
+    do not stop the others: once every page is done, a BuildError reports all of their errors."""
+    if graph is not None and static_dir is None:
+        raise ValueError("A dependency graph needs the static directory to resolve images")
+    tasks = []
+    for rel_path in find_content_pages(content_dir) if pages is None else pages:
+        url = content_url(rel_path)
+        tasks.append((os.path.join(content_dir, rel_path), template_path, output_path(dest_dir, url), url, site_stats is not None, static_dir if graph is not None else None))
+
+    if workers > 1 and len(tasks) > 1:
+        # workers start with the default template already compiled, and with the caches sized as here
+        TEMPLATES.get(template_path)
+        # imported here so commands that never start a pool, and --help, do not pay for multiprocessing
+        from concurrent.futures import ProcessPoolExecutor
+        with ProcessPoolExecutor(max_workers=workers, initializer=_start_worker, initargs=(TEMPLATES.snapshot(), cache_limits())) as executor:
+            # a page waits behind each busy worker, so none idles while results travel back
+            results = run_pipeline(tasks, _read_page_task, _render_page_task, _write_page_task, executor, render_slots=workers * 2, io_workers=io_workers)
+    else:
+        results = run_pipeline(tasks, _read_page_task, _render_page_task, _write_page_task, io_workers=io_workers)
+    records = []
+    errors = []
+    for task, (record, digest, stats, inputs, error) in zip(tasks, results):
+        if error is not None:
+            errors.append(error)
+        if record is None:
+            continue
+        records.append(record)
+        if site_stats is not None:
+            site_stats.add_page(record.url, stats)
+        if manifest is not None:
+            manifest[output_key(dest_dir, task[2])] = digest
+        if graph is not None:
+            graph.add_output(output_key(dest_dir, task[2]), inputs)
+    if errors:
+        raise BuildError(errors)
+    return records
+
+
+def render_listing_page(listing_page:ListingPage, template_path:str) -> str:
+    """Render a generated listing page (not backed by a content file) into the template"""
+    toc = TableOfContents()
+    content_html = listing_page.to_html_node(toc).to_html()
+    return TEMPLATES.get(template_path).render({"Title": escape_html(listing_page.title), "Content": content_html, "TOC": toc.to_html()})
+
+
+def section_records(records:list[PageRecord], section:str) -> list[PageRecord]:
+    """Return the records of pages under the given content section, such as blog"""
+    section_prefix = f"/{section}/"
+    return [record for record in records if record.url.startswith(section_prefix)]
+
+
+def generate_listings(records:list[PageRecord], template_path:str, dest_dir:str, section:str="blog", graph:DependencyGraph|None=None, manifest:Manifest|None=None) -> list[str]:
+    """Write the archive, tag and pagination pages for the pages under the given content section.
+
+    Returns the urls of the listing pages written."""
+    listed_records = section_records(records, section)
+    # any page of the section can move every listing page, by its date, title or tags
+    section_group = f"@section:{section}"
+    if graph is not None:
+        graph.add_group(section_group, [record.source for record in listed_records])
+    listing_urls = []
+    for listing_page in generate_listing_pages(listed_records):
+        dest_path = output_path(dest_dir, listing_page.url)
+        print(f"Generating listing page {listing_page.url} to {dest_path}")
+        os.makedirs(os.path.dirname(dest_path), exist_ok=True)
+        digest = atomic_write(dest_path, render_listing_page(listing_page, template_path))
+        listing_urls.append(listing_page.url)
+        if manifest is not None:
+            manifest[output_key(dest_dir, dest_path)] = digest
+        if graph is not None:
+            graph.add_output(output_key(dest_dir, dest_path), [*TEMPLATES.get(template_path).files, section_group])
+    return listing_urls
+
+
+def generate_feeds(records:list[PageRecord], listing_urls:list[str], dest_dir:str, site_url:str=SITE_URL, section:str="blog", graph:DependencyGraph|None=None, manifest:Manifest|None=None) -> None:
+    """Write sitemap.xml for every page and an Atom feed for the given content section"""
+    print(f"Generating sitemap and feed in {dest_dir}")
+    page_urls = ((record.url, record.date) for record in records)
+    listing_page_urls = ((url, None) for url in listing_urls)
+    sitemap_paths = write_sitemaps(itertools.chain(page_urls, listing_page_urls), dest_dir, site_url)
+    atom_path = os.path.join(dest_dir, "atom.xml")
+    atom_digest = write_atom_feed(section_records(records, section), atom_path, site_url, SITE_TITLE)
+    if manifest is not None:
+        for sitemap_path, digest in sitemap_paths.items():
+            manifest[output_key(dest_dir, sitemap_path)] = digest
+        manifest[output_key(dest_dir, atom_path)] = atom_digest
+    if graph is not None:
+        graph.add_group("@pages", [record.source for record in records])
+        for sitemap_path in sitemap_paths:
+            graph.add_output(output_key(dest_dir, sitemap_path), ["@pages"])
+        graph.add_output(output_key(dest_dir, atom_path), [f"@section:{section}"])
+
+
+def build_site(content_dir:str, static_dir:str, template_path:str, dest_dir:str, workers:int=1, site_stats:SiteStats|None=None, state_dir:str|None=None, io_workers:int=DEFAULT_IO_WORKERS, stages:Iterable[str]=BUILD_STAGES) -> list[PageRecord]:
+    """Build the whole site and put it in place of dest_dir in one swap.
+
+    The static files, pages, listings and feeds are written into a staging directory
+    next to dest_dir, so dest_dir keeps serving the previous build until the new one is
+    complete, and a failed build leaves it untouched. The output only depends on the
+    sources, not on how the pages were scheduled over the workers.
+
+    When state_dir is given, the build's manifest of output hashes is kept there along
+    with the delta of paths added, modified and deleted since the previous build, and
+    the dependency graph of every output on its inputs.
+
+    The pages are always built; stages picks which of the static files, listings, feeds
+    and the manifest kept in state_dir go with them."""
+    def write_pages(staging_dir:str, graph:DependencyGraph|None, manifest:Manifest) -> list[PageRecord]:
+        return generate_pages_recursive(content_dir, template_path, staging_dir, workers=workers, site_stats=site_stats, graph=graph, static_dir=static_dir, io_workers=io_workers, manifest=manifest)
+    return _assemble_site(static_dir, template_path, dest_dir, state_dir, write_pages, stages)
+
+
+def _assemble_site(static_dir:str, template_path:str, dest_dir:str, state_dir:str|None, write_pages:Callable[[str, DependencyGraph|None, Manifest], list[PageRecord]], stages:Iterable[str]=BUILD_STAGES) -> list[PageRecord]:
+    # the static files, then the pages written by write_pages, then the listings and feeds over their records;
+    # each output's digest goes into the manifest as it is written, so the output is never read back
+    stages = set(stages)
+    if "manifest" not in stages:
+        state_dir = None
+    graph = DependencyGraph() if state_dir is not None else None
+    manifest:Manifest = {}
+    staging_dir = make_staging_directory(dest_dir)
+    try:
+        if "static" in stages:
+            copy_static_files(static_dir, staging_dir, graph, manifest)
+        records = write_pages(staging_dir, graph, manifest)
+        listing_urls = generate_listings(records, template_path, staging_dir, graph=graph, manifest=manifest) if "listings" in stages else []
+        if "feeds" in stages:
+            generate_feeds(records, listing_urls, staging_dir, graph=graph, manifest=manifest)
+        swap_directory(staging_dir, dest_dir)
+    except BaseException:
+        shutil.rmtree(staging_dir, ignore_errors=True)
+        raise
+
+    if state_dir is not None:
+        os.makedirs(state_dir, exist_ok=True)
+        manifest_path = os.path.join(state_dir, MANIFEST_NAME)
+        delta = ManifestDelta.between(read_manifest(manifest_path), manifest)
+        print(f"Build changed {len(delta.added)} added, {len(delta.modified)} modified and {len(delta.deleted)} deleted files")
+        write_delta(os.path.join(state_dir, DELTA_NAME), delta)
+        write_manifest(manifest_path, manifest)
+        graph.save(os.path.join(state_dir, DEPS_NAME))
+    return records
+
+
+def build_shard(content_dir:str, static_dir:str, template_path:str, state_dir:str, index:int, count:int, workers:int=1, site_stats:SiteStats|None=None, io_workers:int=DEFAULT_IO_WORKERS) -> list[PageRecord]:
+    """Render the content pages of shard index of count into the shard's own directory under state_dir.
+
+    Pages are assigned to shards by a hash of their path, so shards can be built on
+    different hosts from the same content. Listings, feeds and static files depend on
+    the whole site and are left to merge_shards."""
+    pages = [rel_path for rel_path in find_content_pages(content_dir) if shard_of(rel_path, count) == index]
+    shard_dir = shard_directory(state_dir, index, count)
+    output_dir = os.path.join(shard_dir, SHARD_OUTPUT_DIR)
+    os.makedirs(shard_dir, exist_ok=True)
+    graph = DependencyGraph()
+    manifest:Manifest = {}
+    staging_dir = make_staging_directory(output_dir)
+    try:
+        records = generate_pages_recursive(content_dir, template_path, staging_dir, workers=workers, site_stats=site_stats, graph=graph, static_dir=static_dir, io_workers=io_workers, pages=pages, manifest=manifest)
+        swap_directory(staging_dir, output_dir)
+    except BaseException:
+        shutil.rmtree(staging_dir, ignore_errors=True)
+        raise
+
+    # sources are kept relative, the merge may run in another checkout of the content
+    shard_records = [PageRecord(record.url, record.title, record.date, record.tags, content_key(content_dir, record.source)) for record in records]
+    # so are the inputs, templates and static files included, the merge rebases them onto its own content_dir
+    shard_outputs = {output: [input_path if input_path.startswith(GROUP_PREFIX) else content_key(content_dir, input_path) for input_path in inputs] for output, inputs in graph.outputs.items()}
+    ShardBuild(index, count, [content_key(content_dir, rel_path) for rel_path in pages], shard_records, manifest, shard_outputs).save(os.path.join(shard_dir, SHARD_NAME))
+    print(f"Built shard {index}/{count}: {len(records)} pages into {output_dir}")
+    return records
+
+
+def content_key(content_dir:str, path:str) -> str:
+    """The name of a content page or other input in shard builds: its path relative to content_dir, with / separators"""
+    return os.path.relpath(os.path.join(content_dir, path), content_dir).replace(os.sep, "/")
+
+
+def content_path(content_dir:str, key:str) -> str:
+    """The path a content_key names, resolved against this build's content_dir"""
+    return os.path.normpath(os.path.join(content_dir, *key.split("/")))
+
+
+def merge_shards(content_dir:str, static_dir:str, template_path:str, dest_dir:str, state_dir:str, stages:Iterable[str]=BUILD_STAGES) -> list[PageRecord]:
+    """Combine the pages of every shard built under state_dir into a whole site in place of dest_dir.
+
+    Copies the static files and each shard's pages, checked against the shard's manifest,
+    then generates the listings and feeds over all the pages, so the result is the same
+    as build_site's. The stages run and the build state is recorded in state_dir as build_site does.
+    Raises ValueError when a shard is missing or was built from different content pages."""
+    builds = find_shard_builds(state_dir)
+    count = builds[0][0].count
+    all_pages = [content_key(content_dir, rel_path) for rel_path in find_content_pages(content_dir)]
+    for build, _ in builds:
+        if build.pages != [rel_path for rel_path in all_pages if shard_of(rel_path, count) == build.index]:
+            raise ValueError(f"Shard {build.index}/{count} was built from different content pages, rebuild it")
+    page_order = {rel_path: position for position, rel_path in enumerate(all_pages)}
+
+    def write_pages(staging_dir:str, graph:DependencyGraph|None, manifest:Manifest) -> list[PageRecord]:
+        shard_records = []
+        for build, output_dir in builds:
+            print(f"Merging shard {build.index}/{count} from {output_dir}")
+            for rel_path, digest in build.manifest.items():
+                copy_verified(output_dir, staging_dir, rel_path, digest)
+                manifest[rel_path] = digest
+            if graph is not None:
+                for output, inputs in build.outputs.items():
+                    graph.add_output(output, [input_path if input_path.startswith(GROUP_PREFIX) else content_path(content_dir, input_path) for input_path in inputs])
+            shard_records.extend(build.records)
+        # in content order, as a single build lists them
+        shard_records.sort(key=lambda record: page_order[record.source])
+        return [PageRecord(record.url, record.title, record.date, record.tags, content_path(content_dir, record.source)) for record in shard_records]
+    return _assemble_site(static_dir, template_path, dest_dir, state_dir, write_pages, stages)
+
+
+def query_dependencies(graph:DependencyGraph, public_dir:str, path:str) -> list[str]:
+    """The inputs of an output path under public_dir, or the outputs depending on any other path"""
+    path = os.path.abspath(path)
+    public_dir = os.path.abspath(public_dir)
+    if os.path.commonpath([path, public_dir]) == public_dir:
+        return graph.dependencies(output_key(public_dir, path))
+    return [os.path.join(public_dir, *output.split("/")) for output in graph.dependents(path)]
+
+
+def deploy_site(public_dir:str, state_dir:str, target_dir:str) -> ManifestDelta:
+    """Mirror the last build into target_dir, copying only the files that changed there"""
+    manifest = read_manifest(os.path.join(state_dir, MANIFEST_NAME))
+    if not manifest:
+        raise ValueError(f"No build manifest in {state_dir}, build the site before deploying")
+    delta = deploy(public_dir, manifest, target_dir)
+    print(f"Deployed to {target_dir}: {len(delta.added)} added, {len(delta.modified)} modified, {len(delta.deleted)} deleted")
+    return delta
@@ -0,0 +1,118 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+
+class RenderCache:
+    """A size-aware LRU cache for rendered page output.
+
+    The budget is in bytes of cached output rather than number of entries, so a few
+    huge pages cannot crowd the memory use past the limit. Least recently used entries
+    are evicted until a new entry fits. Entries bigger than the whole budget are never cached.
+    """
+    def __init__(self, max_bytes:int=DEFAULT_MAX_BYTES) -> None:
+        if max_bytes < 0:
+            raise ValueError("max_bytes must not be negative")
+        self.max_bytes = max_bytes
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries:OrderedDict[tuple, tuple[str, int]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key:tuple) -> bool:
+        return key in self._entries
+
+    def get(self, key:tuple) -> str|None:
+        """Return the cached value for key, or None on a miss"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key:tuple, value:str) -> bool:
+        """Store value under key, evicting older entries as needed. Returns whether it was cached"""
+        size = len(value.encode('utf-8'))
+        with self._lock:
+            old_entry = self._entries.pop(key, None)
+            if old_entry is not None:
+                self.current_bytes -= old_entry[1]
+            if size > self.max_bytes:
+                return False
+            while self.current_bytes + size > self.max_bytes:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self.current_bytes -= evicted_size
+                self.evictions += 1
+            self._entries[key] = (value, size)
+            self.current_bytes += size
+            return True
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.current_bytes = 0
+
+    def resize(self, max_bytes:int) -> None:
+        """Change the budget, evicting least recently used entries until the cache fits it"""
+        if max_bytes < 0:
+            raise ValueError("max_bytes must not be negative")
+        with self._lock:
+            self.max_bytes = max_bytes
+            while self.current_bytes > max_bytes:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self.current_bytes -= evicted_size
+                self.evictions += 1
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "entries": len(self._entries),
+            "bytes": self.current_bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+
+class FileHasher:
+    """Remember content hashes of files, only re-hashing when their stat signature changes"""
+    def __init__(self) -> None:
+        self._hashes:dict[str, tuple[tuple[int, int], str]] = {}
+        self._lock = threading.Lock()
+
+    def hash_file(self, path:str) -> str:
+        path = os.path.abspath(path)
+        st = os.stat(path)
+        signature = (st.st_mtime_ns, st.st_size)
+        cached = self._hashes.get(path)
+        if cached is not None and cached[0] == signature:
+            return cached[1]
+        with open(path, 'rb') as f:
+            digest = hashlib.sha256(f.read()).hexdigest()
+        with self._lock:
+            self._hashes[path] = (signature, digest)
+        return digest
+
+
+def source_key(path:str) -> tuple[str, int, int]:
+    """Cache key component for a source file: its absolute path, mtime and size"""
+    path = os.path.abspath(path)
+    st = os.stat(path)
+    return (path, st.st_mtime_ns, st.st_size)
+
+
+# process wide caches shared by every page render in this process
+PAGE_CACHE = RenderCache()
+TEMPLATE_HASHES = FileHasher()
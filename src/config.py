@@ -0,0 +1,98 @@
+import os
+
+
+# looked up in the project directory, next to content/ and static/
+CONFIG_NAME = "site.toml"
+# the parts of a build after the pages, each can be turned off in [stages]
+BUILD_STAGES = ("static", "listings", "feeds", "manifest")
+
+_SECTIONS:dict[str, dict[str, type]] = {
+    "dirs": {"content": str, "static": str, "template": str, "public": str},
+    "build": {"workers": int, "io_workers": int},
+    "cache": {"dir": str, "render_bytes": int, "intern_entries": int, "mmap_min_size": int},
+    "stages": {stage: bool for stage in BUILD_STAGES},
+}
+_TYPE_NAMES = {str: "a string", int: "an integer", bool: "true or false"}
+# other integers may be 0; an empty file cannot be memory mapped, so mmap_min_size starts at 1
+_MINIMUMS = {"workers": 1, "io_workers": 1, "mmap_min_size": 1}
+
+
+class BuildConfig:
+    """Where a build reads and writes, how many workers it uses, its cache locations
+    and sizes, and the stages it runs.
+
+    Relative directories are resolved against base_dir. Limits left as None keep the
+    built-in defaults of the module they size."""
+    def __init__(self, base_dir:str, content_dir:str="content", static_dir:str="static", template_path:str="template.html",
+                 public_dir:str="public", state_dir:str=".build", workers:int|None=None, io_workers:int|None=None,
+                 render_cache_bytes:int|None=None, intern_entries:int|None=None, mmap_min_size:int|None=None,
+                 stages:tuple[str, ...]=BUILD_STAGES) -> None:
+        self.base_dir = base_dir
+        self.content_dir = os.path.join(base_dir, content_dir)
+        self.static_dir = os.path.join(base_dir, static_dir)
+        self.template_path = os.path.join(base_dir, template_path)
+        self.public_dir = os.path.join(base_dir, public_dir)
+        # build state kept between runs: the manifest, delta and dependency graph of the last build, and shard builds
+        self.state_dir = os.path.join(base_dir, state_dir)
+        self.workers = workers if workers is not None else os.cpu_count() or 1
+        self.io_workers = io_workers
+        self.render_cache_bytes = render_cache_bytes
+        self.intern_entries = intern_entries
+        self.mmap_min_size = mmap_min_size
+        self.stages = stages
+
+    def __repr__(self) -> str:
+        return f"BuildConfig({self.base_dir}, {self.workers} workers, stages {', '.join(self.stages)})"
+
+
+def parse_config(data:dict, base_dir:str, path:str="config") -> BuildConfig:
+    """Build a BuildConfig from the tables of a config file, raising ValueError on unknown or mistyped keys"""
+    for section, values in data.items():
+        if section not in _SECTIONS or not isinstance(values, dict):
+            raise ValueError(f"Unknown section [{section}] in {path}, expected one of {', '.join(_SECTIONS)}")
+        for key, value in values.items():
+            expected = _SECTIONS[section].get(key)
+            if expected is None:
+                raise ValueError(f"Unknown key {key} in [{section}] of {path}")
+            # bool is an int subclass, so check the exact type
+            if type(value) is not expected:
+                raise ValueError(f"{section}.{key} in {path} must be {_TYPE_NAMES[expected]}, not {value!r}")
+            minimum = _MINIMUMS.get(key, 0)
+            if expected is int and value < minimum:
+                raise ValueError(f"{section}.{key} in {path} must be at least {minimum}, not {value}")
+    dirs, build, cache, stages = (data.get(section, {}) for section in _SECTIONS)
+    return BuildConfig(
+        base_dir,
+        content_dir=dirs.get("content", "content"),
+        static_dir=dirs.get("static", "static"),
+        template_path=dirs.get("template", "template.html"),
+        public_dir=dirs.get("public", "public"),
+        state_dir=cache.get("dir", ".build"),
+        workers=build.get("workers"),
+        io_workers=build.get("io_workers"),
+        render_cache_bytes=cache.get("render_bytes"),
+        intern_entries=cache.get("intern_entries"),
+        mmap_min_size=cache.get("mmap_min_size"),
+        stages=tuple(stage for stage in BUILD_STAGES if stages.get(stage, True)),
+    )
+
+
+def load_config(base_dir:str, path:str|None=None) -> BuildConfig:
+    """Read the config file at path, or base_dir's site.toml when there is one.
+
+    Relative directories in the file are resolved against the directory it is in.
+    Without a config file, the defaults describe the project in base_dir."""
+    if path is None:
+        path = os.path.join(base_dir, CONFIG_NAME)
+        if not os.path.exists(path):
+            return BuildConfig(base_dir)
+    # imported here so builds without a config file, and --help, don't pay for it
+    import tomllib
+    try:
+        with open(path, 'rb') as f:
+            data = tomllib.load(f)
+    except FileNotFoundError:
+        raise ValueError(f"Config file {path} does not exist") from None
+    except tomllib.TOMLDecodeError as e:
+        raise ValueError(f"Invalid config file {path}: {e}") from None
+    return parse_config(data, os.path.dirname(os.path.abspath(path)), path)
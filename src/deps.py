@@ -0,0 +1,89 @@
+import json
+import os
+from typing import Iterable
+from urllib.parse import urljoin, urlsplit
+
+from atomic import atomic_write
+
+
+DEPS_NAME = "deps.json"
+# inputs named with this prefix stand for a group of inputs, such as every page of a section
+GROUP_PREFIX = "@"
+
+
+class DependencyGraph:
+    """The inputs each build output depends on.
+
+    Outputs are paths relative to the output directory, with / separators. Inputs are
+    source paths, or group names that stand for many inputs shared by several outputs
+    (a listing depends on every page of its section), so the graph stays linear in size."""
+    def __init__(self) -> None:
+        self.outputs:dict[str, list[str]] = {}
+        self.groups:dict[str, list[str]] = {}
+        self._dependents:dict[str, list[str]]|None = None
+
+    def add_output(self, output:str, inputs:Iterable[str]) -> None:
+        self.outputs[output] = list(dict.fromkeys(inputs))
+        self._dependents = None
+
+    def add_group(self, name:str, members:Iterable[str]) -> None:
+        if not name.startswith(GROUP_PREFIX):
+            raise ValueError(f"Group names must start with {GROUP_PREFIX}: {name}")
+        self.groups[name] = list(dict.fromkeys(members))
+        self._dependents = None
+
+    def dependencies(self, output:str) -> list[str]:
+        """The inputs of output, with groups expanded"""
+        if output not in self.outputs:
+            raise ValueError(f"No build output {output} in the dependency graph")
+        inputs = []
+        for input_path in self.outputs[output]:
+            inputs.extend(self.groups.get(input_path, []) if input_path.startswith(GROUP_PREFIX) else [input_path])
+        return list(dict.fromkeys(inputs))
+
+    def dependents(self, input_path:str) -> list[str]:
+        """The outputs that depend on input_path, directly or through a group"""
+        if self._dependents is None:
+            self._dependents = {}
+            for output in self.outputs:
+                for dependency in self.dependencies(output):
+                    self._dependents.setdefault(dependency, []).append(output)
+        return self._dependents.get(input_path, [])
+
+    def rebuild_set(self, changed_inputs:Iterable[str]) -> list[str]:
+        """The outputs to rebuild after changed_inputs changed, in output order"""
+        affected = set()
+        for input_path in changed_inputs:
+            affected.update(self.dependents(input_path))
+        return [output for output in self.outputs if output in affected]
+
+    def to_dict(self) -> dict[str, dict[str, list[str]]]:
+        return {"outputs": dict(sorted(self.outputs.items())), "groups": dict(sorted(self.groups.items()))}
+
+    @classmethod
+    def from_dict(cls, data:dict[str, dict[str, list[str]]]) -> 'DependencyGraph':
+        graph = cls()
+        graph.outputs = data.get("outputs", {})
+        graph.groups = data.get("groups", {})
+        return graph
+
+    def save(self, path:str) -> None:
+        atomic_write(path, json.dumps(self.to_dict(), indent=2) + "\n")
+
+    @classmethod
+    def load(cls, path:str) -> 'DependencyGraph':
+        if not os.path.exists(path):
+            raise ValueError(f"No dependency graph at {path}, build the site first")
+        with open(path, 'r', encoding='utf-8') as f:
+            return cls.from_dict(json.load(f))
+
+
+def local_asset_path(static_dir:str, page_url:str, src:str) -> str|None:
+    """Map a link or image src on the page at page_url to the static file it serves, if any"""
+    # pages served from a directory resolve relative srcs against it
+    base_url = page_url if page_url.endswith(".html") else page_url.rstrip("/") + "/"
+    parts = urlsplit(urljoin(base_url, src))
+    if parts.scheme or parts.netloc:
+        return None
+    path = os.path.join(static_dir, *[part for part in parts.path.split("/") if part])
+    return path if os.path.isfile(path) else None
@@ -0,0 +1,155 @@
+import hashlib
+import heapq
+import os
+from typing import IO, Iterable, Iterator
+
+from atomic import atomic_open
+from listing import PageRecord
+
+
+SITEMAP_NS = "http://www.sitemaps.org/schemas/sitemap/0.9"
+ATOM_NS = "http://www.w3.org/2005/Atom"
+# the sitemap protocol limit on urls per sitemap file
+SITEMAP_MAX_URLS = 50_000
+FEED_MAX_ENTRIES = 20
+# used for the feed and undated entries when no page has a date
+EPOCH_TIMESTAMP = "1970-01-01T00:00:00Z"
+
+
+class XMLWriter:
+    """Write XML straight to a file object, one element at a time, without building a tree"""
+    def __init__(self, stream:IO[str]) -> None:
+        # imported here rather than at startup, xml.sax pulls in urllib.request and http.client
+        from xml.sax.saxutils import escape, quoteattr
+        self._escape = escape
+        self._quoteattr = quoteattr
+        self.stream = stream
+        self._open_tags:list[str] = []
+        stream.write('<?xml version="1.0" encoding="UTF-8"?>\n')
+
+    def _attrs(self, attrs:dict[str, str]|None) -> str:
+        if not attrs:
+            return ""
+        return "".join(f" {name}={self._quoteattr(value)}" for name, value in attrs.items())
+
+    def start(self, tag:str, attrs:dict[str, str]|None=None) -> None:
+        self.stream.write(f"<{tag}{self._attrs(attrs)}>\n")
+        self._open_tags.append(tag)
+
+    def end(self, tag:str) -> None:
+        open_tag = self._open_tags.pop()
+        if open_tag != tag:
+            raise ValueError(f"Closing <{tag}> but <{open_tag}> is open")
+        self.stream.write(f"</{tag}>\n")
+
+    def element(self, tag:str, text:str|None=None, attrs:dict[str, str]|None=None) -> None:
+        if text is None:
+            self.stream.write(f"<{tag}{self._attrs(attrs)}/>\n")
+        else:
+            self.stream.write(f"<{tag}{self._attrs(attrs)}>{self._escape(text)}</{tag}>\n")
+
+    def close(self) -> None:
+        if self._open_tags:
+            raise ValueError(f"Unclosed elements: {self._open_tags}")
+
+
+def absolute_url(site_url:str, url:str) -> str:
+    return site_url.rstrip("/") + url
+
+
+def date_to_timestamp(date:str|None) -> str|None:
+    """Turn a front matter date (YYYY-MM-DD) into an RFC 3339 timestamp"""
+    if not date:
+        return None
+    if "T" in date:
+        return date
+    return f"{date}T00:00:00Z"
+
+
+def _write_sitemap_file(path:str, urls:Iterator[tuple[str, str|None]], site_url:str) -> str:
+    digest = hashlib.sha256()
+    with atomic_open(path, digest=digest) as f:
+        writer = XMLWriter(f)
+        writer.start("urlset", {"xmlns": SITEMAP_NS})
+        for url, lastmod in urls:
+            writer.start("url")
+            writer.element("loc", absolute_url(site_url, url))
+            if lastmod:
+                writer.element("lastmod", lastmod)
+            writer.end("url")
+        writer.end("urlset")
+        writer.close()
+    return digest.hexdigest()
+
+
+def write_sitemaps(urls:Iterable[tuple[str, str|None]], dest_dir:str, site_url:str, max_urls:int=SITEMAP_MAX_URLS) -> dict[str, str]:
+    """Stream (url, lastmod) pairs into sitemap.xml, returning the sitemap files written
+    with the sha256 hex digests of their contents.
+
+    Past max_urls the urls are split over sitemap-N.xml files and sitemap.xml becomes
+    a sitemap index pointing at them. Only one chunk of urls is held at a time."""
+    urls = iter(urls)
+    chunk_paths = []
+    digests = []
+    while True:
+        chunk = []
+        for url in urls:
+            chunk.append(url)
+            if len(chunk) == max_urls:
+                break
+        if not chunk and chunk_paths:
+            break
+        chunk_path = os.path.join(dest_dir, f"sitemap-{len(chunk_paths) + 1}.xml")
+        digests.append(_write_sitemap_file(chunk_path, iter(chunk), site_url))
+        chunk_paths.append(chunk_path)
+        if len(chunk) < max_urls:
+            break
+
+    sitemap_path = os.path.join(dest_dir, "sitemap.xml")
+    if len(chunk_paths) == 1:
+        os.replace(chunk_paths[0], sitemap_path)
+        return {sitemap_path: digests[0]}
+
+    index_digest = hashlib.sha256()
+    with atomic_open(sitemap_path, digest=index_digest) as f:
+        writer = XMLWriter(f)
+        writer.start("sitemapindex", {"xmlns": SITEMAP_NS})
+        for chunk_path in chunk_paths:
+            writer.start("sitemap")
+            writer.element("loc", absolute_url(site_url, "/" + os.path.basename(chunk_path)))
+            writer.end("sitemap")
+        writer.end("sitemapindex")
+        writer.close()
+    return {sitemap_path: index_digest.hexdigest(), **dict(zip(chunk_paths, digests))}
+
+
+def write_atom_feed(records:Iterable[PageRecord], path:str, site_url:str, title:str, max_entries:int=FEED_MAX_ENTRIES) -> str:
+    """Write an Atom feed of the newest records to path, returning the sha256 hex digest of the feed"""
+    # only the newest max_entries records are kept while the stream passes
+    newest = heapq.nlargest(max_entries, records, key=PageRecord.sort_key)
+    feed_updated = next((date_to_timestamp(record.date) for record in newest if record.date), EPOCH_TIMESTAMP)
+
+    digest = hashlib.sha256()
+    with atomic_open(path, digest=digest) as f:
+        writer = XMLWriter(f)
+        writer.start("feed", {"xmlns": ATOM_NS})
+        writer.element("title", title)
+        writer.element("id", absolute_url(site_url, "/"))
+        writer.element("link", attrs={"href": absolute_url(site_url, "/")})
+        writer.element("link", attrs={"rel": "self", "href": absolute_url(site_url, "/" + os.path.basename(path))})
+        writer.element("updated", feed_updated)
+        writer.start("author")
+        writer.element("name", title)
+        writer.end("author")
+        for record in newest:
+            writer.start("entry")
+            writer.element("title", record.title)
+            writer.element("id", absolute_url(site_url, record.url))
+            writer.element("link", attrs={"href": absolute_url(site_url, record.url)})
+            writer.element("updated", date_to_timestamp(record.date) or feed_updated)
+            for tag in record.tags:
+                writer.element("category", attrs={"term": tag})
+            writer.end("entry")
+        writer.end("feed")
+        writer.close()
+    return digest.hexdigest()
@@ -0,0 +1,122 @@
+import re
+from typing import Iterable, Iterator
+
+
+FRONT_MATTER_DELIMITER = "---"
+
+# value type for a parsed front matter field
+MetaValue = str | int | bool | list[str]
+
+
+def parse_front_matter_value(value:str) -> MetaValue:
+    """Parse a single YAML-like scalar or inline list value"""
+    value = value.strip()
+    if value.startswith("[") and value.endswith("]"):
+        return [str(parse_front_matter_value(item)) for item in value[1:-1].split(",") if item.strip()]
+    if len(value) >= 2 and value[0] == value[-1] and value[0] in "\"'":
+        return value[1:-1]
+    match value.lower():
+        case "true" | "yes":
+            return True
+        case "false" | "no":
+            return False
+    if re.fullmatch(r"-?\d+", value):
+        return int(value)
+    return value
+
+
+def parse_front_matter_lines(lines:list[str]) -> dict[str, MetaValue]:
+    """Parse the lines between the front matter delimiters into a metadata dict.
+
+    Supports `key: value` pairs, inline lists (`tags: [a, b]`) and block lists where
+    the key has no value and is followed by `- item` lines."""
+    metadata:dict[str, MetaValue] = {}
+    list_key = None
+    for line_number, line in enumerate(lines, start=1):
+        stripped = line.strip()
+        if not stripped or stripped.startswith("#"):
+            continue
+        if list_key is not None and stripped.startswith("- "):
+            metadata[list_key].append(str(parse_front_matter_value(stripped[2:])))
+            continue
+        key, sep, value = stripped.partition(":")
+        if not sep or not key.strip():
+            raise ValueError(f"Invalid front matter line {line_number}: {line!r}")
+        key = key.strip().lower()
+        if value.strip():
+            metadata[key] = parse_front_matter_value(value)
+            list_key = None
+        else:
+            metadata[key] = []
+            list_key = key
+    return metadata
+
+
+def split_front_matter(md_text:str) -> tuple[dict[str, MetaValue], str]:
+    """Split markdown text into its front matter metadata and the remaining body.
+
+    Text without front matter returns an empty dict and the text unchanged."""
+    if not md_text.startswith(FRONT_MATTER_DELIMITER):
+        return {}, md_text
+    lines = md_text.split("\n")
+    if lines[0].rstrip() != FRONT_MATTER_DELIMITER:
+        return {}, md_text
+    for index in range(1, len(lines)):
+        if lines[index].rstrip() == FRONT_MATTER_DELIMITER:
+            return parse_front_matter_lines(lines[1:index]), "\n".join(lines[index + 1:])
+    raise ValueError("Unterminated front matter block")
+
+
+def skip_front_matter(lines:Iterable[str]) -> Iterator[str]:
+    """The body lines of a document given as lines without their line endings, reading no further than needed"""
+    lines = iter(lines)
+    first_line = next(lines, None)
+    if first_line is None:
+        return
+    if first_line.rstrip() != FRONT_MATTER_DELIMITER:
+        yield first_line
+    else:
+        for line in lines:
+            if line.rstrip() == FRONT_MATTER_DELIMITER:
+                break
+    yield from lines
+
+
+def read_front_matter(path:str) -> dict[str, MetaValue]:
+    """Read only the front matter header of a markdown file.
+
+    Stops reading at the closing delimiter, so the body of the file is never loaded."""
+    # read in binary and decode line by line, a text mode reader would decode ahead into the body
+    with open(path, 'rb') as f:
+        first_line = f.readline().decode('utf-8')
+        if first_line.rstrip() != FRONT_MATTER_DELIMITER:
+            return {}
+        lines = []
+        for raw_line in f:
+            line = raw_line.decode('utf-8')
+            if line.rstrip() == FRONT_MATTER_DELIMITER:
+                return parse_front_matter_lines(lines)
+            lines.append(line)
+    raise ValueError(f"Unterminated front matter block in {path}")
+
+
+def split_front_matter_buffer(buffer) -> tuple[dict[str, MetaValue], int]:
+    """Parse the front matter at the start of a bytes-like buffer (such as an mmap).
+
+    Returns the metadata and the offset the body starts at, the body itself is not decoded."""
+    lines = []
+    position = 0
+    while True:
+        newline = buffer.find(b"\n", position)
+        line_end = len(buffer) if newline == -1 else newline
+        line = buffer[position:line_end].decode('utf-8').removesuffix("\r")
+        if position == 0:
+            if line.rstrip() != FRONT_MATTER_DELIMITER:
+                return {}, 0
+        elif line.rstrip() == FRONT_MATTER_DELIMITER:
+            return parse_front_matter_lines(lines), line_end if newline == -1 else newline + 1
+        else:
+            lines.append(line)
+        if newline == -1:
+            raise ValueError("Unterminated front matter block")
+        position = newline + 1
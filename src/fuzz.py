@@ -0,0 +1,250 @@
+import argparse
+import random
+import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from typing import Callable
+
+from htmlnode import markdown_to_html, markdown_to_html_node
+from parsing import extract_markdown_images, extract_markdown_links, iter_buffer_blocks, markdown_to_blocks
+
+
+WORDS = ["elf", "ring", "Shire", "hobbit", "Gandalf", "mithril", "road", "goes", "ever", "on", "and", "the", "of", "Moria"]
+SPECIAL_WORDS = ["&", "<b>", "a<b", "fish&chips", "x>y", '"quoted"']
+LANGUAGES = ["python", "js", "go", "bash", "json", "elflang"]
+
+# the regexes the bracket matcher replaced, kept as the reference it must agree with
+REFERENCE_IMAGE_PATTERN = re.compile(r"(!\[([^\[\]]+?)\]\(([^\(\)]+?)\))")
+REFERENCE_LINK_PATTERN = re.compile(r"((?<!!)\[([^\[\]]+?)\]\(([^\(\)]+?)\))")
+
+
+class FuzzFailure:
+    """A generated input that broke one of the parser invariants"""
+    def __init__(self, seed:int, invariant:str, detail:str, markdown:str) -> None:
+        self.seed = seed
+        self.invariant = invariant
+        self.detail = detail
+        self.markdown = markdown
+
+    def __repr__(self) -> str:
+        return f"FuzzFailure(seed={self.seed}, invariant={self.invariant}, detail={self.detail}, markdown={self.markdown!r})"
+
+
+def random_words(rng:random.Random, low:int=1, high:int=6) -> str:
+    words = []
+    for _ in range(rng.randint(low, high)):
+        words.append(rng.choice(SPECIAL_WORDS) if rng.random() < 0.05 else rng.choice(WORDS))
+    return " ".join(words)
+
+
+def random_inline(rng:random.Random) -> str:
+    """A line of text with randomly placed (well formed) inline markdown"""
+    parts = [rng.choice(WORDS)]
+    for _ in range(rng.randint(0, 6)):
+        match rng.randint(0, 6):
+            case 0:
+                parts.append(f"**{random_words(rng, 1, 3)}**")
+            case 1:
+                parts.append(f"_{random_words(rng, 1, 3)}_")
+            case 2:
+                parts.append(f"`{random_words(rng, 1, 3)}`")
+            case 3:
+                parts.append(f"[{random_words(rng, 1, 3)}](/{rng.choice(WORDS)}?q={rng.randint(0, 9)}&x=1)")
+            case 4:
+                parts.append(f"![{random_words(rng, 1, 3)}](/images/{rng.choice(WORDS)}.png)")
+            case 5 if rng.random() < 0.3:
+                # stray brackets and parens that must not turn into links
+                parts.append(rng.choice(["[", "](", "(x)", "[]", "![", "[a]", "( )"]))
+            case _:
+                parts.append(random_words(rng))
+    return " ".join(parts)
+
+
+def random_list(rng:random.Random, ordered:bool, depth:int=0) -> list[str]:
+    lines = []
+    indent = "  " * depth if not ordered else "   " * depth
+    for number in range(1, rng.randint(1, 5) + 1):
+        marker = f"{number}." if ordered else "-"
+        lines.append(f"{indent}{marker} {random_inline(rng)}")
+        if depth < 3 and rng.random() < 0.2:
+            lines.extend(random_list(rng, rng.random() < 0.5, depth + 1))
+    return lines
+
+
+def random_block(rng:random.Random) -> str:
+    match rng.randint(0, 7):
+        case 0:
+            return f"{'#' * rng.randint(1, 6)} {random_inline(rng)}"
+        case 1:
+            lines = [random_words(rng) for _ in range(rng.randint(1, 4))]
+            info = rng.choice(LANGUAGES) if rng.random() < 0.5 else ""
+            return f"```{info}\n" + "\n".join(lines) + "\n```"
+        case 2:
+            return "\n".join(f"> {random_inline(rng)}" for _ in range(rng.randint(1, 3)))
+        case 3:
+            return "\n".join(random_list(rng, ordered=False))
+        case 4:
+            return "\n".join(random_list(rng, ordered=True))
+        case 5:
+            columns = rng.randint(1, 4)
+            rows = [" | ".join(random_inline(rng) for _ in range(columns)) for _ in range(rng.randint(0, 4))]
+            header = " | ".join(rng.choice(WORDS) for _ in range(columns))
+            delimiter = " | ".join(rng.choice(["---", ":--", "--:", ":-:"]) for _ in range(columns))
+            return "\n".join([f"| {header} |", f"| {delimiter} |"] + [f"| {row} |" for row in rows])
+        case _:
+            return "\n".join(random_inline(rng) for _ in range(rng.randint(1, 3)))
+
+
+def random_markdown(rng:random.Random, max_blocks:int=12) -> tuple[str, int]:
+    """Generate a random, well formed markdown document and its number of blocks"""
+    blocks = [random_block(rng) for _ in range(rng.randint(1, max_blocks))]
+    return "\n\n".join(blocks), len(blocks)
+
+
+def check_invariants(markdown:str, block_count:int) -> list[tuple[str, str]]:
+    """Return the (invariant, detail) pairs that markdown violates"""
+    try:
+        tree = markdown_to_html_node(markdown)
+        tree_html = tree.to_html()
+    except Exception as e:
+        return [("never raises", f"{type(e).__name__}: {e}")]
+
+    violations = []
+    if extract_markdown_images(markdown) != REFERENCE_IMAGE_PATTERN.findall(markdown):
+        violations.append(("link matcher agrees", "extract_markdown_images differs from the reference regex"))
+    if extract_markdown_links(markdown) != REFERENCE_LINK_PATTERN.findall(markdown):
+        violations.append(("link matcher agrees", "extract_markdown_links differs from the reference regex"))
+    blocks = markdown_to_blocks(markdown)
+    parsed_blocks = len(blocks)
+    if list(iter_buffer_blocks(markdown.encode('utf-8'))) != blocks:
+        violations.append(("buffer blocks agree", "iter_buffer_blocks differs from markdown_to_blocks"))
+    if parsed_blocks != block_count or len(tree.children) != block_count:
+        violations.append(("block count", f"generated {block_count}, split {parsed_blocks}, rendered {len(tree.children)}"))
+    try:
+        lazy_html = markdown_to_html_node(markdown, lazy=True).to_html()
+    except Exception as e:
+        violations.append(("lazy tree agrees", f"lazy tree raised {type(e).__name__}: {e}"))
+    else:
+        if lazy_html != tree_html:
+            violations.append(("lazy tree agrees", "markdown_to_html_node(lazy=True) renders differently"))
+    try:
+        direct_html = markdown_to_html(markdown)
+    except Exception as e:
+        violations.append(("renderers agree", f"direct renderer raised {type(e).__name__}: {e}"))
+    else:
+        if direct_html != tree_html:
+            violations.append(("renderers agree", "markdown_to_html differs from markdown_to_html_node().to_html()"))
+    return violations
+
+
+def fuzz_shard(shard:int, iterations:int, seed:int) -> list[FuzzFailure]:
+    """Run iterations random documents; each document has its own seed so failures replay alone"""
+    failures = []
+    for iteration in range(iterations):
+        case_seed = seed * 1_000_003 + shard * iterations + iteration
+        markdown, block_count = random_markdown(random.Random(case_seed))
+        for invariant, detail in check_invariants(markdown, block_count):
+            failures.append(FuzzFailure(case_seed, invariant, detail, markdown))
+    return failures
+
+
+def run_fuzz(iterations:int, shards:int=1, seed:int=0, timeout:float|None=None) -> list[FuzzFailure]:
+    """Spread iterations over shards, in a process pool when there is more than one shard.
+
+    A shard that runs past timeout seconds is reported as a failure rather than waited on."""
+    per_shard = [iterations // shards + (1 if shard < iterations % shards else 0) for shard in range(shards)]
+    if shards == 1:
+        return fuzz_shard(0, per_shard[0], seed)
+
+    failures = []
+    executor = ProcessPoolExecutor(max_workers=shards)
+    try:
+        futures = [executor.submit(fuzz_shard, shard, count, seed) for shard, count in enumerate(per_shard)]
+        deadline = None if timeout is None else time.monotonic() + timeout
+        for shard, future in enumerate(futures):
+            remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+            try:
+                failures.extend(future.result(timeout=remaining))
+            except FutureTimeoutError:
+                failures.append(FuzzFailure(seed, "timeout", f"shard {shard} ran past {timeout}s", ""))
+    finally:
+        # don't wait on a hung shard, its worker is left to exit with the interpreter
+        executor.shutdown(wait=timeout is None, cancel_futures=True)
+    return failures
+
+
+def time_call(func:Callable[[str], object], text:str) -> float:
+    start = time.perf_counter()
+    func(text)
+    return time.perf_counter() - start
+
+
+def find_superlinear(func:Callable[[str], object], make_input:Callable[[int], str], sizes:list[int], max_ratio:float=3.0, repeat:int=3) -> tuple[int, int, float]|None:
+    """Look for super-linear growth of func's run time over inputs of increasing size.
+
+    Returns (smaller_size, larger_size, growth) for the first step where the time grew by more
+    than max_ratio times the size ratio, or None if the growth stayed roughly linear."""
+    timings = []
+    for size in sizes:
+        text = make_input(size)
+        timings.append(min(time_call(func, text) for _ in range(repeat)))
+    for index in range(1, len(sizes)):
+        # ignore steps too fast to measure reliably
+        if timings[index] < 0.005:
+            continue
+        size_ratio = sizes[index] / sizes[index - 1]
+        growth = timings[index] / max(timings[index - 1], 1e-9) / size_ratio
+        if growth > max_ratio:
+            return sizes[index - 1], sizes[index], growth
+    return None
+
+
+# inputs that have caused or could cause super-linear parsing, built at a given size
+PATHOLOGICAL_INPUTS:dict[str, Callable[[int], str]] = {
+    "open brackets": lambda n: "[" * n,
+    "open parens": lambda n: "(" * n,
+    "bracket paren runs": lambda n: "[](" * n,
+    "unclosed image": lambda n: "![" + "a" * n,
+    "many links": lambda n: " ".join(f"[link {i}](/page/{i}) and ![image {i}](/img/{i}.png)" for i in range(n)),
+    "nested list": lambda n: "\n".join("  " * (i % 50) + "- item" for i in range(n)),
+    "long table": lambda n: "| a | b |\n|---|---|\n" + "\n".join("| 1 | 2 |" for _ in range(n)),
+    "many blocks": lambda n: "\n\n".join("para" for _ in range(n)),
+}
+
+
+def safe_markdown_to_html(text:str) -> None:
+    # invalid pathological inputs may raise, only their run time matters here
+    try:
+        markdown_to_html(text)
+    except ValueError:
+        pass
+
+
+def main(argv:list[str]|None=None) -> int:
+    parser = argparse.ArgumentParser(description="Fuzz the markdown parser with random documents and pathological inputs")
+    parser.add_argument("--iterations", type=int, default=2000, help="random documents to check")
+    parser.add_argument("--shards", type=int, default=4, help="processes to spread the documents over")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--timeout", type=float, default=120.0, help="seconds before a shard counts as hung")
+    parser.add_argument("--skip-scaling", action="store_true", help="skip the pathological input timing checks")
+    args = parser.parse_args(argv)
+
+    failures = run_fuzz(args.iterations, args.shards, args.seed, args.timeout)
+    for failure in failures[:20]:
+        print(failure)
+    print(f"{args.iterations} random documents, {len(failures)} failures")
+
+    slow_inputs = 0
+    if not args.skip_scaling:
+        for name, make_input in PATHOLOGICAL_INPUTS.items():
+            result = find_superlinear(safe_markdown_to_html, make_input, [1000, 4000, 16000])
+            if result is not None:
+                slow_inputs += 1
+                print(f"super-linear parse time for {name}: {result[0]} -> {result[1]} grew {result[2]:.1f}x faster than the input")
+    return 1 if failures or slow_inputs else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,131 @@
+import hashlib
+import re
+import threading
+from collections import OrderedDict
+from typing import Iterator
+
+
+# a highlighted token: its token type (None for plain text) and its text
+Token = tuple[str | None, str]
+
+HIGHLIGHT_CACHE_SIZE = 1024
+
+
+class RegexTokenizer:
+    """Tokenize code with an ordered list of (token_type, pattern) rules.
+
+    The rules are compiled into one alternation, so code is scanned in a single pass.
+    Text not matched by any rule is emitted as plain text."""
+    def __init__(self, rules:list[tuple[str, str]], flags:int=re.MULTILINE) -> None:
+        self.token_types = [token_type for token_type, _ in rules]
+        self.pattern = re.compile("|".join(f"(?P<t{index}>{pattern})" for index, (_, pattern) in enumerate(rules)), flags)
+
+    def tokenize(self, code:str) -> Iterator[Token]:
+        position = 0
+        for match in self.pattern.finditer(code):
+            if match.start() == match.end():
+                continue
+            if match.start() > position:
+                yield None, code[position:match.start()]
+            yield self.token_types[int(match.lastgroup[1:])], match.group()
+            position = match.end()
+        if position < len(code):
+            yield None, code[position:]
+
+
+class HighlightCache:
+    """An LRU cache of highlighted tokens keyed by (language, code hash).
+
+    Keys hold a digest of the code rather than the code itself."""
+    def __init__(self, max_entries:int=HIGHLIGHT_CACHE_SIZE) -> None:
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries:OrderedDict[tuple[str, bytes], tuple[Token, ...]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get_or_tokenize(self, language:str, code:str, tokenizer:RegexTokenizer) -> tuple[Token, ...]:
+        key = (language, hashlib.blake2b(code.encode('utf-8'), digest_size=16).digest())
+        with self._lock:
+            tokens = self._entries.get(key)
+            if tokens is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return tokens
+            self.misses += 1
+        tokens = tuple(tokenizer.tokenize(code))
+        with self._lock:
+            self._entries[key] = tokens
+            if len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return tokens
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+HIGHLIGHT_CACHE = HighlightCache()
+
+
+def _keywords(words:str) -> str:
+    return r"\b(?:" + "|".join(words.split()) + r")\b"
+
+
+NUMBER_RULE = ("number", r"\b\d+(?:\.\d+)?\b")
+
+TOKENIZERS:dict[str, RegexTokenizer] = {}
+
+
+def register_tokenizer(names:list[str], tokenizer:RegexTokenizer) -> None:
+    """Register a tokenizer for one or more code block language names"""
+    for name in names:
+        TOKENIZERS[name.lower()] = tokenizer
+    # a replaced tokenizer must not keep serving its predecessor's cached tokens
+    HIGHLIGHT_CACHE.clear()
+
+
+def get_tokenizer(language:str) -> RegexTokenizer|None:
+    return TOKENIZERS.get(language.lower())
+
+
+register_tokenizer(["python", "py"], RegexTokenizer([
+    ("comment", r"#[^\n]*"),
+    ("string", r"'''[\s\S]*?'''|\"\"\"[\s\S]*?\"\"\"|'(?:\\.|[^'\\\n])*'|\"(?:\\.|[^\"\\\n])*\""),
+    ("keyword", _keywords("False None True and as assert async await break class continue def del elif else except finally for from global if import in is lambda nonlocal not or pass raise return try while with yield match case")),
+    NUMBER_RULE,
+]))
+register_tokenizer(["javascript", "js", "typescript", "ts"], RegexTokenizer([
+    ("comment", r"//[^\n]*|/\*[\s\S]*?\*/"),
+    ("string", r"`(?:\\.|[^`\\])*`|'(?:\\.|[^'\\\n])*'|\"(?:\\.|[^\"\\\n])*\""),
+    ("keyword", _keywords("async await break case catch class const continue default delete do else export extends false finally for function if import in instanceof let new null return switch this throw true try typeof undefined var void while yield")),
+    NUMBER_RULE,
+]))
+register_tokenizer(["go", "golang"], RegexTokenizer([
+    ("comment", r"//[^\n]*|/\*[\s\S]*?\*/"),
+    ("string", r"`[^`]*`|'(?:\\.|[^'\\\n])*'|\"(?:\\.|[^\"\\\n])*\""),
+    ("keyword", _keywords("break case chan const continue default defer else fallthrough for func go goto if import interface map nil package range return select struct switch true false type var")),
+    NUMBER_RULE,
+]))
+register_tokenizer(["bash", "sh", "shell"], RegexTokenizer([
+    ("comment", r"(?<![\w$])#[^\n]*"),
+    ("string", r"'[^']*'|\"(?:\\.|[^\"\\])*\""),
+    ("keyword", _keywords("if then else elif fi for while until do done case esac in function return export local")),
+    ("variable", r"\$\{[^}\n]*\}|\$\w+"),
+]))
+register_tokenizer(["json"], RegexTokenizer([
+    ("string", r"\"(?:\\.|[^\"\\\n])*\""),
+    ("keyword", _keywords("true false null")),
+    ("number", r"-?\b\d+(?:\.\d+)?(?:[eE][+-]?\d+)?\b"),
+]))
+
+
+def highlight(language:str, code:str) -> tuple[Token, ...]|None:
+    """Return the highlighted tokens of code, or None if no tokenizer handles the language"""
+    tokenizer = get_tokenizer(language)
+    if tokenizer is None:
+        return None
+    return HIGHLIGHT_CACHE.get_or_tokenize(language.lower(), code, tokenizer)
@@ -1,7 +1,29 @@
 import re
+import threading
+from collections import OrderedDict
+from types import MappingProxyType
+from typing import Iterable, Iterator
 
+from highlight import highlight
 from textnode import TextNode, TextType
-from parsing import BlockType, block_to_block_type, markdown_to_blocks, text_to_textnodes
+from parsing import BlockType, ListBlock, ParseBudget, block_error, block_to_block_type, markdown_to_blocks, parse_list_block, slugify, split_table_block, text_to_textnodes
+from stats import ParseStats
+
+
+def escape_html(text:str) -> str:
+    """Escape &, < and > in text content, returning text untouched when there is nothing to escape"""
+    # most text has nothing to escape; plain substring scans run in C and are much
+    # cheaper than a regex search or a translate, so check with those first
+    if "&" not in text and "<" not in text and ">" not in text:
+        return text
+    return text.replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;")
+
+
+def escape_attr(value:str) -> str:
+    """Escape an attribute value for use inside double quotes"""
+    if "&" not in value and "<" not in value and ">" not in value and '"' not in value:
+        return value
+    return value.replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;").replace('"', "&quot;")
 
 
 class HTMLNode:
@@ -16,10 +38,11 @@ class HTMLNode:
 
     def __eq__(self, other: object) -> bool:
         if not isinstance(other, HTMLNode): # pragma: no cover
-            return False
-        # Ensure node types match (LeafNode vs ParentNode should not be equal to base or each other)
+            return NotImplemented
+        # Ensure node types match (LeafNode vs ParentNode should not be equal to base or each other);
+        # NotImplemented lets the other node compare instead, such as a LazyBlockNode standing in for one
         if type(self) is not type(other): # pragma: no cover
-            return False
+            return NotImplemented
         return (
             self.tag == other.tag
             and self.value == other.value
@@ -30,7 +53,14 @@ class HTMLNode:
     def props_to_html(self) -> str:
         if not self.props:
             return ""
-        return " " + " ".join([f'{key}="{value}"' for key, value in self.props.items()])
+        # the checks of escape_attr are made here, the call costs more than the
+        # scans and this runs for every tag with attributes
+        parts = []
+        for key, value in self.props.items():
+            if "&" in value or "<" in value or ">" in value or '"' in value:
+                value = escape_attr(value)
+            parts.append(f' {key}="{value}"')
+        return "".join(parts)
 
     def __repr__(self) -> str:
         classname = self.__class__.__name__
@@ -41,7 +71,15 @@ class LeafNode(HTMLNode):
         super().__init__(tag=tag, value=value, children=None, props=props)
 
     def to_html(self) -> str:
-        value = self.value or ""
+        value = self.value
+        if not value:
+            value = ""
+        elif "&" in value or "<" in value or ">" in value:
+            # checked here rather than in escape_html, most leaves have nothing to escape.
+            # These scans are the cheapest check found: a regex search or a frozenset
+            # isdisjoint test per value is 1.5-20x slower. Serializing a tree still costs
+            # about 14% more than it would unescaped, roughly 1.5% of parsing and rendering
+            value = escape_html(value)
         if not self.tag:
             if self.props:
                 raise ValueError("Leaf nodes without a tag cannot have props")
@@ -61,126 +99,569 @@ class ParentNode(HTMLNode):
         return f"<{self.tag}{self.props_to_html()}>{children_html}</{self.tag}>"
 
 
+class SharedLeafNode(LeafNode):
+    """An immutable LeafNode, shared by every place the same leaf appears, that renders its HTML once.
+
+    Its props are a read-only view. It is equal to a LeafNode with the same tag, value and props."""
+    def __init__(self, tag:str|None, value:str|None, props:dict[str, str]|None=None) -> None:
+        object.__setattr__(self, "tag", tag)
+        object.__setattr__(self, "value", value)
+        object.__setattr__(self, "children", None)
+        object.__setattr__(self, "props", MappingProxyType(dict(props)) if props else None)
+        object.__setattr__(self, "_html", None)
+
+    def __setattr__(self, name:str, value:object) -> None:
+        raise AttributeError(f"Shared leaf nodes are immutable, cannot set {name}")
+
+    def to_html(self) -> str:
+        html = self._html
+        if html is None:
+            html = super().to_html()
+            object.__setattr__(self, "_html", html)
+        return html
+
+    def __eq__(self, other:object) -> bool:
+        # also answers for LeafNode == SharedLeafNode, Python asks the subclass first
+        if not isinstance(other, LeafNode):
+            return NotImplemented
+        return self.tag == other.tag and self.value == other.value and self.props == other.props
+
+    def __hash__(self) -> int:
+        return hash((self.tag, self.value, tuple(self.props.items()) if self.props else None))
+
+
+DEFAULT_INTERN_ENTRIES = 4096
+# longer text is rarely repeated, interning it would only pin it in the table
+MAX_INTERNED_LENGTH = 80
+
+
+class LeafInterner:
+    """A size-bounded table of SharedLeafNodes, so that repeated inline leaves (the same
+    link, the same code span) are one object whose HTML is rendered once.
+
+    Holds at most max_entries leaves, dropping the least recently used. Leaves with
+    a value longer than max_length get a plain LeafNode of their own."""
+    def __init__(self, max_entries:int=DEFAULT_INTERN_ENTRIES, max_length:int=MAX_INTERNED_LENGTH) -> None:
+        if max_entries < 0 or max_length < 0:
+            raise ValueError("max_entries and max_length must not be negative")
+        self.max_entries = max_entries
+        self.max_length = max_length
+        self.hits = 0
+        self.misses = 0
+        self._entries:OrderedDict[tuple, SharedLeafNode] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def leaf(self, tag:str|None, value:str|None, props:dict[str, str]|None=None) -> LeafNode:
+        if value is not None and len(value) > self.max_length:
+            return LeafNode(tag, value, props)
+        key = (tag, value, tuple(props.items()) if props else None)
+        with self._lock:
+            node = self._entries.get(key)
+            if node is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return node
+            self.misses += 1
+            node = SharedLeafNode(tag, value, props)
+            self._entries[key] = node
+            if len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            return node
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict[str, int]:
+        return {"entries": len(self._entries), "max_entries": self.max_entries, "hits": self.hits, "misses": self.misses}
+
+
+# process wide, shared by every tree parsed in this process; set to None to stop interning
+LEAF_NODES:LeafInterner|None = LeafInterner()
+
+
+def _leaf(tag:str|None, value:str|None, props:dict[str, str]|None=None) -> LeafNode:
+    if LEAF_NODES is None:
+        return LeafNode(tag, value, props)
+    return LEAF_NODES.leaf(tag, value, props)
+
+
 def text_node_to_html_node(text_node:TextNode) -> HTMLNode:
+    """The leaf node for an inline TextNode, shared with identical leaves through LEAF_NODES"""
     match text_node.text_type:
         case TextType.TEXT:
-            return LeafNode(None, text_node.text)
+            return _leaf(None, text_node.text)
         case TextType.BOLD:
-            return LeafNode("b", text_node.text)
+            return _leaf("b", text_node.text)
         case TextType.ITALIC:
-            return LeafNode("i", text_node.text)
+            return _leaf("i", text_node.text)
         case TextType.CODE:
-            return LeafNode("code", text_node.text)
+            return _leaf("code", text_node.text)
         case TextType.HYPERLINK:
             if text_node.url is None:
                 raise ValueError("Hyperlink TextNode must have a URL")
-            return LeafNode("a", text_node.text, {"href": text_node.url})
+            return _leaf("a", text_node.text, {"href": text_node.url})
         case TextType.IMAGE:
             if text_node.url is None:
                 raise ValueError("Image TextNode must have a URL")
-            return LeafNode("img", None, {"src": text_node.url, "alt": text_node.text})
+            return _leaf("img", None, {"src": text_node.url, "alt": text_node.text})
         # cant really unittest for this so exclude from coverage
         case _: # pragma: no cover
             raise ValueError(f"Unhandled TextType: {text_node.text_type}")
 
+def text_node_to_html(text_node:TextNode) -> str:
+    """Render a TextNode straight to an HTML string, without building a LeafNode.
+
+    Produces the same output as text_node_to_html_node(text_node).to_html()."""
+    text = escape_html(text_node.text)
+    match text_node.text_type:
+        case TextType.TEXT:
+            return text
+        case TextType.BOLD:
+            return f"<b>{text}</b>"
+        case TextType.ITALIC:
+            return f"<i>{text}</i>"
+        case TextType.CODE:
+            return f"<code>{text}</code>"
+        case TextType.HYPERLINK:
+            if text_node.url is None:
+                raise ValueError("Hyperlink TextNode must have a URL")
+            return f'<a href="{escape_attr(text_node.url)}">{text}</a>'
+        case TextType.IMAGE:
+            if text_node.url is None:
+                raise ValueError("Image TextNode must have a URL")
+            return f'<img src="{escape_attr(text_node.url)}" alt="{escape_attr(text_node.text)}"></img>'
+        case _: # pragma: no cover
+            raise ValueError(f"Unhandled TextType: {text_node.text_type}")
+
 def convert_newlines_to_spaces(text:str) -> str:
     """Convert newlines in text to spaces, collapsing multiple spaces."""
     # collapse newlines to spaces
     return re.sub(r"\s*\n\s*", " ", text).strip()
 
 
+# The block helpers below do the markdown side of the block parsing and are shared by
+# the node tree parsers and the direct string renderer, so both always agree on the input.
 
-def parse_heading_block(block:str) -> HTMLNode:
-    """Parse a heading block and return an HTMLNode."""
+def _split_heading_block(block:str) -> tuple[int, str]:
     block = block.strip()
     match = re.match(r"^(#{1,6})\s+(.*)$", block, flags=re.DOTALL)
     if not match:
         raise ValueError(f"Invalid heading block: {block}")
-    level = len(match.group(1))
-    content = convert_newlines_to_spaces(match.group(2))
-    text_nodes = text_to_textnodes(content)
-    child_nodes = [text_node_to_html_node(text_node) for text_node in text_nodes]
-    return ParentNode(f"h{level}", children=child_nodes)
+    return len(match.group(1)), convert_newlines_to_spaces(match.group(2))
 
-def parse_code_block(block:str) -> HTMLNode:
+
+class TableOfContents:
+    """The headings of one page, collected while they are parsed.
+
+    Gives each heading a slug id, unique within the page: repeats get -1, -2, ... appended."""
+    def __init__(self) -> None:
+        self.entries:list[tuple[int, str, str]] = []
+        self._used_ids:set[str] = set()
+
+    def add(self, level:int, text:str) -> str:
+        """Record a heading with its plain text and return its id"""
+        base_id = slugify(text) or "section"
+        heading_id = base_id
+        suffix = 0
+        while heading_id in self._used_ids:
+            suffix += 1
+            heading_id = f"{base_id}-{suffix}"
+        self._used_ids.add(heading_id)
+        self.entries.append((level, heading_id, text))
+        return heading_id
+
+    def to_html(self) -> str:
+        """Nested lists of links to the headings, deeper levels nested under the heading before them.
+
+        Skipped levels nest one list deep, and headings above the first one's level join the outer list."""
+        parts = []
+        open_levels:list[int] = []
+        for level, heading_id, text in self.entries:
+            while len(open_levels) > 1 and level <= open_levels[-2]:
+                parts.append("</li></ul>")
+                open_levels.pop()
+            if not open_levels or level > open_levels[-1]:
+                parts.append("<ul>")
+                open_levels.append(level)
+            else:
+                parts.append("</li>")
+                open_levels[-1] = level
+            parts.append(f'<li><a href="#{escape_attr(heading_id)}">{escape_html(text)}</a>')
+        parts.append("</li></ul>" * len(open_levels))
+        return "".join(parts)
+
+
+def _heading_text(text_nodes:list[TextNode]) -> str:
+    # the plain text of a heading, for its id and its table of contents entry
+    return "".join(text_node.text for text_node in text_nodes)
+
+
+def collect_headings(blocks:Iterable[str]) -> TableOfContents:
+    """A TableOfContents of the heading blocks among blocks, without rendering anything else.
+
+    Gives the same ids as rendering the blocks does."""
+    toc = TableOfContents()
+    for block in blocks:
+        if block_to_block_type(block) == BlockType.HEADING:
+            level, content = _split_heading_block(block)
+            toc.add(level, _heading_text(text_to_textnodes(content)))
+    return toc
+
+# the info string after the opening fence: a single language word on its own line
+CODE_LANGUAGE_PATTERN = re.compile(r"([\w+#.-]+)[ \t]*\n")
+
+def _split_code_block(block:str) -> tuple[str|None, str]:
     block = block.strip()
     match = re.match(r"^```(.*)```$", block, flags=re.DOTALL)
     if not match: # pragma: no cover
         raise ValueError(f"Invalid code block: {block}")
-    match_text = match.group(1).lstrip()
-    return ParentNode("pre", children=[LeafNode("code", match_text)])
+    content = match.group(1)
+    language_match = CODE_LANGUAGE_PATTERN.match(content)
+    if language_match:
+        return language_match.group(1), content[language_match.end():]
+    return None, content.lstrip()
+
+def _code_props(language:str|None) -> dict[str, str]|None:
+    return {"class": f"language-{language}"} if language else None
 
-def parse_quote_block(block:str) -> HTMLNode:
+def _split_quote_block(block:str) -> list[str]:
     block = block.strip()
     # remove the quote markers
     quotelines = [ql.strip() for ql in re.split(r"^\s*>\s*", block, flags=re.MULTILINE) if ql.strip()]
-    child_nodes = []
+    lines = []
     for index, ql in enumerate(quotelines):
         ql = convert_newlines_to_spaces(ql)
         if index < len(quotelines) - 1:
             ql += "\n"  # add newline between lines if multiple lines
-        text_nodes = text_to_textnodes(ql)
-        html_nodes = [text_node_to_html_node(tn) for tn in text_nodes]
-        child_nodes.extend(html_nodes)
-    return ParentNode("blockquote", children=child_nodes)
+        lines.append(ql)
+    return lines
 
-def parse_unordered_list_block(block:str) -> HTMLNode:
-    block = block.strip()
-    list_items = [li.strip() for li in re.split(r"^\s*-\s+", block, flags=re.MULTILINE) if li.strip()]
+
+
+def text_to_children(text:str, stats:ParseStats|None=None, budget:ParseBudget|None=None) -> list[HTMLNode]:
+    """Parse inline markdown in text and return the matching list of HTMLNodes."""
+    text_nodes = text_to_textnodes(text, budget)
+    if stats is not None:
+        stats.count_text_nodes(text_nodes)
+    return [text_node_to_html_node(text_node) for text_node in text_nodes]
+
+def parse_heading_block(block:str, stats:ParseStats|None=None, toc:TableOfContents|None=None, budget:ParseBudget|None=None) -> HTMLNode:
+    """Parse a heading block and return an HTMLNode, with an id from the page's TableOfContents."""
+    level, content = _split_heading_block(block)
+    text_nodes = text_to_textnodes(content, budget)
+    if stats is not None:
+        stats.count_text_nodes(text_nodes)
+    heading_id = (toc if toc is not None else TableOfContents()).add(level, _heading_text(text_nodes))
+    return ParentNode(f"h{level}", children=[text_node_to_html_node(text_node) for text_node in text_nodes], props={"id": heading_id})
+
+def parse_code_block(block:str) -> HTMLNode:
+    language, code = _split_code_block(block)
+    # only code blocks that declare a language are highlighted
+    tokens = highlight(language, code) if language else None
+    if not tokens:
+        return ParentNode("pre", children=[LeafNode("code", code, _code_props(language))])
+    code_children = [
+        LeafNode("span", text, {"class": f"tok-{token_type}"}) if token_type else LeafNode(None, text)
+        for token_type, text in tokens
+    ]
+    return ParentNode("pre", children=[ParentNode("code", children=code_children, props=_code_props(language))])
+
+def parse_quote_block(block:str, stats:ParseStats|None=None, budget:ParseBudget|None=None) -> HTMLNode:
     child_nodes = []
-    for li in list_items:
-        li = convert_newlines_to_spaces(li)
-        text_nodes = text_to_textnodes(li)
-        html_nodes = [text_node_to_html_node(tn) for tn in text_nodes]
-        li_wrapper = ParentNode("li", children=html_nodes)
-        child_nodes.append(li_wrapper)
-    return ParentNode("ul", children=child_nodes)
-
-def parse_ordered_list_block(block:str) -> HTMLNode:
-    block = block.strip()
-    # this will be pretty similar to unordered list parsing
-    # also remember that the numbers don't matter since they are auto-numbered in HTML
-    list_items = [li.strip() for li in re.split(r"^\s*\d+\.\s+", block, flags=re.MULTILINE) if li.strip()]
+    for ql in _split_quote_block(block):
+        child_nodes.extend(text_to_children(ql, stats, budget))
+    return ParentNode("blockquote", children=child_nodes)
+
+def list_block_to_html_node(list_block:ListBlock, stats:ParseStats|None=None, budget:ParseBudget|None=None) -> HTMLNode:
+    """Convert a parsed (possibly nested) list into ul/ol nodes"""
     child_nodes = []
-    for li in list_items:
-        li = convert_newlines_to_spaces(li)
-        text_nodes = text_to_textnodes(li)
-        html_nodes = [text_node_to_html_node(tn) for tn in text_nodes]
-        li_wrapper = ParentNode("li", children=html_nodes)
-        child_nodes.append(li_wrapper)
-    return ParentNode("ol", children=child_nodes)
+    for item in list_block.items:
+        text = item.text()
+        li_children = text_to_children(text, stats, budget) if text else []
+        li_children.extend(list_block_to_html_node(sublist, stats, budget) for sublist in item.sublists)
+        # items without any content are dropped
+        if li_children:
+            child_nodes.append(ParentNode("li", children=li_children))
+    return ParentNode("ol" if list_block.ordered else "ul", children=child_nodes)
+
+def parse_unordered_list_block(block:str, stats:ParseStats|None=None, budget:ParseBudget|None=None) -> HTMLNode:
+    return list_block_to_html_node(parse_list_block(block, ordered=False), stats, budget)
+
+def parse_ordered_list_block(block:str, stats:ParseStats|None=None, budget:ParseBudget|None=None) -> HTMLNode:
+    # the numbers don't matter since they are auto-numbered in HTML
+    return list_block_to_html_node(parse_list_block(block, ordered=True), stats, budget)
+
+def _table_cell_node(tag:str, text:str, alignment:str|None, stats:ParseStats|None=None, budget:ParseBudget|None=None) -> HTMLNode:
+    props = {"align": alignment} if alignment else None
+    children = text_to_children(text, stats, budget) if text else []
+    if not children:
+        # empty cells are allowed in tables, unlike empty parent nodes, including cells like `` that parse to nothing
+        return LeafNode(tag, "", props)
+    return ParentNode(tag, children=children, props=props)
+
+def parse_table_block(block:str, stats:ParseStats|None=None, budget:ParseBudget|None=None) -> HTMLNode:
+    """Parse a GFM pipe table into table/thead/tbody nodes, splitting body rows one at a time"""
+    header, alignments, rows = split_table_block(block)
+    head_row = ParentNode("tr", children=[_table_cell_node("th", cell, align, stats, budget) for cell, align in zip(header, alignments)])
+    table_children = [ParentNode("thead", children=[head_row])]
+    body_rows = [
+        ParentNode("tr", children=[_table_cell_node("td", cell, align, stats, budget) for cell, align in zip(row, alignments)])
+        for row in rows
+    ]
+    if body_rows:
+        table_children.append(ParentNode("tbody", children=body_rows))
+    return ParentNode("table", children=table_children)
+
+def parse_paragraph_block(block:str, stats:ParseStats|None=None, budget:ParseBudget|None=None) -> HTMLNode:
+    return ParentNode("p", children=text_to_children(convert_newlines_to_spaces(block), stats, budget))
+
+
+def _parse_block(block:str, block_type:BlockType, stats:ParseStats|None=None, toc:TableOfContents|None=None, budget:ParseBudget|None=None) -> HTMLNode:
+    match block_type:
+        case BlockType.HEADING:
+            return parse_heading_block(block, stats, toc, budget)
+        case BlockType.CODEBLOCK:
+            return parse_code_block(block)
+        case BlockType.QUOTE:
+            return parse_quote_block(block, stats, budget)
+        case BlockType.UNORDERED_LIST:
+            return parse_unordered_list_block(block, stats, budget)
+        case BlockType.ORDERED_LIST:
+            return parse_ordered_list_block(block, stats, budget)
+        case BlockType.TABLE:
+            return parse_table_block(block, stats, budget)
+        case BlockType.PARAGRAPH:
+            return parse_paragraph_block(block, stats, budget)
+        case _: # pragma: no cover
+            raise ValueError(f"Unhandled BlockType {block_type} for block: {block}")
+
+
+# the tag of each block type's node, known without parsing the block
+_BLOCK_TAGS = {
+    BlockType.CODEBLOCK: "pre",
+    BlockType.QUOTE: "blockquote",
+    BlockType.UNORDERED_LIST: "ul",
+    BlockType.ORDERED_LIST: "ol",
+    BlockType.TABLE: "table",
+    BlockType.PARAGRAPH: "p",
+}
+
+
+class LazyBlockNode(HTMLNode):
+    """A block of a lazily parsed document, holding its markdown until the node is needed.
+
+    The block is parsed the first time its children, props or HTML are asked for, and
+    the node is kept from then on. The tag is known up front. Compares equal to and
+    renders the same as the node it stands for."""
+    def __init__(self, block:str, block_type:BlockType) -> None:
+        self.tag = _BLOCK_TAGS[block_type]
+        self.value = None
+        self.block = block
+        self.block_type = block_type
+        self._node:HTMLNode|None = None
 
+    @property
+    def materialized(self) -> bool:
+        return self._node is not None
 
+    def materialize(self) -> HTMLNode:
+        """Parse the block, once, and return its node"""
+        if self._node is None:
+            try:
+                self._node = _parse_block(self.block, self.block_type)
+            except ValueError as e:
+                raise block_error(e, self.block)
+        return self._node
 
-def markdown_to_html_node(markdown:str) -> HTMLNode:
-    """Convert markdown string to HTMLNode tree."""
-    blocks = markdown_to_blocks(markdown)
+    @property
+    def children(self) -> list[HTMLNode]|None:
+        return self.materialize().children
+
+    @property
+    def props(self) -> dict[str, str]|None:
+        return self.materialize().props
+
+    def to_html(self) -> str:
+        return self.materialize().to_html()
+
+    def __eq__(self, other:object) -> bool:
+        if isinstance(other, LazyBlockNode):
+            other = other.materialize()
+        return self.materialize() == other
+
+    def __repr__(self) -> str:
+        if self._node is None:
+            return f"LazyBlockNode({self.block_type.value}, {len(self.block)} chars)"
+        return repr(self._node)
+
+
+def markdown_to_html_node(markdown:str, budget:ParseBudget|None=None, stats:ParseStats|None=None, toc:TableOfContents|None=None, lazy:bool=False) -> HTMLNode:
+    """Convert markdown string to HTMLNode tree.
+
+    An optional ParseBudget is charged per block and by the inline parsing of each block,
+    and raises ParseBudgetExceeded when used up.
+    An optional ParseStats counts the blocks, inline text nodes and HTML nodes of the tree.
+    An optional TableOfContents collects the headings as they are parsed.
+    When lazy, only headings are parsed up front and every other block is a LazyBlockNode."""
+    return blocks_to_html_node(markdown_to_blocks(markdown), budget, stats, toc, lazy)
+
+def blocks_to_html_node(blocks:list[str], budget:ParseBudget|None=None, stats:ParseStats|None=None, toc:TableOfContents|None=None, lazy:bool=False) -> HTMLNode:
+    """Convert already split markdown blocks to an HTMLNode tree."""
+    if lazy and stats is not None:
+        raise ValueError("ParseStats count the whole tree, they cannot be collected from a lazy one")
+    # heading ids are unique per document
+    if toc is None:
+        toc = TableOfContents()
     child_nodes = []
     for block in blocks:
+        if budget is not None:
+            budget.charge(len(block))
         block_type = block_to_block_type(block)
-        match block_type:
-            case BlockType.HEADING:
-                # Placeholder for heading block handling
-                child_nodes.append(parse_heading_block(block))
-            case BlockType.CODEBLOCK:
-                # Placeholder for code block handling
-                child_nodes.append(parse_code_block(block))
-            case BlockType.QUOTE:
-                # Placeholder for quote block handling
-                child_nodes.append(parse_quote_block(block))
-            case BlockType.UNORDERED_LIST:
-                # Placeholder for unordered list block handling
-                child_nodes.append(parse_unordered_list_block(block))
-            case BlockType.ORDERED_LIST:
-                # Placeholder for ordered list block handling
-                child_nodes.append(parse_ordered_list_block(block))
-            case BlockType.PARAGRAPH:
-                # Placeholder for paragraph block handling
-                block = convert_newlines_to_spaces(block)
-                text_nodes = text_to_textnodes(block)
-                para_child_nodes = [text_node_to_html_node(text_node) for text_node in text_nodes]
-                child_nodes.append(ParentNode("p", children=para_child_nodes))
-            case _: # pragma: no cover
-                raise ValueError(f"Unhandled BlockType {block_type} for block: {block}")
+        if stats is not None:
+            stats.count_block(block_type)
+        # headings are parsed in document order even in a lazy tree, for their ids
+        if lazy and block_type != BlockType.HEADING:
+            child_nodes.append(LazyBlockNode(block, block_type))
+        else:
+            try:
+                child_nodes.append(_parse_block(block, block_type, stats, toc, budget))
+            except ValueError as e:
+                raise block_error(e, block)
     root = ParentNode("div", children=child_nodes)
-    return root
\ No newline at end of file
+    if stats is not None:
+        stats.count_tree(root)
+    return root
+
+
+# Direct string rendering: same output as markdown_to_html_node(...).to_html(), but
+# without allocating LeafNode/ParentNode objects for every block and inline token.
+
+def _wrap_html(tag:str, children_html:list[str]) -> str:
+    # mirror ParentNode.to_html, which refuses to render a parent without children
+    if not children_html:
+        raise ValueError("Parent nodes must have children")
+    return f"<{tag}>{''.join(children_html)}</{tag}>"
+
+def text_to_html(text:str, budget:ParseBudget|None=None) -> list[str]:
+    """Parse inline markdown in text and return the rendered HTML of each inline token."""
+    return [text_node_to_html(text_node) for text_node in text_to_textnodes(text, budget)]
+
+def list_block_to_html(list_block:ListBlock, budget:ParseBudget|None=None) -> str:
+    """Render a parsed (possibly nested) list directly to an HTML string"""
+    items = []
+    for item in list_block.items:
+        text = item.text()
+        li_parts = text_to_html(text, budget) if text else []
+        li_parts.extend(list_block_to_html(sublist, budget) for sublist in item.sublists)
+        if li_parts:
+            items.append(_wrap_html("li", li_parts))
+    return _wrap_html("ol" if list_block.ordered else "ul", items)
+
+def _table_cell_html(tag:str, text:str, alignment:str|None, budget:ParseBudget|None=None) -> str:
+    open_tag = f'<{tag} align="{escape_attr(alignment)}">' if alignment else f"<{tag}>"
+    return f"{open_tag}{''.join(text_to_html(text, budget)) if text else ''}</{tag}>"
+
+def iter_table_html(block:str, budget:ParseBudget|None=None):
+    """Yield the HTML of a table block piece by piece, one body row at a time"""
+    header, alignments, rows = split_table_block(block)
+    yield "<table><thead><tr>"
+    yield "".join(_table_cell_html("th", cell, align, budget) for cell, align in zip(header, alignments))
+    yield "</tr></thead>"
+    in_body = False
+    for row in rows:
+        if not in_body:
+            yield "<tbody>"
+            in_body = True
+        yield "<tr>" + "".join(_table_cell_html("td", cell, align, budget) for cell, align in zip(row, alignments)) + "</tr>"
+    if in_body:
+        yield "</tbody>"
+    yield "</table>"
+
+def block_to_html(block:str, block_type:BlockType|None=None, toc:TableOfContents|None=None, budget:ParseBudget|None=None) -> str:
+    """Render a single markdown block directly to an HTML string, recording headings in toc."""
+    if block_type is None:
+        block_type = block_to_block_type(block)
+    match block_type:
+        case BlockType.HEADING:
+            level, content = _split_heading_block(block)
+            text_nodes = text_to_textnodes(content, budget)
+            if not text_nodes:
+                raise ValueError("Parent nodes must have children")
+            heading_id = (toc if toc is not None else TableOfContents()).add(level, _heading_text(text_nodes))
+            return f'<h{level} id="{escape_attr(heading_id)}">{"".join(text_node_to_html(text_node) for text_node in text_nodes)}</h{level}>'
+        case BlockType.CODEBLOCK:
+            language, code = _split_code_block(block)
+            tokens = highlight(language, code) if language else None
+            if tokens:
+                code = "".join(f'<span class="tok-{token_type}">{escape_html(text)}</span>' if token_type else escape_html(text) for token_type, text in tokens)
+            else:
+                code = escape_html(code)
+            if language:
+                return f'<pre><code class="language-{escape_attr(language)}">{code}</code></pre>'
+            return f"<pre><code>{code}</code></pre>"
+        case BlockType.QUOTE:
+            parts = []
+            for ql in _split_quote_block(block):
+                parts.extend(text_to_html(ql, budget))
+            return _wrap_html("blockquote", parts)
+        case BlockType.UNORDERED_LIST:
+            return list_block_to_html(parse_list_block(block, ordered=False), budget)
+        case BlockType.ORDERED_LIST:
+            return list_block_to_html(parse_list_block(block, ordered=True), budget)
+        case BlockType.TABLE:
+            return "".join(iter_table_html(block, budget))
+        case BlockType.PARAGRAPH:
+            return _wrap_html("p", text_to_html(convert_newlines_to_spaces(block), budget))
+        case _: # pragma: no cover
+            raise ValueError(f"Unhandled BlockType {block_type} for block: {block}")
+
+def blocks_to_html(blocks:list[str], budget:ParseBudget|None=None, toc:TableOfContents|None=None) -> str:
+    """Render already split markdown blocks to an HTML string wrapped in a div."""
+    if toc is None:
+        toc = TableOfContents()
+    parts = []
+    for block in blocks:
+        if budget is not None:
+            budget.charge(len(block))
+        try:
+            parts.append(block_to_html(block, toc=toc, budget=budget))
+        except ValueError as e:
+            raise block_error(e, block)
+    return _wrap_html("div", parts)
+
+def iter_blocks_html(blocks:Iterable[str], budget:ParseBudget|None=None, toc:TableOfContents|None=None) -> Iterator[str]:
+    """Render blocks one at a time, yielding the HTML in pieces that join to blocks_to_html(blocks).
+
+    Neither the blocks nor the rendered HTML are held, so blocks may be a lazy iterator."""
+    if toc is None:
+        toc = TableOfContents()
+    empty = True
+    for block in blocks:
+        if budget is not None:
+            budget.charge(len(block))
+        if empty:
+            yield "<div>"
+            empty = False
+        try:
+            block_type = block_to_block_type(block)
+            if block_type is BlockType.TABLE:
+                # a table's rows are rendered and written one at a time, not joined first
+                yield from iter_table_html(block, budget)
+            else:
+                yield block_to_html(block, block_type, toc=toc, budget=budget)
+        except ValueError as e:
+            raise block_error(e, block)
+    if empty:
+        raise ValueError("Parent nodes must have children")
+    yield "</div>"
+
+def markdown_to_html(markdown:str, budget:ParseBudget|None=None, toc:TableOfContents|None=None) -> str:
+    """Convert markdown string straight to an HTML string.
+
+    Equivalent to markdown_to_html_node(markdown).to_html(), but skips building the
+    HTMLNode tree. Use markdown_to_html_node when the tree itself is needed."""
+    return blocks_to_html(markdown_to_blocks(markdown), budget, toc)
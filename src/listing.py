@@ -0,0 +1,201 @@
+import hashlib
+import heapq
+import itertools
+import os
+import pickle
+import tempfile
+from typing import Callable, Iterable, Iterator
+
+from frontmatter import MetaValue
+from htmlnode import HTMLNode, LeafNode, ParentNode, TableOfContents
+from parsing import slugify
+
+
+POSTS_PER_PAGE = 10
+# number of records sorted in memory before a sorted run is spilled to disk
+SORT_RUN_SIZE = 10_000
+
+
+class PageRecord:
+    """The metadata of one built page, small enough to keep for every page of a large site"""
+    def __init__(self, url:str, title:str, date:str|None=None, tags:list[str]|None=None, source:str|None=None) -> None:
+        self.url = url
+        self.title = title
+        self.date = date
+        self.tags = tags or []
+        self.source = source
+
+    @classmethod
+    def from_metadata(cls, url:str, title:str, metadata:dict[str, MetaValue], source:str|None=None) -> 'PageRecord':
+        date = metadata.get("date")
+        tags = metadata.get("tags") or []
+        # a single tag may be written without a list, and front matter can read it as a number or a bool
+        if not isinstance(tags, list):
+            tags = [tags]
+        return cls(url, title, str(date) if date else None, [str(tag) for tag in tags], source)
+
+    def to_dict(self) -> dict[str, str|list[str]|None]:
+        return {"url": self.url, "title": self.title, "date": self.date, "tags": self.tags, "source": self.source}
+
+    @classmethod
+    def from_dict(cls, data:dict) -> 'PageRecord':
+        return cls(data["url"], data["title"], data.get("date"), data.get("tags"), data.get("source"))
+
+    def sort_key(self) -> tuple[str, str]:
+        # undated pages sort as the oldest
+        return (self.date or "", self.url)
+
+    def __eq__(self, other:object) -> bool:
+        if not isinstance(other, PageRecord):
+            return False
+        return (self.url == other.url and self.title == other.title and self.date == other.date
+                and self.tags == other.tags and self.source == other.source)
+
+    def __repr__(self) -> str:
+        return f"PageRecord({self.url}, {self.title}, {self.date}, {self.tags})"
+
+
+class ListingPage:
+    """A generated listing page: a heading, a list of (label, url, note) links and the
+    (label, url) links to the pages around it.
+
+    Titles and tags are page data, not markdown, so the page is built as nodes and they
+    are shown exactly as written."""
+    def __init__(self, url:str, title:str, links:list[tuple[str, str, str|None]], nav_links:list[tuple[str, str]]|None=None) -> None:
+        self.url = url
+        self.title = title
+        self.links = links
+        self.nav_links = nav_links or []
+
+    def to_html_node(self, toc:TableOfContents) -> HTMLNode:
+        """The page content, with its heading recorded in toc"""
+        items = []
+        for label, url, note in self.links:
+            children:list[HTMLNode] = [LeafNode("a", label, {"href": url})]
+            if note:
+                children.append(LeafNode(None, f" ({note})"))
+            items.append(ParentNode("li", children))
+        children = [ParentNode("h1", [LeafNode(None, self.title)], {"id": toc.add(1, self.title)}), ParentNode("ul", items)]
+        if self.nav_links:
+            nav:list[HTMLNode] = []
+            for label, url in self.nav_links:
+                if nav:
+                    nav.append(LeafNode(None, " | "))
+                nav.append(LeafNode("a", label, {"href": url}))
+            children.append(ParentNode("p", nav))
+        return ParentNode("div", children)
+
+    def __repr__(self) -> str:
+        return f"ListingPage({self.url}, {self.title})"
+
+
+def _spill_run(items:list, key:Callable, reverse:bool, tmp_dir:str) -> str:
+    items.sort(key=key, reverse=reverse)
+    fd, path = tempfile.mkstemp(suffix=".run", dir=tmp_dir)
+    with os.fdopen(fd, 'wb') as f:
+        for item in items:
+            pickle.dump(item, f, protocol=pickle.HIGHEST_PROTOCOL)
+    return path
+
+
+def _read_run(path:str) -> Iterator:
+    with open(path, 'rb') as f:
+        while True:
+            try:
+                yield pickle.load(f)
+            except EOFError:
+                return
+
+
+def external_sort(items:Iterable, key:Callable, reverse:bool=False, run_size:int=SORT_RUN_SIZE) -> Iterator:
+    """Sort items of any size with bounded memory.
+
+    Items are sorted in runs of run_size, each run is spilled to a temporary file and
+    the runs are lazily merged back together. Inputs that fit in one run never touch disk."""
+    items = iter(items)
+    first_run = list(itertools.islice(items, run_size))
+    if len(first_run) < run_size:
+        first_run.sort(key=key, reverse=reverse)
+        yield from first_run
+        return
+
+    with tempfile.TemporaryDirectory(prefix="sort-runs-") as tmp_dir:
+        run_paths = [_spill_run(first_run, key, reverse, tmp_dir)]
+        del first_run
+        while run := list(itertools.islice(items, run_size)):
+            run_paths.append(_spill_run(run, key, reverse, tmp_dir))
+        yield from heapq.merge(*(_read_run(path) for path in run_paths), key=key, reverse=reverse)
+
+
+def paginate(items:Iterable, per_page:int) -> Iterator[tuple[list, bool]]:
+    """Yield (page_items, has_next_page) chunks, looking only one page ahead"""
+    items = iter(items)
+    page = list(itertools.islice(items, per_page))
+    while page:
+        next_page = list(itertools.islice(items, per_page))
+        yield page, bool(next_page)
+        page = next_page
+
+
+def page_url(base_url:str, page_number:int) -> str:
+    if page_number == 1:
+        return base_url
+    return f"{base_url.rstrip('/')}/page/{page_number}"
+
+
+def _nav_links(base_url:str, page_number:int, has_next:bool) -> list[tuple[str, str]]:
+    nav_links = []
+    if page_number > 1:
+        nav_links.append(("< Newer posts", page_url(base_url, page_number - 1)))
+    if has_next:
+        nav_links.append(("Older posts >", page_url(base_url, page_number + 1)))
+    return nav_links
+
+
+def tag_slug(tag:str) -> str:
+    """The url slug of a tag's pages, a tag without letters or digits gets one from its hash"""
+    # an empty slug would put the tag's pages at /tags, in place of the tag index
+    return slugify(tag) or f"tag-{hashlib.sha256(tag.encode('utf-8')).hexdigest()[:8]}"
+
+
+def paginated_listing(records:Iterable[PageRecord], title:str, base_url:str, per_page:int=POSTS_PER_PAGE) -> Iterator[ListingPage]:
+    """Yield listing pages for records that are already in listing order"""
+    for page_number, (page_records, has_next) in enumerate(paginate(records, per_page), start=1):
+        page_title = title if page_number == 1 else f"{title} (page {page_number})"
+        yield ListingPage(
+            page_url(base_url, page_number),
+            page_title,
+            [(record.title, record.url, record.date) for record in page_records],
+            _nav_links(base_url, page_number, has_next),
+        )
+
+
+def generate_listing_pages(records:list[PageRecord], per_page:int=POSTS_PER_PAGE, run_size:int=SORT_RUN_SIZE) -> Iterator[ListingPage]:
+    """Generate the blog archive, per tag pages and a tag index from page records.
+
+    Only the small records are held, never the rendered pages. The archive and the
+    (tag, record) pairs go through external sorts, so listings stay bounded in memory
+    and each page of the listing is produced as the merge streams past."""
+    tag_counts:dict[str, int] = {}
+    tag_slugs:dict[str, str] = {}
+
+    def tagged_records() -> Iterator[tuple[str, PageRecord]]:
+        for record in records:
+            for tag in record.tags:
+                slug = tag_slug(tag)
+                tag_slugs.setdefault(slug, tag)
+                tag_counts[slug] = tag_counts.get(slug, 0) + 1
+                yield slug, record
+
+    archive = external_sort(records, key=PageRecord.sort_key, reverse=True, run_size=run_size)
+    yield from paginated_listing(archive, "Blog posts", "/blog", per_page)
+
+    by_tag = external_sort(
+        tagged_records(), key=lambda pair: (pair[0], pair[1].sort_key()), reverse=True, run_size=run_size
+    )
+    for slug, pairs in itertools.groupby(by_tag, key=lambda pair: pair[0]):
+        tag_records = (record for _, record in pairs)
+        yield from paginated_listing(tag_records, f"Posts tagged {tag_slugs[slug]}", f"/tags/{slug}", per_page)
+
+    if tag_counts:
+        yield ListingPage("/tags", "Tags", [(tag_slugs[slug], f"/tags/{slug}", str(tag_counts[slug])) for slug in sorted(tag_counts)])
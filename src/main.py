@@ -1,127 +1,94 @@
 import os
-import shutil
 import sys
 
-from htmlnode import markdown_to_html_node
-from parsing import extract_title
+from config import load_config
+
+# the project with content/, static/ and its site.toml is the directory above src/
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 
 
 def scratchpad():
     pass
 
 
-def clear_directory(path:str) -> bool:
-    """Given a directory path, clear its contents"""
-    # print(f"Clearing directory: {path}")
-    if not os.path.exists(path):
-        return False
-
-    for path_item in os.listdir(path):
-        item_path = os.path.join(path, path_item)
-        if os.path.isfile(item_path):
-            os.remove(item_path)
-        elif os.path.isdir(item_path):
-            if not clear_directory(item_path):
-                return False
-            os.rmdir(item_path)
-
-    return True
-
-
-def copy_directory(src:str, dst:str) -> bool:
-    """Copy the contents of one directory to another"""
-    # print(f"Copying from {src} to {dst}")
-    if not os.path.exists(src):
-        return False
-
-    if not os.path.exists(dst):
-        os.mkdir(dst)
-
-    for item in os.listdir(src):
-        src_item = os.path.join(src, item)
-        dst_item = os.path.join(dst, item)
-
-        if os.path.isdir(src_item):
-            if not copy_directory(src_item, dst_item):
-                return False
-        else:
-            shutil.copy2(src_item, dst_item)
-
-    return True
-
-def prepare_directory(src:str, dst:str) -> bool:
-    """Prepare a directory by clearing it and copying new contents"""
-    # first make sure src and dst are absolute paths
-    if not os.path.isabs(src) or not os.path.isabs(dst):
-        raise ValueError("Both src and dst must be absolute paths")
-
-    # next clear and then copy src to dst
-    if not clear_directory(dst):
-        return False
-    if not copy_directory(src, dst):
-        return False
-
-    return True
-
-
-def generate_page(from_path:str, template_path:str, dest_path:str) -> None:
-    print (f"Generating page from {from_path}  to {dest_path} using {template_path}")
-    # read the source file
-    content_md = ""
-    with open(from_path, 'r', encoding='utf-8') as f:
-        content_md = f.read()
-    # read the template file
-    template_html = ""
-    with open(template_path, 'r', encoding='utf-8') as f:
-        template_html = f.read()
-
-    title_text = extract_title(content_md)
-    content_html = markdown_to_html_node(content_md).to_html()
-
-    title_template_str = "{{ Title }}"
-    content_template_str = "{{ Content }}"
-
-    # replace the template strings with the actual content
-    output_html = template_html.replace(title_template_str, title_text)
-    output_html = output_html.replace(content_template_str, content_html)
-
-    # write output_html to dest_path
-    with open(dest_path, 'w', encoding='utf-8') as f:
-        f.write(output_html)
-
+def main(command:str="build", target_dir:str|None=None, stats_path:str|None=None, stats_format:str="json", shard:str|None=None, config_path:str|None=None):
+    try:
+        config = load_config(PROJECT_DIR, config_path)
+    except ValueError as e:
+        print(f"Error reading config: {e}")
+        sys.exit(1)
+    # imported once the arguments and config are known good, so --help and usage errors don't load the renderer
+    import build
+    build.set_cache_limits(config.render_cache_bytes, config.intern_entries, config.mmap_min_size)
+    io_workers = config.io_workers if config.io_workers is not None else build.DEFAULT_IO_WORKERS
+
+    if command == "deps":
+        from deps import DEPS_NAME, DependencyGraph
+        try:
+            for dependency in build.query_dependencies(DependencyGraph.load(os.path.join(config.state_dir, DEPS_NAME)), config.public_dir, target_dir):
+                print(dependency)
+        except ValueError as e:
+            print(f"Error querying dependencies: {e}")
+            sys.exit(1)
+        return
 
-def main():
-    # first determine what our script's current directory is
-    script_dir = os.path.dirname(os.path.abspath(__file__))
-    base_dir = os.path.dirname(script_dir)
-    # next build the paths we need
-    public_dir = os.path.join(base_dir, "public")
-    static_dir = os.path.join(base_dir, "static")
+    if command == "deploy":
+        try:
+            build.deploy_site(config.public_dir, config.state_dir, target_dir)
+        except Exception as e:
+            print(f"Error deploying: {e}")
+            sys.exit(1)
+        return
 
-    try:
-        if not prepare_directory(static_dir, public_dir):
-            print("Failed to prepare the public directory")
+    if command == "merge":
+        try:
+            build.merge_shards(config.content_dir, config.static_dir, config.template_path, config.public_dir, config.state_dir, stages=config.stages)
+        except Exception as e:
+            print(f"Error merging shards: {e}")
             sys.exit(1)
-    except Exception as e:
-        print(f"Error preparing directories: {e}")
-        sys.exit(1)
+        return
 
-    content_dir = os.path.join(base_dir, "content")
-    content_file_path = os.path.join(content_dir, "index.md")
-    template_file_path = os.path.join(base_dir, "template.html")
-    output_file_path = os.path.join(public_dir, "index.html")
+    from shards import parse_shard
+    from stats import SiteStats
+    site_stats = SiteStats() if stats_path else None
     try:
-        generate_page(content_file_path, template_file_path, output_file_path)
+        if shard is not None:
+            index, count = parse_shard(shard)
+            build.build_shard(config.content_dir, config.static_dir, config.template_path, config.state_dir, index, count, workers=config.workers, site_stats=site_stats, io_workers=io_workers)
+        else:
+            build.build_site(config.content_dir, config.static_dir, config.template_path, config.public_dir, workers=config.workers, site_stats=site_stats, state_dir=config.state_dir, io_workers=io_workers, stages=config.stages)
+    except build.BuildError as e:
+        print(f"Build failed, {e}")
+        sys.exit(1)
     except Exception as e:
         print(f"Error generating page: {e}")
         sys.exit(1)
 
+    if site_stats is not None:
+        from atomic import atomic_write
+        print(f"Writing {stats_format} build stats to {stats_path}")
+        atomic_write(stats_path, site_stats.export(stats_format))
+
 
 if __name__ == "__main__":
-    import sys
-    if len(sys.argv) > 1 and sys.argv[1] == "scratch":
+    import argparse
+    parser = argparse.ArgumentParser(description="Build the static site from content/ into public/, or deploy the last build; site.toml can change the directories and settings")
+    parser.add_argument("command", nargs="?", choices=["build", "merge", "deploy", "deps", "scratch"], default="build",
+                        help="merge: combine the shards built with --shard into public/")
+    parser.add_argument("target", nargs="?", help="deploy: the directory to mirror public/ into, standing in for object storage; "
+                        "deps: an output under public/ to list the inputs of, or an input to list the outputs of")
+    parser.add_argument("--stats", metavar="PATH", help="write per page and site-wide parse stats to PATH")
+    parser.add_argument("--stats-format", choices=["json", "prometheus"], default="json")
+    parser.add_argument("--shard", metavar="i/N", help="build only shard i of N of the content pages, for merge to combine")
+    parser.add_argument("--config", metavar="PATH", help="read the directories, workers, cache limits and stages from PATH instead of site.toml")
+    args = parser.parse_args()
+    if args.command == "scratch":
         result = scratchpad()
         if result is not None:
             print(result)
     else:
-        main()
\ No newline at end of file
+        if args.command in ("deploy", "deps") and not args.target:
+            parser.error(f"{args.command} needs a path")
+        if args.shard is not None and args.command != "build":
+            parser.error("--shard only applies to build")
+        main(args.command, args.target, args.stats, args.stats_format, args.shard, args.config)
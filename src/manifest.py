@@ -0,0 +1,146 @@
+import hashlib
+import itertools
+import json
+import os
+import shutil
+
+from atomic import atomic_open, atomic_write
+
+
+# a manifest maps each output path (relative, with / separators) to its sha256 hex digest
+Manifest = dict[str, str]
+
+MANIFEST_NAME = "manifest.json"
+DELTA_NAME = "delta.json"
+# kept in a deploy target to record what it was last mirrored from
+TARGET_MANIFEST_NAME = ".manifest.json"
+COPY_CHUNK_SIZE = 1024 * 1024
+
+
+def hash_file(path:str) -> str:
+    with open(path, 'rb') as f:
+        return hashlib.file_digest(f, "sha256").hexdigest()
+
+
+def copy_hashed(source_path:str, target_path:str) -> str:
+    """Copy a file with its permission bits and times, returning the sha256 hex digest
+    of its contents, taken from the chunks as they are copied"""
+    digest = hashlib.sha256()
+    with open(source_path, 'rb') as src, open(target_path, 'wb') as dst:
+        while chunk := src.read(COPY_CHUNK_SIZE):
+            digest.update(chunk)
+            dst.write(chunk)
+    shutil.copystat(source_path, target_path)
+    return digest.hexdigest()
+
+
+def hash_tree(directory:str) -> Manifest:
+    """Hash every file under directory, except a deploy target's own manifest"""
+    manifest = {}
+    for root, dirs, files in os.walk(directory):
+        dirs.sort()
+        for name in sorted(files):
+            path = os.path.join(root, name)
+            rel_path = os.path.relpath(path, directory).replace(os.sep, "/")
+            if rel_path != TARGET_MANIFEST_NAME:
+                manifest[rel_path] = hash_file(path)
+    return manifest
+
+
+def read_manifest(path:str) -> Manifest:
+    """Read a manifest file, a missing file is an empty manifest"""
+    if not os.path.exists(path):
+        return {}
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def write_manifest(path:str, manifest:Manifest) -> None:
+    atomic_write(path, json.dumps(manifest, indent=2, sort_keys=True) + "\n")
+
+
+class ManifestDelta:
+    """The output paths added, modified and deleted between two manifests, with their hashes.
+
+    Deleted paths keep the hash they had in the old manifest."""
+    def __init__(self, added:Manifest, modified:Manifest, deleted:Manifest) -> None:
+        self.added = added
+        self.modified = modified
+        self.deleted = deleted
+
+    @classmethod
+    def between(cls, old:Manifest, new:Manifest) -> 'ManifestDelta':
+        added = {path: digest for path, digest in new.items() if path not in old}
+        modified = {path: digest for path, digest in new.items() if path in old and old[path] != digest}
+        deleted = {path: digest for path, digest in old.items() if path not in new}
+        return cls(added, modified, deleted)
+
+    def __bool__(self) -> bool:
+        return bool(self.added or self.modified or self.deleted)
+
+    def to_dict(self) -> dict[str, Manifest]:
+        return {
+            "added": dict(sorted(self.added.items())),
+            "modified": dict(sorted(self.modified.items())),
+            "deleted": dict(sorted(self.deleted.items())),
+        }
+
+    def __eq__(self, other:object) -> bool:
+        if not isinstance(other, ManifestDelta):
+            return False
+        return self.to_dict() == other.to_dict()
+
+    def __repr__(self) -> str:
+        return f"ManifestDelta(added={len(self.added)}, modified={len(self.modified)}, deleted={len(self.deleted)})"
+
+
+def write_delta(path:str, delta:ManifestDelta) -> None:
+    atomic_write(path, json.dumps(delta.to_dict(), indent=2) + "\n")
+
+
+def _remove_empty_parents(path:str, root_dir:str) -> None:
+    parent_dir = os.path.dirname(path)
+    while parent_dir != root_dir and not os.listdir(parent_dir):
+        os.rmdir(parent_dir)
+        parent_dir = os.path.dirname(parent_dir)
+
+
+def copy_verified(source_dir:str, target_dir:str, rel_path:str, digest:str) -> None:
+    """Copy one output from source_dir to target_dir, raising ValueError unless it still has its manifest hash.
+
+    The copy is written atomically and checked before it replaces the target file."""
+    source_path = os.path.join(source_dir, *rel_path.split("/"))
+    target_path = os.path.join(target_dir, *rel_path.split("/"))
+    os.makedirs(os.path.dirname(target_path), exist_ok=True)
+    with open(source_path, 'rb') as src, atomic_open(target_path, 'wb') as dst:
+        copied = hashlib.sha256()
+        while chunk := src.read(COPY_CHUNK_SIZE):
+            copied.update(chunk)
+            dst.write(chunk)
+        # raising here discards the copy before it replaces the target file
+        if copied.hexdigest() != digest:
+            raise ValueError(f"{rel_path} changed since the manifest was written, rebuild it first")
+
+
+def deploy(source_dir:str, manifest:Manifest, target_dir:str) -> ManifestDelta:
+    """Mirror a build into target_dir, copying only what changed since the target's last deploy.
+
+    The target records the manifest it was last mirrored from, so a target that missed
+    several builds still catches up in one deploy. Each copied file is written atomically
+    and checked against its manifest hash before it replaces the old one. Returns the delta that was applied."""
+    target_dir = os.path.abspath(target_dir)
+    os.makedirs(target_dir, exist_ok=True)
+    target_manifest_path = os.path.join(target_dir, TARGET_MANIFEST_NAME)
+    delta = ManifestDelta.between(read_manifest(target_manifest_path), manifest)
+
+    for rel_path, digest in itertools.chain(delta.added.items(), delta.modified.items()):
+        copy_verified(source_dir, target_dir, rel_path, digest)
+    for rel_path in delta.deleted:
+        target_path = os.path.join(target_dir, *rel_path.split("/"))
+        if os.path.exists(target_path):
+            os.remove(target_path)
+            _remove_empty_parents(target_path, target_dir)
+
+    # written last, an interrupted deploy is redone from the old manifest next time
+    write_manifest(target_manifest_path, manifest)
+    return delta
@@ -1,6 +1,9 @@
 import re
 import copy
+import textwrap
+import time
 from enum import Enum
+from typing import Iterator
 
 from textnode import TextNode, TextType
 
@@ -11,41 +14,204 @@ class BlockType(Enum):
     QUOTE = "quote"
     UNORDERED_LIST = "unordered_list"
     ORDERED_LIST = "ordered_list"
+    TABLE = "table"
+
+
+class ParseBudgetExceeded(ValueError):
+    """Raised when a document uses up its parse budget"""
+
+
+class Block(str):
+    """The text of a block, with the offset its first character has in the text it was split from"""
+    def __new__(cls, text:str, offset:int) -> 'Block':
+        block = super().__new__(cls, text)
+        block.offset = offset
+        return block
+
+    def __getnewargs__(self) -> tuple[str, int]:
+        return str(self), self.offset
+
+
+class ParseError(ValueError):
+    """A parse error that knows where it happened.
+
+    The parsers record the block and its offset, and for inline errors the text from the
+    offending delimiter on. locate() turns those into the file, line and column of the
+    error, so positions are only worked out for the rare document that fails to parse."""
+    def __init__(self, message:str, block:str|None=None, fragment:str|None=None, path:str|None=None, line:int|None=None, column:int|None=None, offset:int|None=None) -> None:
+        super().__init__(message)
+        self.message = message
+        self.block = block
+        self.fragment = fragment
+        self.path = path
+        self.line = line
+        self.column = column
+        self.offset = offset
+
+    def locate(self, source:str, path:str, start:int=0) -> 'ParseError':
+        """This error with its position in source, the whole text of the file at path.
+
+        start is where the text the blocks were split from begins in source, such as
+        the end of the front matter."""
+        if self.offset is None or not self.block:
+            return ParseError(self.message, self.block, self.fragment, path, offset=self.offset)
+        offset = start + self.offset
+        line = source.count("\n", 0, offset) + 1
+        column = offset - source.rfind("\n", 0, offset)
+        if self.fragment:
+            # inline text is parsed with its line breaks and runs of spaces collapsed; a fragment
+            # runs to the end of its text, so the last match in the block is the likeliest
+            pattern = r"\s+".join(re.escape(word) for word in self.fragment.split())
+            matches = list(re.finditer(pattern, self.block)) if pattern else []
+            if matches:
+                position = matches[-1].start()
+                block_line = self.block.count("\n", 0, position)
+                block_column = position - self.block.rfind("\n", 0, position)
+                if block_line == 0:
+                    column += block_column - 1
+                else:
+                    # the block's later lines lost the indent the block shared when it was split
+                    line_start = offset
+                    for _ in range(block_line):
+                        line_start = source.index("\n", line_start) + 1
+                    line_end = source.find("\n", line_start)
+                    source_line = source[line_start:] if line_end == -1 else source[line_start:line_end]
+                    block_line_text = self.block.split("\n")[block_line]
+                    removed = (len(source_line) - len(source_line.lstrip())) - (len(block_line_text) - len(block_line_text.lstrip()))
+                    column = block_column + removed
+                line += block_line
+        return ParseError(self.message, self.block, self.fragment, path, line, column, self.offset)
+
+    def __str__(self) -> str:
+        position = ":".join(str(part) for part in (self.path, self.line, self.column) if part is not None)
+        return f"{position}: {self.message}" if position else self.message
+
+    def __reduce__(self):
+        # keeps the position when the error is sent back from a worker process
+        return (ParseError, (self.message, self.block, self.fragment, self.path, self.line, self.column, self.offset))
+
+
+def block_error(error:ValueError, block:str) -> ValueError:
+    """A ParseError for an error raised while parsing block, keeping the fragment of an inline error"""
+    # running out of budget part way through a block is not an error in the block
+    if isinstance(error, ParseBudgetExceeded):
+        return error
+    # blocks split by markdown_to_blocks and iter_buffer_blocks know their offset
+    offset = getattr(block, "offset", None)
+    if isinstance(error, ParseError):
+        if error.block is None:
+            error.block = str(block)
+            error.offset = offset
+        return error
+    return ParseError(str(error), block=str(block), offset=offset)
+
+
+class ParseBudget:
+    """A per-document limit on parse work, in steps (characters of text scanned) and/or seconds.
+
+    Parsers charge the budget as they go, per block and inside the inline splitters, and it
+    raises ParseBudgetExceeded once either limit is passed, so untrusted input fails fast
+    instead of tying up a worker, even within a single huge block."""
+    def __init__(self, max_steps:int|None=None, max_seconds:float|None=None) -> None:
+        self.max_steps = max_steps
+        self.max_seconds = max_seconds
+        self.steps = 0
+        self.deadline = None if max_seconds is None else time.monotonic() + max_seconds
+
+    def charge(self, steps:int) -> None:
+        self.steps += steps
+        if self.max_steps is not None and self.steps > self.max_steps:
+            raise ParseBudgetExceeded(f"Parse budget exceeded: {self.steps} steps, limit is {self.max_steps}")
+        if self.deadline is not None and time.monotonic() > self.deadline:
+            raise ParseBudgetExceeded(f"Parse budget exceeded: took longer than {self.max_seconds}s")
+
+
+def find_bracket_spans(text:str, images:bool) -> list[tuple[int, int, str, str]]:
+    """Find [text](url) links, or ![alt](url) images, in a single left to right pass.
+
+    Returns (start, end, text, url) tuples, where text[start:end] is the full match. Text
+    and url must be non-empty and may not contain brackets or parens respectively. Every
+    search resumes from a cached position that only moves forward, so runs of unmatched
+    brackets stay linear."""
+    matches = []
+    next_found:dict[str, int] = {}
+
+    def find_next(char:str, start:int) -> int:
+        # the cached position is still the first one at or after start if it lies past start
+        found = next_found.get(char)
+        if found is None or (found != -1 and found < start):
+            found = text.find(char, start)
+            next_found[char] = found
+        return found
+
+    position = 0
+    while True:
+        open_index = find_next("[", position)
+        if open_index == -1:
+            break
+        position = open_index + 1
+        has_bang = open_index > 0 and text[open_index - 1] == "!"
+        if has_bang != images:
+            continue
+        close_index = find_next("]", open_index + 1)
+        if close_index == -1:
+            break
+        # text with a nested opening bracket, or no text at all, can't match from here
+        next_open = find_next("[", open_index + 1)
+        if next_open != -1 and next_open < close_index:
+            continue
+        position = close_index + 1
+        if close_index == open_index + 1 or text[close_index + 1:close_index + 2] != "(":
+            continue
+        url_end = find_next(")", close_index + 2)
+        if url_end == -1:
+            break
+        next_paren = find_next("(", close_index + 2)
+        if url_end == close_index + 2 or (next_paren != -1 and next_paren < url_end):
+            continue
+        match_start = open_index - 1 if images else open_index
+        matches.append((match_start, url_end + 1, text[open_index + 1:close_index], text[close_index + 2:url_end]))
+        position = url_end + 1
+    return matches
+
+
+def find_bracket_links(text:str, images:bool) -> list[tuple[str, str, str]]:
+    """Find [text](url) links, or ![alt](url) images, as (full_match, text, url) tuples."""
+    return [(text[start:end], link_text, url) for start, end, link_text, url in find_bracket_spans(text, images)]
 
 
-def extract_markdown_images(text:str) -> list[str]:
+def extract_markdown_images(text:str) -> list[tuple[str, str, str]]:
     """Extracts all markdown image URLs from the given text.
 
     Args:
         text (str): The text to extract image URLs from.
 
     Returns:
-        list[str]: A list of image URLs found in the text.
+        list[tuple[str, str, str]]: (full match, alt text, url) for each image found in the text.
     """
-    mkd_img_pattern = r"(!\[([^\[\]]+?)\]\(([^\(\)]+?)\))"
-    return re.findall(mkd_img_pattern, text)
+    return find_bracket_links(text, images=True)
 
 
-def extract_markdown_links(text:str) -> list[str]:
+def extract_markdown_links(text:str) -> list[tuple[str, str, str]]:
     """Extracts all markdown link URLs from the given text.
 
     Args:
         text (str): The text to extract link URLs from.
 
     Returns:
-        list[str]: A list of link URLs found in the text.
+        list[tuple[str, str, str]]: (full match, link text, url) for each link found in the text.
     """
-    mkd_link_pattern = r"((?<!!)\[([^\[\]]+?)\]\(([^\(\)]+?)\))"
-    return re.findall(mkd_link_pattern, text)
+    return find_bracket_links(text, images=False)
 
 
-def split_nodes_delimiter(old_nodes:list[TextNode], delimiter:str, text_type:TextType) -> list[TextNode]:
+def split_nodes_delimiter(old_nodes:list[TextNode], delimiter:str, text_type:TextType, budget:ParseBudget|None=None) -> list[TextNode]:
     """Splits TextNodes in old_nodes by the given delimiter, inserting new TextNodes of the given text_type for the delimiters.
 
     Args:
         old_nodes (list[TextNode]): A list of textnodes to process
         delimiter (str): A delimter character to split on
         text_type (TextType): The TextType for nodes marked by the delimiter
+        budget (ParseBudget|None): Charged with the length of each text node split
 
     Returns:
         list[TextNode]: A new list of TextNodes where nodes have been split by the delimiter and new nodes of the given text_type inserted.
@@ -55,10 +221,13 @@ def split_nodes_delimiter(old_nodes:list[TextNode], delimiter:str, text_type:Tex
         if node.text_type != TextType.TEXT:
             new_nodes.append(node)
         else:
+            if budget is not None:
+                budget.charge(len(node.text))
             parts = node.text.split(delimiter)
             # if parts is even length that means there was an unmatched delimiter
             if len(parts) % 2 == 0:
-                raise ValueError(f"Found unmatched delimiter '{delimiter}' in text: {node.text}")
+                # the unmatched delimiter is the last one
+                raise ParseError(f"Found unmatched delimiter '{delimiter}' in text: {node.text}", fragment=node.text[node.text.rfind(delimiter):])
             for i, part in enumerate(parts):
                 # empty parts usually show up when there are consecutive delimiters or at the start/end of the string
                 # don't bother adding empty text nodes
@@ -97,7 +266,8 @@ def split_replace_strings_with_nodes(old_nodes:list[TextNode], splits:list[tuple
     return new_nodes
 
 
-def split_nodes_images(old_nodes:list[TextNode]) -> list[TextNode]:
+def _split_nodes_bracket_links(old_nodes:list[TextNode], images:bool, text_type:TextType, budget:ParseBudget|None) -> list[TextNode]:
+    # the nodes are cut at the match positions in one pass, so many links in a block stay linear
     new_nodes = []
     for node in old_nodes:
         # dont run parsing on non-text nodes
@@ -105,74 +275,176 @@ def split_nodes_images(old_nodes:list[TextNode]) -> list[TextNode]:
             new_nodes.append(node)
             continue
 
-        image_matches = extract_markdown_images(node.text)
-        # if no image matches, just keep the original node
-        if not image_matches:
+        text = node.text
+        spans = find_bracket_spans(text, images)
+        # if no matches, just keep the original node
+        if not spans:
+            if budget is not None:
+                budget.charge(len(text))
             new_nodes.append(node)
             continue
 
-        # otherwise process the image matches and create nodes for the image matches
-        replacements = [(match[0], TextNode(match[1], TextType.IMAGE, match[2])) for match in image_matches]
-        new_nodes.extend(split_replace_strings_with_nodes([node], replacements))
+        position = 0
+        for start, end, link_text, url in spans:
+            # charged per match, so a block with a huge number of links still hits the deadline
+            if budget is not None:
+                budget.charge(end - position)
+            if start > position:
+                new_nodes.append(TextNode(text[position:start], TextType.TEXT))
+            new_nodes.append(TextNode(link_text, text_type, url))
+            position = end
+        if position < len(text):
+            if budget is not None:
+                budget.charge(len(text) - position)
+            new_nodes.append(TextNode(text[position:], TextType.TEXT))
     return new_nodes
 
 
-def split_nodes_links(old_nodes:list[TextNode]) -> list[TextNode]:
-    new_nodes = []
-    for node in old_nodes:
-        # dont run parsing on non-text nodes
-        if node.text_type != TextType.TEXT:
-            new_nodes.append(node)
-            continue
+def split_nodes_images(old_nodes:list[TextNode], budget:ParseBudget|None=None) -> list[TextNode]:
+    """Split ![alt](url) images out of the text nodes in old_nodes, charging budget for the text scanned"""
+    return _split_nodes_bracket_links(old_nodes, True, TextType.IMAGE, budget)
 
-        link_matches = extract_markdown_links(node.text)
-        # if no link matches, just keep the original node
-        if not link_matches:
-            new_nodes.append(node)
-            continue
 
-        # otherwise process the link matches and create nodes for the link matches
-        replacements = [(match[0], TextNode(match[1], TextType.HYPERLINK, match[2])) for match in link_matches]
-        new_nodes.extend(split_replace_strings_with_nodes([node], replacements))
-    return new_nodes
+def split_nodes_links(old_nodes:list[TextNode], budget:ParseBudget|None=None) -> list[TextNode]:
+    """Split [text](url) links out of the text nodes in old_nodes, charging budget for the text scanned"""
+    return _split_nodes_bracket_links(old_nodes, False, TextType.HYPERLINK, budget)
 
 
-def text_to_textnodes(text:str) -> list[TextNode]:
+def text_to_textnodes(text:str, budget:ParseBudget|None=None) -> list[TextNode]:
     """Converts a plain text string to a list of TextNodes, parsing for markdown syntax.
 
     Args:
         text (str): The input text to parse.
+        budget (ParseBudget|None): Charged by each inline splitter for the text it scans.
     Returns:
         list[TextNode]: A list of TextNodes representing the parsed text.
     """
     nodes = [TextNode(text, TextType.TEXT)]
     # order of these matters, since they are applied sequentially
-    nodes = split_nodes_images(nodes)
-    nodes = split_nodes_links(nodes)
-    nodes = split_nodes_delimiter(nodes, "**", TextType.BOLD)
-    nodes = split_nodes_delimiter(nodes, "_", TextType.ITALIC)
-    nodes = split_nodes_delimiter(nodes, "`", TextType.CODE)
+    nodes = split_nodes_images(nodes, budget)
+    nodes = split_nodes_links(nodes, budget)
+    nodes = split_nodes_delimiter(nodes, "**", TextType.BOLD, budget)
+    nodes = split_nodes_delimiter(nodes, "_", TextType.ITALIC, budget)
+    nodes = split_nodes_delimiter(nodes, "`", TextType.CODE, budget)
 
     return nodes
 
 
-def markdown_to_blocks(md_text:str) -> list[str]:
-    """Splits markdown text into logical blocks for further processing"""
-    blocks = []
-    block_simple_delimiter = r"\n\s*\n"
-    block_code_delimiter = r"(```.*?```)"
-    # first break out the code blocks (so that we can preserve the whitespace inside them)
-    blocks_after_code = re.split(block_code_delimiter, md_text, flags=re.DOTALL)
-    # next break up the rest of the block but ignore the code blocks
-    for block in blocks_after_code:
-        if re.match(block_code_delimiter, block, flags=re.DOTALL):
-            blocks.append(block)
-        else:
-            sub_blocks = re.split(block_simple_delimiter, block)
-            blocks.extend([b.strip() for b in sub_blocks if b.strip()])
+def block_text(text:str) -> str:
+    """The text of a block with the indent shared by all its lines removed, then stripped.
+
+    Stripping alone would only drop the first line's indent, making a uniformly indented
+    list look like one item with the others nested under it."""
+    # only a block whose first line is indented can have an indent shared by every line
+    if text.lstrip("\r\n")[:1] in (" ", "\t"):
+        text = textwrap.dedent(text)
+    return text.strip()
+
+
+CODE_BLOCK_PATTERN = re.compile(r"```.*?```", flags=re.DOTALL)
+BLANK_LINE_PATTERN = re.compile(r"\n\s*\n")
+
+
+def markdown_to_blocks(md_text:str) -> list[Block]:
+    """Splits markdown text into logical blocks for further processing, each knowing its offset in md_text"""
+    blocks:list[Block] = []
+    position = 0
+    # code blocks are taken out first, so that the whitespace inside them is kept
+    for code in CODE_BLOCK_PATTERN.finditer(md_text):
+        _split_text_blocks(md_text, position, code.start(), blocks)
+        blocks.append(Block(code.group(), code.start()))
+        position = code.end()
+    _split_text_blocks(md_text, position, len(md_text), blocks)
     return blocks
 
 
+def _split_text_blocks(md_text:str, start:int, end:int, blocks:list[Block]) -> None:
+    # the text between code blocks breaks into blocks at blank lines
+    for separator in BLANK_LINE_PATTERN.finditer(md_text, start, end):
+        _add_text_block(md_text, start, separator.start(), blocks)
+        start = separator.end()
+    _add_text_block(md_text, start, end, blocks)
+
+
+def _add_text_block(md_text:str, start:int, end:int, blocks:list[Block]) -> None:
+    text = md_text[start:end]
+    stripped = text.lstrip()
+    if stripped:
+        blocks.append(Block(block_text(text), start + len(text) - len(stripped)))
+
+
+def slugify(text:str) -> str:
+    """Turn text into a lowercase, url safe slug"""
+    slug = re.sub(r"[^\w\s-]", "", text.lower())
+    return re.sub(r"[\s_-]+", "-", slug).strip("-")
+
+
+CODE_BLOCK_BYTES_PATTERN = re.compile(rb"```.*?```", flags=re.DOTALL)
+
+
+def _iter_buffer_offset_lines(buffer, start:int=0, end:int|None=None) -> Iterator[tuple[int, str]]:
+    # lazily decode the utf-8 lines of a bytes-like buffer (such as an mmap) between start and end,
+    # each with the byte offset it starts at. Line endings are translated like a text mode open()
+    # would, so \r\n and \r both end a line
+    end = len(buffer) if end is None else end
+    position = start
+    while position <= end:
+        newline = buffer.find(b"\n", position, end)
+        line_end = end if newline == -1 else newline
+        line = buffer[position:line_end]
+        if b"\r" in line:
+            if newline != -1:
+                line = line.removesuffix(b"\r")
+            # what is left are lone \r line endings, one byte each
+            piece_start = position
+            for piece in line.split(b"\r"):
+                yield piece_start, piece.decode('utf-8')
+                piece_start += len(piece) + 1
+        else:
+            yield position, line.decode('utf-8')
+        if newline == -1:
+            return
+        position = newline + 1
+
+
+def _iter_buffer_segment_blocks(buffer, start:int, end:int) -> Iterator[Block]:
+    # blank lines separate blocks, only the lines of the current block are held
+    lines = []
+    block_start = start
+    for line_start, line in _iter_buffer_offset_lines(buffer, start, end):
+        if line.strip():
+            if not lines:
+                indent = line[:len(line) - len(line.lstrip())]
+                block_start = line_start + len(indent.encode('utf-8'))
+            lines.append(line)
+        elif lines:
+            yield Block(block_text("\n".join(lines)), block_start)
+            lines = []
+    if lines:
+        yield Block(block_text("\n".join(lines)), block_start)
+
+
+def iter_buffer_blocks(buffer, start:int=0) -> Iterator[Block]:
+    """Lazily split the markdown in a bytes-like buffer (such as an mmap) into blocks.
+
+    Yields the same blocks as markdown_to_blocks(text) for the text from start on, but
+    decodes one block at a time instead of the whole buffer. Their offsets are in bytes
+    from the start of the buffer, buffer_text_offset turns them into text offsets."""
+    position = start
+    for match in CODE_BLOCK_BYTES_PATTERN.finditer(buffer, start):
+        yield from _iter_buffer_segment_blocks(buffer, position, match.start())
+        yield Block(match.group().decode('utf-8').replace("\r\n", "\n").replace("\r", "\n"), match.start())
+        position = match.end()
+    yield from _iter_buffer_segment_blocks(buffer, position, len(buffer))
+
+
+def buffer_text_offset(buffer, offset:int) -> int:
+    """The offset in the buffer's text, decoded and with line endings translated, of a byte offset"""
+    text = bytes(buffer[:offset]).decode('utf-8')
+    # \r\n reads as one \n, a lone \r as \n
+    return len(text) - text.count("\r\n")
+
+
 def block_to_block_type(block:str) -> BlockType:
     # Note the following regexes assume the blocks have been stripped of leading/trailing whitespace
     # for quote, and the list types, we only check the start of the block since they can span multiple lines
@@ -189,18 +461,194 @@ def block_to_block_type(block:str) -> BlockType:
             return BlockType.UNORDERED_LIST
         case b if re.match(r"^\s*\d+\.\s+", b):
             return BlockType.ORDERED_LIST
+        case b if is_table_start(b):
+            return BlockType.TABLE
         case _:
             return BlockType.PARAGRAPH
 
 
+# a list item line: indent, then a "-" or "1." marker, then the item text
+LIST_MARKER_PATTERN = re.compile(r"([ \t]*)(?:(-)|\d+\.)(?:[ \t]+(.*)|$)")
+# how much deeper than its parent list an item must be indented to start a nested list
+LIST_NEST_INDENT = 2
+
+
+class ListItem:
+    """One list item: its text lines and any lists nested under it"""
+    def __init__(self, line:str) -> None:
+        self.lines = [line]
+        self.sublists:list['ListBlock'] = []
+
+    def text(self) -> str:
+        """The item text with its lines joined by single spaces"""
+        return " ".join(stripped for line in self.lines if (stripped := line.strip()))
+
+
+class ListBlock:
+    """An ordered or unordered list, possibly holding nested lists in its items"""
+    def __init__(self, ordered:bool) -> None:
+        self.ordered = ordered
+        self.items:list[ListItem] = []
+
+
+def parse_list_block(block:str, ordered:bool) -> ListBlock:
+    """Parse a list block into a tree of ListBlocks in a single pass over its lines.
+
+    An item indented at least LIST_NEST_INDENT deeper than the list it follows starts a
+    nested list, whose type comes from its own marker. Lines without a marker, or with the
+    other list type's marker at the same depth, continue the text of the latest item."""
+    root = ListBlock(ordered)
+    # stack of (indent, list) for the lists that are currently open, outermost first
+    stack = [(0, root)]
+    for line in iter_lines(block.strip()):
+        match = LIST_MARKER_PATTERN.match(line)
+        if match is None:
+            _continue_list_item(stack, line)
+            continue
+        indent = len(match.group(1).expandtabs(4))
+        item_ordered = match.group(2) is None
+        text = match.group(3) or ""
+        while len(stack) > 1 and indent < stack[-1][0]:
+            stack.pop()
+        level_indent, level_list = stack[-1]
+        if level_list.items and indent >= level_indent + LIST_NEST_INDENT:
+            nested_list = ListBlock(item_ordered)
+            nested_list.items.append(ListItem(text))
+            level_list.items[-1].sublists.append(nested_list)
+            stack.append((indent, nested_list))
+        elif level_list.items and item_ordered != level_list.ordered:
+            _continue_list_item(stack, line)
+        else:
+            level_list.items.append(ListItem(text))
+    return root
+
+
+def _continue_list_item(stack:list[tuple[int, ListBlock]], line:str) -> None:
+    level_list = stack[-1][1]
+    if level_list.items:
+        level_list.items[-1].lines.append(line)
+    else:
+        level_list.items.append(ListItem(line))
+
+
+# a table starts with a header row containing a pipe, followed by a delimiter row like | --- | :-: |
+TABLE_START_PATTERN = re.compile(r"([^\n]*\|[^\n]*)\n([ \t]*\|?[ \t]*:?-+:?[ \t]*(?:\|[ \t]*:?-+:?[ \t]*)*\|?[ \t]*)(?:\n|$)")
+# cells are separated by pipes that are not escaped with a backslash
+TABLE_CELL_SEPARATOR = re.compile(r"(?<!\\)\|")
+
+
+def is_table_start(block:str) -> bool:
+    """Whether block opens with a table header and a delimiter row with the same number of cells
+
+    As in GFM, prose with a pipe in it followed by a --- line is not a table."""
+    match = TABLE_START_PATTERN.match(block)
+    return match is not None and len(split_table_row(match.group(1))) == len(split_table_row(match.group(2)))
+
+
+def split_table_row(line:str) -> list[str]:
+    """Split a table row into its stripped cell texts, ignoring the optional outer pipes"""
+    line = line.strip()
+    if line.startswith("|"):
+        line = line[1:]
+    if line.endswith("|") and not line.endswith("\\|"):
+        line = line[:-1]
+    return [cell.strip().replace("\\|", "|") for cell in TABLE_CELL_SEPARATOR.split(line)]
+
+
+def parse_table_alignments(line:str) -> list[str|None]:
+    """Read the column alignments (left, center, right or None) from a table delimiter row"""
+    alignments:list[str|None] = []
+    for cell in split_table_row(line):
+        match (cell.startswith(":"), cell.endswith(":")):
+            case (True, True):
+                alignments.append("center")
+            case (True, False):
+                alignments.append("left")
+            case (False, True):
+                alignments.append("right")
+            case _:
+                alignments.append(None)
+    return alignments
+
+
+def split_table_block(block:str) -> tuple[list[str], list[str|None], Iterator[list[str]]]:
+    """Parse a table block into its header cells, column alignments and a lazy iterator of body rows.
+
+    Body rows are split one at a time as the iterator is consumed, and are padded or
+    truncated to the header's column count."""
+    lines = iter_lines(block.strip())
+    header = split_table_row(next(lines))
+    alignments = parse_table_alignments(next(lines))
+    column_count = len(header)
+    # a delimiter row with a different column count still applies to the header's columns
+    alignments = (alignments + [None] * column_count)[:column_count]
+
+    def body_rows() -> Iterator[list[str]]:
+        for line in lines:
+            if not line.strip():
+                continue
+            cells = split_table_row(line)
+            yield (cells + [""] * column_count)[:column_count]
+
+    return header, alignments, body_rows()
+
+
+# a level 1 heading line: optional indent, a single hash, whitespace, then the title text
+# a bare hash counts as an empty title, since block splitting strips the whitespace after it
+TITLE_LINE_PATTERN = re.compile(r"[^\S\n\r\f]*#(?:[^\S\n\r\f]+(.*)|$)")
+CODE_FENCE = "```"
+
+
+def iter_lines(text:str):
+    """Lazily yield the lines of text without splitting the whole string up front"""
+    start = 0
+    while start <= len(text):
+        end = text.find("\n", start)
+        if end == -1:
+            yield text[start:]
+            return
+        yield text[start:end]
+        start = end + 1
+
+
+def find_title_line(lines) -> str|None:
+    """Return the text of the first level 1 heading in lines, skipping fenced code.
+
+    Stops consuming lines as soon as the heading is found."""
+    in_code = False
+    for line in lines:
+        if CODE_FENCE in line:
+            # an odd number of fences opens or closes a code block, an even number is inline code
+            if line.count(CODE_FENCE) % 2:
+                in_code = not in_code
+            continue
+        if in_code:
+            continue
+        match = TITLE_LINE_PATTERN.match(line)
+        if match:
+            return (match.group(1) or "").strip()
+    return None
+
+
 def extract_title(md_test:str) -> str:
     """Extract a title from given markdown text.
-    This treats the first level 1 heading as the title.
+    This treats the first level 1 heading outside of code blocks as the title.
 
     If no level 1 heading is found, raises an exception"""
-
-    title_pattern = r"^[^\S\n\r\f]*#[^\S\n\r\f]+(.*)$"
-    matches = re.findall(title_pattern, md_test, flags=re.MULTILINE)
-    if not matches:
+    title = find_title_line(iter_lines(md_test))
+    if title is None:
         raise ValueError("No level 1 heading found for title")
-    return matches[0].strip()
+    return title
+
+
+def extract_title_from_blocks(blocks:list[str]) -> str:
+    """Extract a title from markdown already split by markdown_to_blocks.
+
+    Same rules as extract_title, but code blocks are skipped whole without scanning them."""
+    for block in blocks:
+        if block.startswith(CODE_FENCE):
+            continue
+        title = find_title_line(iter_lines(block))
+        if title is not None:
+            return title
+    raise ValueError("No level 1 heading found for title")
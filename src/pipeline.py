@@ -0,0 +1,86 @@
+from concurrent.futures import Executor, ThreadPoolExecutor
+from typing import Callable, Iterable, TypeVar
+
+
+Item = TypeVar("Item")
+Loaded = TypeVar("Loaded")
+Rendered = TypeVar("Rendered")
+Written = TypeVar("Written")
+
+# reads and writes mostly wait on the filesystem, so there can be more of them than cores
+DEFAULT_IO_WORKERS = 8
+# items waiting between two stages; a stage that falls behind holds up the one before it
+DEFAULT_QUEUE_SIZE = 16
+
+# marks the end of a queue's items
+_DONE = object()
+
+
+def run_pipeline(items:Iterable[Item], read:Callable[[Item], Loaded], render:Callable[[Item, Loaded], Rendered],
+                 write:Callable[[Item, Rendered], Written], render_executor:Executor|None=None,
+                 render_slots:int=1, io_workers:int=DEFAULT_IO_WORKERS, queue_size:int=DEFAULT_QUEUE_SIZE) -> list[Written]:
+    """Read, render and write every item, overlapping the three stages, and return what write returned in item order.
+
+    read and write run in a pool of io_workers threads, so the filesystem latency of many
+    items overlaps. render runs in render_executor (a single thread when not given) with
+    at most render_slots items in it at once; it has to be picklable for a process pool.
+    The stages are joined by queues of queue_size items, so at most about
+    2 * queue_size + io_workers + render_slots items are loaded or rendered at any time,
+    however many items there are; only what write returns is kept for every item.
+    The first exception raised by any stage stops the pipeline and is raised here."""
+    if render_slots < 1 or io_workers < 1 or queue_size < 1:
+        raise ValueError("A pipeline needs at least one render slot, one io worker and room for one queued item")
+    # imported on first use, asyncio is slow to import and most commands never build pages
+    import asyncio
+    with ThreadPoolExecutor(max_workers=io_workers, thread_name_prefix="pipeline-io") as io_executor:
+        if render_executor is not None:
+            return asyncio.run(_run_stages(list(items), read, render, write, io_executor, render_executor, render_slots, io_workers, queue_size))
+        with ThreadPoolExecutor(max_workers=1, thread_name_prefix="pipeline-render") as render_thread:
+            return asyncio.run(_run_stages(list(items), read, render, write, io_executor, render_thread, 1, io_workers, queue_size))
+
+
+async def _run_stages(items:list, read:Callable, render:Callable, write:Callable, io_executor:Executor,
+                      render_executor:Executor, render_slots:int, io_workers:int, queue_size:int) -> list:
+    import asyncio
+    loop = asyncio.get_running_loop()
+    loaded:asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+    rendered:asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+    results:list = [None] * len(items)
+    # shared by the readers, each takes the next item when it is free
+    pending = iter(enumerate(items))
+
+    async def reader() -> None:
+        for index, item in pending:
+            await loaded.put((index, item, await loop.run_in_executor(io_executor, read, item)))
+
+    async def renderer() -> None:
+        while (entry := await loaded.get()) is not _DONE:
+            index, item, data = entry
+            await rendered.put((index, item, await loop.run_in_executor(render_executor, render, item, data)))
+
+    async def writer() -> None:
+        while (entry := await rendered.get()) is not _DONE:
+            index, item, result = entry
+            results[index] = await loop.run_in_executor(io_executor, write, item, result)
+
+    async def stage(workers:list, downstream:asyncio.Queue|None=None, downstream_workers:int=0) -> None:
+        await asyncio.gather(*workers)
+        # once a stage is through, each worker of the next one gets an end marker
+        for _ in range(downstream_workers):
+            await downstream.put(_DONE)
+
+    # a failing stage cancels the rest, so no worker is left waiting on a queue
+    try:
+        async with asyncio.TaskGroup() as group:
+            group.create_task(stage([reader() for _ in range(io_workers)], loaded, render_slots))
+            group.create_task(stage([renderer() for _ in range(render_slots)], rendered, io_workers))
+            group.create_task(stage([writer() for _ in range(io_workers)]))
+    except BaseExceptionGroup as errors:
+        # callers see the error itself, as with a plain loop over the items
+        raise _first_error(errors) from None
+    return results
+
+
+def _first_error(errors:BaseExceptionGroup) -> BaseException:
+    error = errors.exceptions[0]
+    return _first_error(error) if isinstance(error, BaseExceptionGroup) else error
@@ -0,0 +1,94 @@
+import hashlib
+import json
+import os
+
+from atomic import atomic_write
+from listing import PageRecord
+from manifest import Manifest
+
+
+# under the build state directory, each shard builds into shards/<count>/<index>
+SHARDS_DIR = "shards"
+SHARD_OUTPUT_DIR = "public"
+SHARD_NAME = "shard.json"
+
+
+def parse_shard(spec:str) -> tuple[int, int]:
+    """Parse a shard spec such as 2/4 into its index and count, indexes run from 1 to count"""
+    index, sep, count = spec.partition("/")
+    if not sep or not index.isdigit() or not count.isdigit() or not 1 <= int(index) <= int(count):
+        raise ValueError(f"Invalid shard {spec}, expected i/N with 1 <= i <= N")
+    return int(index), int(count)
+
+
+def shard_of(rel_path:str, count:int) -> int:
+    """The shard, from 1 to count, that builds the content page at rel_path.
+
+    Hashes the path with / separators, so every host and every run agrees on it,
+    and adding a page never moves another page to a different shard."""
+    digest = hashlib.sha256(rel_path.replace(os.sep, "/").encode('utf-8')).digest()
+    return int.from_bytes(digest[:8], "big") % count + 1
+
+
+def shard_directory(state_dir:str, index:int, count:int) -> str:
+    return os.path.join(state_dir, SHARDS_DIR, str(count), str(index))
+
+
+class ShardBuild:
+    """What one shard built: the content pages it was given, the records of those it
+    published (with sources relative to the content directory), the manifest of its
+    output and the inputs of each output (relative to the content directory as well),
+    for the merge to put together"""
+    def __init__(self, index:int, count:int, pages:list[str], records:list[PageRecord], manifest:Manifest, outputs:dict[str, list[str]]) -> None:
+        self.index = index
+        self.count = count
+        self.pages = pages
+        self.records = records
+        self.manifest = manifest
+        self.outputs = outputs
+
+    def to_dict(self) -> dict:
+        return {
+            "shard": f"{self.index}/{self.count}",
+            "pages": self.pages,
+            "records": [record.to_dict() for record in self.records],
+            "manifest": dict(sorted(self.manifest.items())),
+            "outputs": dict(sorted(self.outputs.items())),
+        }
+
+    @classmethod
+    def from_dict(cls, data:dict) -> 'ShardBuild':
+        index, count = parse_shard(data["shard"])
+        return cls(index, count, data["pages"], [PageRecord.from_dict(record) for record in data["records"]], data["manifest"], data["outputs"])
+
+    def save(self, path:str) -> None:
+        atomic_write(path, json.dumps(self.to_dict(), indent=2) + "\n")
+
+    @classmethod
+    def load(cls, path:str) -> 'ShardBuild':
+        with open(path, 'r', encoding='utf-8') as f:
+            return cls.from_dict(json.load(f))
+
+    def __repr__(self) -> str:
+        return f"ShardBuild({self.index}/{self.count}, {len(self.records)} pages, {len(self.manifest)} files)"
+
+
+def find_shard_builds(state_dir:str) -> list[tuple[ShardBuild, str]]:
+    """The shard builds under state_dir with their output directories, in shard order.
+
+    Raises ValueError unless there is exactly one complete set of shards to merge."""
+    shards_dir = os.path.join(state_dir, SHARDS_DIR)
+    counts = sorted(int(name) for name in os.listdir(shards_dir) if name.isdigit()) if os.path.isdir(shards_dir) else []
+    if not counts:
+        raise ValueError(f"No shard builds in {shards_dir}, build with --shard i/N first")
+    if len(counts) > 1:
+        raise ValueError(f"Shard builds of more than one shard count ({', '.join(map(str, counts))}) in {shards_dir}, remove the stale ones")
+    count = counts[0]
+    builds = []
+    for index in range(1, count + 1):
+        shard_dir = shard_directory(state_dir, index, count)
+        shard_path = os.path.join(shard_dir, SHARD_NAME)
+        if not os.path.exists(shard_path):
+            raise ValueError(f"Shard {index}/{count} has not been built")
+        builds.append((ShardBuild.load(shard_path), os.path.join(shard_dir, SHARD_OUTPUT_DIR)))
+    return builds
@@ -0,0 +1,119 @@
+import json
+from typing import Iterable
+
+from parsing import BlockType
+from textnode import TextNode
+
+
+class ParseStats:
+    """Counts describing the shape of rendered markdown: blocks by BlockType, TextNodes by
+    TextType, HTMLNodes in the tree, the deepest nesting and the bytes written"""
+    def __init__(self) -> None:
+        self.pages = 0
+        self.blocks:dict[str, int] = {}
+        self.text_nodes:dict[str, int] = {}
+        self.html_nodes = 0
+        self.max_depth = 0
+        self.output_bytes = 0
+        self.render_seconds = 0.0
+
+    def count_block(self, block_type:BlockType) -> None:
+        self.blocks[block_type.value] = self.blocks.get(block_type.value, 0) + 1
+
+    def count_text_nodes(self, text_nodes:Iterable[TextNode]) -> None:
+        for text_node in text_nodes:
+            text_type = text_node.text_type.value
+            self.text_nodes[text_type] = self.text_nodes.get(text_type, 0) + 1
+
+    def count_tree(self, root) -> None:
+        """Count the nodes of a finished HTMLNode tree and its depth (the root is depth 1).
+
+        A shared leaf used in several places is one object, so it is counted once."""
+        seen:set[int] = set()
+        stack = [(root, 1)]
+        while stack:
+            node, depth = stack.pop()
+            if depth > self.max_depth:
+                self.max_depth = depth
+            if id(node) in seen:
+                continue
+            seen.add(id(node))
+            self.html_nodes += 1
+            if node.children:
+                stack.extend((child, depth + 1) for child in node.children)
+
+    def count_output(self, html:str) -> None:
+        self.output_bytes += len(html.encode('utf-8'))
+
+    def merge(self, other:'ParseStats') -> None:
+        self.pages += other.pages
+        for block_type, count in other.blocks.items():
+            self.blocks[block_type] = self.blocks.get(block_type, 0) + count
+        for text_type, count in other.text_nodes.items():
+            self.text_nodes[text_type] = self.text_nodes.get(text_type, 0) + count
+        self.html_nodes += other.html_nodes
+        self.max_depth = max(self.max_depth, other.max_depth)
+        self.output_bytes += other.output_bytes
+        self.render_seconds += other.render_seconds
+
+    def to_dict(self) -> dict:
+        return {
+            "pages": self.pages,
+            "blocks": dict(sorted(self.blocks.items())),
+            "text_nodes": dict(sorted(self.text_nodes.items())),
+            "html_nodes": self.html_nodes,
+            "max_depth": self.max_depth,
+            "output_bytes": self.output_bytes,
+            "render_seconds": round(self.render_seconds, 6),
+        }
+
+    def __repr__(self) -> str:
+        return f"ParseStats({self.to_dict()})"
+
+
+class SiteStats:
+    """Per page ParseStats keyed by url, plus their site-wide total"""
+    def __init__(self) -> None:
+        self.pages:dict[str, ParseStats] = {}
+        self.total = ParseStats()
+
+    def add_page(self, url:str, page_stats:ParseStats) -> None:
+        self.pages[url] = page_stats
+        self.total.merge(page_stats)
+
+    def to_json(self) -> str:
+        return json.dumps({
+            "total": self.total.to_dict(),
+            "pages": {url: self.pages[url].to_dict() for url in sorted(self.pages)},
+        }, indent=2) + "\n"
+
+    def to_prometheus(self, prefix:str="site") -> str:
+        """The site-wide totals in the Prometheus text exposition format.
+
+        Per page numbers are left to the JSON export, a url label would be unbounded."""
+        total = self.total
+        lines = []
+
+        def metric(name:str, metric_type:str, help_text:str, samples:list[tuple[str, float]]) -> None:
+            lines.append(f"# HELP {prefix}_{name} {help_text}")
+            lines.append(f"# TYPE {prefix}_{name} {metric_type}")
+            for labels, value in samples:
+                lines.append(f"{prefix}_{name}{labels} {value}")
+
+        metric("pages_total", "counter", "Pages rendered.", [("", total.pages)])
+        metric("blocks_total", "counter", "Markdown blocks parsed, by block type.",
+               [(f'{{type="{block_type}"}}', count) for block_type, count in sorted(total.blocks.items())])
+        metric("text_nodes_total", "counter", "Inline text nodes parsed, by text type.",
+               [(f'{{type="{text_type}"}}', count) for text_type, count in sorted(total.text_nodes.items())])
+        metric("html_nodes_total", "counter", "Distinct HTML nodes in rendered trees.", [("", total.html_nodes)])
+        metric("tree_depth_max", "gauge", "Deepest HTML node tree of any page.", [("", total.max_depth)])
+        metric("output_bytes_total", "counter", "Bytes of HTML written.", [("", total.output_bytes)])
+        metric("render_seconds_total", "counter", "Seconds spent rendering pages.", [("", round(total.render_seconds, 6))])
+        return "\n".join(lines) + "\n"
+
+    def export(self, stats_format:str) -> str:
+        if stats_format == "json":
+            return self.to_json()
+        if stats_format == "prometheus":
+            return self.to_prometheus()
+        raise ValueError(f"Unknown stats format {stats_format}, choose json or prometheus")
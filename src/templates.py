@@ -0,0 +1,209 @@
+import hashlib
+import os
+import re
+import threading
+from typing import Callable, Iterable, Iterator
+
+from cache import TEMPLATE_HASHES, FileHasher
+from frontmatter import MetaValue
+
+
+# {% extends "base.html" %}, {% include "partials/nav.html" %}, {% block name %} ... {% endblock %}
+TEMPLATE_TAG_PATTERN = re.compile(r'\{%\s*(\w+)(?:\s+(?:"([^"]*)"|(\w+)))?\s*%\}')
+VARIABLE_PATTERN = re.compile(r"\{\{ ([^{}\s]+) \}\}")
+
+# a template variable: a front matter value, or a callable returning the chunks of a streamed value
+TemplateValue = MetaValue | Callable[[], Iterable[str]]
+
+
+class _Include:
+    def __init__(self, name:str) -> None:
+        self.name = name
+
+
+class _Block:
+    def __init__(self, name:str, children:list) -> None:
+        self.name = name
+        self.children = children
+
+
+class CompiledTemplate:
+    """A template with its layout and partials resolved into a flat list of segments.
+
+    The segments alternate literal text and variable names, starting and ending with
+    text, so rendering is a single pass with no parsing. files holds the content hash of
+    every file the template was compiled from: itself, its layouts and its partials."""
+    def __init__(self, path:str, segments:list[str], files:dict[str, str]) -> None:
+        self.path = path
+        self.segments = segments
+        self.files = files
+        self.digest = hashlib.sha256("".join(f"{path}\0{digest}\0" for path, digest in sorted(files.items())).encode('utf-8')).hexdigest()
+
+    def iter_render(self, variables:dict[str, TemplateValue]) -> Iterator[str]:
+        """Yield the rendered template in pieces, streaming callable variables chunk by chunk.
+
+        Placeholders without a variable are left in the output as they are."""
+        for index, segment in enumerate(self.segments):
+            if index % 2 == 0:
+                if segment:
+                    yield segment
+                continue
+            if segment not in variables:
+                yield f"{{{{ {segment} }}}}"
+                continue
+            value = variables[segment]
+            if callable(value):
+                yield from value()
+            elif isinstance(value, list):
+                yield ", ".join(value)
+            else:
+                yield str(value)
+
+    def render(self, variables:dict[str, TemplateValue]) -> str:
+        return "".join(self.iter_render(variables))
+
+    def __repr__(self) -> str:
+        return f"CompiledTemplate({self.path}, {len(self.segments) // 2} variables, {len(self.files)} files)"
+
+
+def _parse_template(text:str, path:str) -> tuple[str|None, list]:
+    """Split template text into its parent layout (if it extends one) and a tree of text, includes and blocks"""
+    extends = None
+    root:list = []
+    open_blocks:list[tuple[str|None, list]] = [(None, root)]
+    position = 0
+    for match in TEMPLATE_TAG_PATTERN.finditer(text):
+        nodes = open_blocks[-1][1]
+        nodes.append(text[position:match.start()])
+        position = match.end()
+        tag, quoted, word = match.groups()
+        match tag:
+            case "extends" if quoted is not None and extends is None and len(open_blocks) == 1:
+                extends = quoted
+            case "include" if quoted is not None:
+                nodes.append(_Include(quoted))
+            case "block" if word is not None:
+                block = _Block(word, [])
+                nodes.append(block)
+                open_blocks.append((word, block.children))
+            case "endblock" if len(open_blocks) > 1 and word in (None, open_blocks[-1][0]):
+                open_blocks.pop()
+            case _:
+                raise ValueError(f"Invalid template tag {match.group()} in {path}")
+    open_blocks[-1][1].append(text[position:])
+    if len(open_blocks) > 1:
+        raise ValueError(f"Unclosed block {open_blocks[-1][0]} in {path}")
+    return extends, root
+
+
+def _collect_blocks(nodes:list, path:str, blocks:dict[str, tuple[list, str]]) -> None:
+    for node in nodes:
+        if isinstance(node, _Block):
+            blocks.setdefault(node.name, (node.children, path))
+            _collect_blocks(node.children, path, blocks)
+
+
+class _TemplateCompiler:
+    def __init__(self) -> None:
+        self.files:dict[str, str] = {}
+        self.segments = [""]
+
+    def parse(self, path:str) -> tuple[str|None, list]:
+        try:
+            with open(path, 'rb') as f:
+                source = f.read()
+        except FileNotFoundError:
+            raise ValueError(f"Template {path} does not exist") from None
+        self.files[path] = hashlib.sha256(source).hexdigest()
+        return _parse_template(source.decode('utf-8'), path)
+
+    def compile(self, path:str, overrides:dict[str, tuple[list, str]], chain:tuple[str, ...]) -> None:
+        if path in chain:
+            raise ValueError(f"Template {path} includes or extends itself")
+        chain += (path,)
+        extends, nodes = self.parse(path)
+        if extends is None:
+            self.emit(nodes, path, overrides, chain)
+            return
+        # blocks of the most derived template win, anything outside blocks is dropped
+        blocks = dict(overrides)
+        _collect_blocks(nodes, path, blocks)
+        self.compile(_resolve(path, extends), blocks, chain)
+
+    def emit(self, nodes:list, path:str, overrides:dict[str, tuple[list, str]], chain:tuple[str, ...]) -> None:
+        for node in nodes:
+            if isinstance(node, str):
+                parts = VARIABLE_PATTERN.split(node)
+                self.segments[-1] += parts[0]
+                self.segments.extend(parts[1:])
+            elif isinstance(node, _Include):
+                # partials render their own blocks, they don't take part in the layout's overrides
+                self.compile(_resolve(path, node.name), {}, chain)
+            else:
+                children, children_path = overrides.get(node.name, (node.children, path))
+                self.emit(children, children_path, overrides, chain)
+
+
+def _resolve(path:str, name:str) -> str:
+    # layouts and partials are named relative to the template that uses them
+    return os.path.normpath(os.path.join(os.path.dirname(path), name))
+
+
+def compile_template(path:str) -> CompiledTemplate:
+    """Compile the template at path, resolving the layouts it extends and the partials it includes"""
+    path = os.path.abspath(path)
+    compiler = _TemplateCompiler()
+    compiler.compile(path, {}, ())
+    return CompiledTemplate(path, compiler.segments, compiler.files)
+
+
+class TemplateCache:
+    """Compiled templates by path, reused while the hashes of all their files are unchanged.
+
+    Checking a cached template costs a stat per file: hashes are only recomputed when a
+    file's mtime or size changes."""
+    def __init__(self, hasher:FileHasher=TEMPLATE_HASHES) -> None:
+        self.hasher = hasher
+        self.hits = 0
+        self.compiles = 0
+        self._templates:dict[str, CompiledTemplate] = {}
+        self._lock = threading.Lock()
+
+    def get(self, path:str) -> CompiledTemplate:
+        path = os.path.abspath(path)
+        template = self._templates.get(path)
+        if template is not None and self._is_current(template):
+            self.hits += 1
+            return template
+        template = compile_template(path)
+        with self._lock:
+            self._templates[path] = template
+            self.compiles += 1
+        return template
+
+    def _is_current(self, template:CompiledTemplate) -> bool:
+        try:
+            return all(self.hasher.hash_file(file_path) == digest for file_path, digest in template.files.items())
+        except FileNotFoundError:
+            return False
+
+    def snapshot(self) -> list[CompiledTemplate]:
+        with self._lock:
+            return list(self._templates.values())
+
+    def preload(self, templates:Iterable[CompiledTemplate]) -> None:
+        with self._lock:
+            for template in templates:
+                self._templates[template.path] = template
+
+    def __len__(self) -> int:
+        return len(self._templates)
+
+
+# process wide, worker processes are preloaded with the templates compiled by the parent
+TEMPLATES = TemplateCache()
+
+
+def preload_templates(templates:list[CompiledTemplate]) -> None:
+    """Process pool initializer: start a worker with already compiled templates"""
+    TEMPLATES.preload(templates)
@@ -0,0 +1,81 @@
+import importlib
+import os
+import stat
+import tempfile
+import unittest
+from unittest import mock
+
+import atomic
+from atomic import atomic_open, atomic_write, current_umask, file_mode, make_staging_directory, swap_directory
+
+
+class TestAtomicOpen(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp_dir.name, "page.html")
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def read(self):
+        with open(self.path, 'r', encoding='utf-8') as f:
+            return f.read()
+
+    def test_replaces_only_when_complete(self):
+        atomic_write(self.path, "old")
+        with atomic_open(self.path) as f:
+            f.write("new")
+            self.assertEqual(self.read(), "old")
+        self.assertEqual(self.read(), "new")
+        self.assertEqual(os.listdir(self.tmp_dir.name), ["page.html"])
+
+    def test_failed_write_leaves_file_alone(self):
+        atomic_write(self.path, "old")
+        with self.assertRaises(RuntimeError):
+            with atomic_open(self.path) as f:
+                f.write("partial")
+                raise RuntimeError("render failed")
+        self.assertEqual(self.read(), "old")
+        self.assertEqual(os.listdir(self.tmp_dir.name), ["page.html"])
+
+    def test_published_with_default_permissions(self):
+        atomic_write(self.path, "text")
+        self.assertEqual(stat.S_IMODE(os.stat(self.path).st_mode), file_mode())
+
+
+class TestUmask(unittest.TestCase):
+    def test_import_leaves_umask_alone(self):
+        with mock.patch("os.umask") as umask:
+            importlib.reload(atomic)
+        umask.assert_not_called()
+
+    def test_fallback_matches_proc(self):
+        umask = current_umask()
+        with mock.patch.object(atomic, "_umask", None), mock.patch.object(atomic, "_read_proc_umask", return_value=None):
+            self.assertEqual(atomic.current_umask(), umask)
+        self.assertEqual(os.umask(umask), umask)
+
+
+class TestSwapDirectory(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.dest_dir = os.path.join(self.tmp_dir.name, "public")
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def build(self, name):
+        staging_dir = make_staging_directory(self.dest_dir)
+        atomic_write(os.path.join(staging_dir, name), name)
+        swap_directory(staging_dir, self.dest_dir)
+
+    def test_swaps_whole_directory(self):
+        self.build("first.html")
+        self.build("second.html")
+        self.assertEqual(os.listdir(self.dest_dir), ["second.html"])
+        # neither the staging nor the old directory is left behind
+        self.assertEqual(os.listdir(self.tmp_dir.name), ["public"])
+
+
+if __name__ == "__main__":
+    unittest.main()
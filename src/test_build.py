@@ -0,0 +1,371 @@
+import hashlib
+import io
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+from listing import PageRecord
+from manifest import hash_tree, read_manifest
+import build
+from deps import DependencyGraph
+import htmlnode
+from build import build_shard, build_site, content_url, find_content_pages, generate_listings, generate_page, generate_pages_recursive, merge_shards, output_path, query_dependencies, render_page, write_large_page
+from stats import SiteStats
+
+
+class TestContentPaths(unittest.TestCase):
+    def test_content_url(self):
+        self.assertEqual(content_url("index.md"), "/")
+        self.assertEqual(content_url(os.path.join("blog", "tom", "index.md")), "/blog/tom")
+        self.assertEqual(content_url("about.md"), "/about.html")
+
+    def test_output_path(self):
+        self.assertEqual(output_path("/out", "/"), os.path.join("/out", "index.html"))
+        self.assertEqual(output_path("/out", "/blog/tom"), os.path.join("/out", "blog", "tom", "index.html"))
+        self.assertEqual(output_path("/out", "/about.html"), os.path.join("/out", "about.html"))
+
+
+class TestGeneratePagesRecursive(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.content_dir = os.path.join(self.tmp_dir.name, "content")
+        self.dest_dir = os.path.join(self.tmp_dir.name, "public")
+        self.template_path = os.path.join(self.tmp_dir.name, "template.html")
+        self.write(self.template_path, "<title>{{ Title }}</title>{{ Content }}")
+        self.write(os.path.join(self.content_dir, "index.md"), "# Home")
+        self.write(os.path.join(self.content_dir, "blog", "b", "index.md"), "---\ndate: 2024-02-01\ntags: [x]\n---\n# B post")
+        self.write(os.path.join(self.content_dir, "blog", "a", "index.md"), "---\ntitle: A post\ndate: 2024-01-01\n---\n# Heading")
+        self.write(os.path.join(self.content_dir, "blog", "wip", "index.md"), "---\ndraft: true\n---\n# Draft")
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def write(self, path, text):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(text)
+
+    def read(self, *parts):
+        with open(os.path.join(self.dest_dir, *parts), 'r', encoding='utf-8') as f:
+            return f.read()
+
+    def test_find_content_pages_sorted(self):
+        self.assertEqual(
+            find_content_pages(self.content_dir),
+            ["index.md", os.path.join("blog", "a", "index.md"), os.path.join("blog", "b", "index.md"), os.path.join("blog", "wip", "index.md")],
+        )
+
+    def test_builds_pages_and_skips_drafts(self):
+        records = generate_pages_recursive(self.content_dir, self.template_path, self.dest_dir)
+        self.assertEqual([record.url for record in records], ["/", "/blog/a", "/blog/b"])
+        self.assertEqual(records[1].title, "A post")
+        self.assertEqual(records[2], PageRecord("/blog/b", "B post", "2024-02-01", ["x"], os.path.join(self.content_dir, "blog", "b", "index.md")))
+        self.assertEqual(self.read("blog", "a", "index.html"), '<title>A post</title><div><h1 id="heading">Heading</h1></div>')
+        self.assertFalse(os.path.exists(os.path.join(self.dest_dir, "blog", "wip", "index.html")))
+
+    def test_title_is_not_taken_from_front_matter(self):
+        self.write(os.path.join(self.content_dir, "blog", "b", "index.md"), "---\n# draft notes, fill in tags later\ndate: 2024-02-01\n---\n# Real Title")
+        records = generate_pages_recursive(self.content_dir, self.template_path, self.dest_dir)
+        # large pages are streamed and their record reads the file again
+        with mock.patch.object(build, "MMAP_MIN_SIZE", 1):
+            streamed_records = generate_pages_recursive(self.content_dir, self.template_path, self.dest_dir)
+        for record_list in [records, streamed_records]:
+            self.assertEqual(record_list[2].title, "Real Title")
+        self.assertEqual(self.read("blog", "b", "index.html"), '<title>Real Title</title><div><h1 id="real-title">Real Title</h1></div>')
+
+    def test_error_position_with_repeated_block_text(self):
+        path = os.path.join(self.content_dir, "blog", "b", "index.md")
+        self.write(path, "---\ntitle: B\n---\n```\nsome **bold\n```\n\nsome **bold\n")
+        for mmap_min_size in [build.MMAP_MIN_SIZE, 1]:
+            with mock.patch.object(build, "MMAP_MIN_SIZE", mmap_min_size), self.assertRaises(build.BuildError) as raised:
+                generate_pages_recursive(self.content_dir, self.template_path, self.dest_dir)
+            self.assertEqual(str(raised.exception.errors[0]), f"{path}:8:6: Found unmatched delimiter '**' in text: some **bold")
+
+    def test_empty_page_is_not_memory_mapped(self):
+        self.write(os.path.join(self.content_dir, "empty.md"), "")
+        for mmap_min_size in [0, 1]:
+            with mock.patch.object(build, "MMAP_MIN_SIZE", mmap_min_size), self.assertRaises(build.BuildError) as raised:
+                generate_pages_recursive(self.content_dir, self.template_path, self.dest_dir)
+            self.assertEqual([str(error) for error in raised.exception.errors], [os.path.join(self.content_dir, "empty.md") + ": No level 1 heading found for title"])
+
+    def test_parallel_matches_serial(self):
+        serial = generate_pages_recursive(self.content_dir, self.template_path, self.dest_dir)
+        parallel = generate_pages_recursive(self.content_dir, self.template_path, self.dest_dir, workers=2)
+        self.assertEqual(serial, parallel)
+
+    def test_collects_site_stats(self):
+        site_stats = SiteStats()
+        generate_pages_recursive(self.content_dir, self.template_path, self.dest_dir, workers=2, site_stats=site_stats)
+        self.assertEqual(sorted(site_stats.pages), ["/", "/blog/a", "/blog/b"])
+        self.assertEqual(site_stats.total.pages, 3)
+        self.assertEqual(site_stats.total.blocks, {"heading": 3})
+        self.assertEqual(site_stats.pages["/blog/a"].output_bytes, len('<title>A post</title><div><h1 id="heading">Heading</h1></div>'))
+
+    def test_generate_listings(self):
+        records = generate_pages_recursive(self.content_dir, self.template_path, self.dest_dir)
+        generate_listings(records, self.template_path, self.dest_dir)
+        archive = self.read("blog", "index.html")
+        self.assertTrue(archive.startswith("<title>Blog posts</title>"))
+        self.assertLess(archive.index("/blog/b"), archive.index("/blog/a"))
+        self.assertNotIn('href="/"', archive)
+        self.assertIn('href="/blog/b"', self.read("tags", "x", "index.html"))
+
+
+class SiteSourcesMixin:
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.content_dir = os.path.join(self.tmp_dir.name, "content")
+        self.static_dir = os.path.join(self.tmp_dir.name, "static")
+        self.dest_dir = os.path.join(self.tmp_dir.name, "public")
+        self.template_path = os.path.join(self.tmp_dir.name, "template.html")
+        self.write(self.template_path, "<title>{{ Title }}</title>{{ Content }}")
+        self.write(os.path.join(self.static_dir, "index.css"), "body {}")
+        self.write(os.path.join(self.content_dir, "index.md"), "# Home")
+        for name in ["a", "b", "c"]:
+            self.write(os.path.join(self.content_dir, "blog", name, "index.md"), f"---\ndate: 2024-01-0{len(name)}\ntags: [x, y]\n---\n# Post {name}")
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def write(self, path, text):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(text)
+
+    def tree_hashes(self, directory):
+        hashes = {}
+        for root, _, files in os.walk(directory):
+            for name in files:
+                path = os.path.join(root, name)
+                with open(path, 'rb') as f:
+                    hashes[os.path.relpath(path, directory)] = hashlib.sha256(f.read()).hexdigest()
+        return hashes
+
+
+class TestBuildSite(SiteSourcesMixin, unittest.TestCase):
+    def test_builds_are_reproducible(self):
+        build_site(self.content_dir, self.static_dir, self.template_path, self.dest_dir)
+        serial = self.tree_hashes(self.dest_dir)
+        build_site(self.content_dir, self.static_dir, self.template_path, self.dest_dir, workers=2)
+        self.assertEqual(self.tree_hashes(self.dest_dir), serial)
+        self.assertIn("index.css", serial)
+        self.assertIn("atom.xml", serial)
+        self.assertEqual(sorted(os.listdir(self.tmp_dir.name)), ["content", "public", "static", "template.html"])
+
+    def test_build_records_delta(self):
+        state_dir = os.path.join(self.tmp_dir.name, "state")
+        build_site(self.content_dir, self.static_dir, self.template_path, self.dest_dir, state_dir=state_dir)
+        self.write(os.path.join(self.content_dir, "index.md"), "# New home")
+        os.remove(os.path.join(self.content_dir, "blog", "c", "index.md"))
+        build_site(self.content_dir, self.static_dir, self.template_path, self.dest_dir, state_dir=state_dir)
+        with open(os.path.join(state_dir, "delta.json"), 'r', encoding='utf-8') as f:
+            delta = json.load(f)
+        self.assertEqual(delta["added"], {})
+        self.assertEqual(sorted(delta["deleted"]), ["blog/c/index.html"])
+        # the home page changed and so did every listing, sitemap and feed that mentioned post c
+        self.assertIn("index.html", delta["modified"])
+        self.assertIn("sitemap.xml", delta["modified"])
+        self.assertNotIn("blog/a/index.html", delta["modified"])
+        self.assertNotIn("index.css", delta["modified"])
+
+    def test_manifest_matches_output(self):
+        # the digests are taken while writing, for pages written whole, streamed or in workers
+        state_dir = os.path.join(self.tmp_dir.name, "state")
+        self.write(os.path.join(self.static_dir, "images", "a.png"), "png")
+        for workers, mmap_min_size in [(1, build.MMAP_MIN_SIZE), (2, build.MMAP_MIN_SIZE), (1, 1)]:
+            with mock.patch.object(build, "MMAP_MIN_SIZE", mmap_min_size):
+                build_site(self.content_dir, self.static_dir, self.template_path, self.dest_dir, workers=workers, state_dir=state_dir)
+            self.assertEqual(read_manifest(os.path.join(state_dir, "manifest.json")), hash_tree(self.dest_dir))
+
+    def test_build_records_dependencies(self):
+        state_dir = os.path.join(self.tmp_dir.name, "state")
+        self.write(os.path.join(self.static_dir, "images", "a.png"), "png")
+        self.write(os.path.join(self.content_dir, "blog", "a", "index.md"), "# Post a\n\n![a](/images/a.png) ![remote](https://example.com/b.png)")
+        build_site(self.content_dir, self.static_dir, self.template_path, self.dest_dir, workers=2, state_dir=state_dir)
+        graph = DependencyGraph.load(os.path.join(state_dir, "deps.json"))
+        post_a = os.path.join(self.content_dir, "blog", "a", "index.md")
+        image = os.path.join(self.static_dir, "images", "a.png")
+        self.assertEqual(
+            query_dependencies(graph, self.dest_dir, os.path.join(self.dest_dir, "blog", "a", "index.html")),
+            [post_a, self.template_path, image],
+        )
+        self.assertEqual(graph.dependencies("images/a.png"), [image])
+        self.assertIn(post_a, graph.dependencies("blog/index.html"))
+        self.assertIn(post_a, graph.dependencies("sitemap.xml"))
+        self.assertNotIn(post_a, graph.dependencies("index.html"))
+        # every output is in the graph
+        self.assertEqual(sorted(graph.outputs), sorted(self.tree_hashes(self.dest_dir)))
+        self.assertIn(os.path.join(self.dest_dir, "blog", "a", "index.html"), query_dependencies(graph, self.dest_dir, image))
+
+    def test_markdown_characters_in_titles_and_tags(self):
+        self.write(os.path.join(self.content_dir, "blog", "d", "index.md"), "---\ntitle: a_b *c*\ndate: 2024-01-05\ntags: [snake_case, \"!!!\"]\n---\n# Post d")
+        build_site(self.content_dir, self.static_dir, self.template_path, self.dest_dir)
+        with open(os.path.join(self.dest_dir, "tags", "snake-case", "index.html"), encoding='utf-8') as f:
+            self.assertIn('<a href="/blog/d">a_b *c*</a>', f.read())
+        self.assertEqual(len(os.listdir(os.path.join(self.dest_dir, "tags"))), 5)
+
+    def test_scalar_tags(self):
+        self.write(os.path.join(self.content_dir, "blog", "d", "index.md"), "---\ndate: 2024-01-05\ntags: 2024\n---\n# Post d")
+        build_site(self.content_dir, self.static_dir, self.template_path, self.dest_dir)
+        with open(os.path.join(self.dest_dir, "tags", "2024", "index.html"), encoding='utf-8') as f:
+            self.assertIn('<a href="/blog/d">Post d</a>', f.read())
+
+    def test_all_page_errors_are_reported(self):
+        self.write(os.path.join(self.content_dir, "broken.md"), "---\ndate: 2024-01-01\n---\n# Broken\n\nsome **bold\n")
+        self.write(os.path.join(self.content_dir, "blog", "d", "index.md"), "no title here")
+        self.write(os.path.join(self.content_dir, "blog", "e", "index.md"), "# E\n\n- a `b")
+        for workers in [1, 2]:
+            with self.assertRaises(build.BuildError) as raised:
+                build_site(self.content_dir, self.static_dir, self.template_path, self.dest_dir, workers=workers)
+            self.assertEqual([str(error) for error in raised.exception.errors], [
+                os.path.join(self.content_dir, "broken.md") + ":6:6: Found unmatched delimiter '**' in text: some **bold",
+                os.path.join(self.content_dir, "blog", "d", "index.md") + ": No level 1 heading found for title",
+                os.path.join(self.content_dir, "blog", "e", "index.md") + ":3:5: Found unmatched delimiter '`' in text: a `b",
+            ])
+            self.assertTrue(str(raised.exception).startswith("3 pages failed to build:\n  "))
+        self.assertFalse(os.path.exists(self.dest_dir))
+
+    def test_failed_build_keeps_previous_output(self):
+        build_site(self.content_dir, self.static_dir, self.template_path, self.dest_dir)
+        before = self.tree_hashes(self.dest_dir)
+        self.write(os.path.join(self.content_dir, "broken.md"), "no title here")
+        with self.assertRaises(ValueError):
+            build_site(self.content_dir, self.static_dir, self.template_path, self.dest_dir)
+        self.assertEqual(self.tree_hashes(self.dest_dir), before)
+        self.assertEqual(sorted(os.listdir(self.tmp_dir.name)), ["content", "public", "static", "template.html"])
+
+
+class TestConfiguredBuild(SiteSourcesMixin, unittest.TestCase):
+    def setUp(self):
+        super().setUp()
+        limits = build.cache_limits()
+        self.addCleanup(build.set_cache_limits, *limits)
+
+    def test_stages(self):
+        state_dir = os.path.join(self.tmp_dir.name, "state")
+        build_site(self.content_dir, self.static_dir, self.template_path, self.dest_dir, state_dir=state_dir, stages=["static"])
+        self.assertEqual(sorted(os.listdir(self.dest_dir)), ["blog", "index.css", "index.html"])
+        self.assertFalse(os.path.exists(state_dir))
+
+    def test_cache_limits(self):
+        build.set_cache_limits(1024, 16, 10)
+        self.assertEqual(build.cache_limits(), (1024, 16, 10))
+        self.assertEqual(build.PAGE_CACHE.max_bytes, 1024)
+        build.set_cache_limits(intern_entries=0)
+        self.assertEqual(build.cache_limits(), (1024, 0, 10))
+        self.assertIsNone(htmlnode.LEAF_NODES)
+
+
+class TestShardedBuild(SiteSourcesMixin, unittest.TestCase):
+    def setUp(self):
+        super().setUp()
+        for name in ["d", "e", "f", "g"]:
+            self.write(os.path.join(self.content_dir, "docs", f"{name}.md"), f"# Doc {name}")
+        self.state_dir = os.path.join(self.tmp_dir.name, "state")
+
+    def build_shards(self, count, state_dir=None):
+        for index in range(1, count + 1):
+            build_shard(self.content_dir, self.static_dir, self.template_path, state_dir or self.state_dir, index, count)
+
+    def test_merge_matches_single_build(self):
+        single_state_dir = os.path.join(self.tmp_dir.name, "single")
+        build_site(self.content_dir, self.static_dir, self.template_path, self.dest_dir, state_dir=single_state_dir)
+        single = self.tree_hashes(self.dest_dir)
+        self.build_shards(3)
+        merged = merge_shards(self.content_dir, self.static_dir, self.template_path, self.dest_dir, self.state_dir)
+        self.assertEqual(self.tree_hashes(self.dest_dir), single)
+        self.assertEqual([record.url for record in merged], ["/", "/blog/a", "/blog/b", "/blog/c", "/docs/d.html", "/docs/e.html", "/docs/f.html", "/docs/g.html"])
+        for name in ["manifest.json", "deps.json"]:
+            with open(os.path.join(single_state_dir, name), 'r', encoding='utf-8') as single_file, open(os.path.join(self.state_dir, name), 'r', encoding='utf-8') as merged_file:
+                self.assertEqual(json.load(merged_file), json.load(single_file))
+
+    def test_merge_shards_built_under_another_root(self):
+        self.write(os.path.join(self.static_dir, "images", "a.png"), "png")
+        self.write(os.path.join(self.content_dir, "blog", "a", "index.md"), "# Post a\n\n![a](/images/a.png)")
+        self.build_shards(2)
+        with tempfile.TemporaryDirectory() as other_tmp_dir:
+            moved = os.path.join(other_tmp_dir, "site")
+            shutil.copytree(self.tmp_dir.name, moved)
+            self.tmp_dir.cleanup()
+            content_dir, static_dir, template_path = (os.path.join(moved, name) for name in ["content", "static", "template.html"])
+            merge_shards(content_dir, static_dir, template_path, os.path.join(moved, "public"), os.path.join(moved, "state"))
+            graph = DependencyGraph.load(os.path.join(moved, "state", "deps.json"))
+            self.assertEqual(graph.dependencies("blog/a/index.html"), [os.path.join(content_dir, "blog", "a", "index.md"), template_path, os.path.join(static_dir, "images", "a.png")])
+            self.assertTrue(all(path.startswith(moved) for output in graph.outputs for path in graph.dependencies(output)))
+
+    def test_shards_split_the_pages(self):
+        self.build_shards(3)
+        shard_pages = []
+        for index in range(1, 4):
+            with open(os.path.join(self.state_dir, "shards", "3", str(index), "shard.json"), 'r', encoding='utf-8') as f:
+                shard_pages.append(json.load(f)["pages"])
+        self.assertEqual(sorted(sum(shard_pages, [])), ["blog/a/index.md", "blog/b/index.md", "blog/c/index.md", "docs/d.md", "docs/e.md", "docs/f.md", "docs/g.md", "index.md"])
+        self.assertTrue(all(shard_pages))
+        # shards only hold their pages, the merge adds everything else
+        self.assertFalse(os.path.exists(os.path.join(self.state_dir, "shards", "3", "1", "public", "index.css")))
+
+    def test_missing_shard(self):
+        build_shard(self.content_dir, self.static_dir, self.template_path, self.state_dir, 1, 2)
+        with self.assertRaisesRegex(ValueError, "Shard 2/2 has not been built"):
+            merge_shards(self.content_dir, self.static_dir, self.template_path, self.dest_dir, self.state_dir)
+        self.assertFalse(os.path.exists(self.dest_dir))
+
+    def test_stale_shard_counts(self):
+        self.build_shards(2)
+        self.build_shards(3)
+        with self.assertRaisesRegex(ValueError, "more than one shard count"):
+            merge_shards(self.content_dir, self.static_dir, self.template_path, self.dest_dir, self.state_dir)
+
+    def test_content_changed_since_shard_build(self):
+        self.build_shards(2)
+        self.write(os.path.join(self.content_dir, "docs", "h.md"), "# Doc h")
+        with self.assertRaisesRegex(ValueError, "built from different content pages"):
+            merge_shards(self.content_dir, self.static_dir, self.template_path, self.dest_dir, self.state_dir)
+
+    def test_shard_output_changed_since_build(self):
+        self.build_shards(2)
+        with open(os.path.join(self.state_dir, "shards", "2", "1", "shard.json"), 'r', encoding='utf-8') as f:
+            output = next(iter(json.load(f)["manifest"]))
+        self.write(os.path.join(self.state_dir, "shards", "2", "1", "public", *output.split("/")), "tampered")
+        with self.assertRaisesRegex(ValueError, "changed since the manifest was written"):
+            merge_shards(self.content_dir, self.static_dir, self.template_path, self.dest_dir, self.state_dir)
+
+
+class TestLargePages(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.template_path = os.path.join(self.tmp_dir.name, "template.html")
+        with open(self.template_path, 'w', encoding='utf-8') as f:
+            f.write("<title>{{ Title }}</title><p>{{ tags }}</p>{{ Content }}<footer>{{ Title }}</footer>")
+        self.md_path = os.path.join(self.tmp_dir.name, "page.md")
+        sections = [f"## Section {i} & more\n\nSome **bold** [link](/{i}) text\n\n```python\nx = {i}\n```" for i in range(50)]
+        with open(self.md_path, 'w', encoding='utf-8', newline='\r\n') as f:
+            f.write("---\ntags: [a, b]\n---\n" + "\n\n".join(["Intro", "# The <Title>"] + sections))
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_streamed_output_matches_render_page(self):
+        stream = io.StringIO()
+        write_large_page(self.md_path, self.template_path, stream)
+        self.assertEqual(stream.getvalue(), render_page(self.md_path, self.template_path))
+        self.assertTrue(stream.getvalue().startswith("<title>The &lt;Title&gt;</title>"))
+
+    def test_table_of_contents_above_streamed_content(self):
+        with open(self.template_path, 'w', encoding='utf-8') as f:
+            f.write("<nav>{{ TOC }}</nav>{{ Content }}")
+        stream = io.StringIO()
+        write_large_page(self.md_path, self.template_path, stream)
+        self.assertEqual(stream.getvalue(), render_page(self.md_path, self.template_path))
+        self.assertTrue(stream.getvalue().startswith('<nav><ul><li><a href="#the-title">The &lt;Title&gt;</a><ul><li><a href="#section-0-more">'))
+
+    def test_generate_page_streams_large_sources(self):
+        dest_path = os.path.join(self.tmp_dir.name, "page.html")
+        with mock.patch.object(build, "MMAP_MIN_SIZE", 1), mock.patch.object(build, "render_page") as in_memory:
+            generate_page(self.md_path, self.template_path, dest_path, cache=None)
+        in_memory.assert_not_called()
+        with open(dest_path, 'r', encoding='utf-8') as f:
+            self.assertEqual(f.read(), render_page(self.md_path, self.template_path))
@@ -0,0 +1,149 @@
+import os
+import tempfile
+import unittest
+
+from cache import FileHasher, RenderCache, source_key
+from build import render_page
+
+
+class TestRenderCache(unittest.TestCase):
+    def test_get_miss_and_hit(self):
+        cache = RenderCache(100)
+        self.assertIsNone(cache.get(("a",)))
+        self.assertTrue(cache.put(("a",), "hello"))
+        self.assertEqual(cache.get(("a",)), "hello")
+        self.assertEqual(cache.stats()["hits"], 1)
+        self.assertEqual(cache.stats()["misses"], 1)
+
+    def test_budget_is_in_bytes(self):
+        cache = RenderCache(10)
+        cache.put(("a",), "12345")
+        cache.put(("b",), "12345")
+        self.assertEqual(cache.current_bytes, 10)
+        # multi-byte characters count by their encoded size
+        cache.put(("c",), "éé")
+        self.assertEqual(cache.current_bytes, 9)
+        self.assertNotIn(("a",), cache)
+        self.assertEqual(cache.evictions, 1)
+
+    def test_evicts_least_recently_used(self):
+        cache = RenderCache(10)
+        cache.put(("a",), "12345")
+        cache.put(("b",), "12345")
+        cache.get(("a",))
+        cache.put(("c",), "12345")
+        self.assertIn(("a",), cache)
+        self.assertNotIn(("b",), cache)
+        self.assertIn(("c",), cache)
+
+    def test_resize(self):
+        cache = RenderCache(15)
+        for key in "abc":
+            cache.put((key,), "12345")
+        cache.get(("a",))
+        cache.resize(10)
+        self.assertEqual(cache.current_bytes, 10)
+        self.assertNotIn(("b",), cache)
+        self.assertTrue(cache.put(("d",), "12345"))
+        self.assertNotIn(("c",), cache)
+        with self.assertRaises(ValueError):
+            cache.resize(-1)
+
+    def test_large_entry_evicts_several(self):
+        cache = RenderCache(10)
+        for key in "abcde":
+            cache.put((key,), "12")
+        cache.put(("big",), "123456789")
+        self.assertEqual(len(cache), 1)
+        self.assertEqual(cache.evictions, 5)
+
+    def test_oversized_entry_not_cached(self):
+        cache = RenderCache(4)
+        cache.put(("a",), "12")
+        self.assertFalse(cache.put(("b",), "12345"))
+        self.assertNotIn(("b",), cache)
+        self.assertIn(("a",), cache)
+
+    def test_replace_existing_key(self):
+        cache = RenderCache(10)
+        cache.put(("a",), "12345")
+        cache.put(("a",), "123")
+        self.assertEqual(cache.current_bytes, 3)
+        self.assertEqual(cache.get(("a",)), "123")
+
+    def test_clear(self):
+        cache = RenderCache(10)
+        cache.put(("a",), "12345")
+        cache.clear()
+        self.assertEqual(len(cache), 0)
+        self.assertEqual(cache.current_bytes, 0)
+
+    def test_negative_budget_raises(self):
+        with self.assertRaises(ValueError):
+            RenderCache(-1)
+
+
+class TestRenderPageCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.md_path = os.path.join(self.tmp_dir.name, "index.md")
+        self.template_path = os.path.join(self.tmp_dir.name, "template.html")
+        self.write(self.md_path, "# Title\n\nSome **text**")
+        self.write(self.template_path, "<title>{{ Title }}</title>{{ Content }}")
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def write(self, path, text, mtime_ns=None):
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(text)
+        if mtime_ns is not None:
+            os.utime(path, ns=(mtime_ns, mtime_ns))
+
+    def test_render_without_cache(self):
+        html = render_page(self.md_path, self.template_path)
+        self.assertEqual(html, '<title>Title</title><div><h1 id="title">Title</h1><p>Some <b>text</b></p></div>')
+
+    def test_repeat_render_hits_cache(self):
+        cache = RenderCache()
+        first = render_page(self.md_path, self.template_path, cache)
+        second = render_page(self.md_path, self.template_path, cache)
+        self.assertEqual(first, second)
+        self.assertEqual(cache.stats()["hits"], 1)
+        self.assertEqual(cache.stats()["misses"], 1)
+
+    def test_source_change_invalidates(self):
+        cache = RenderCache()
+        render_page(self.md_path, self.template_path, cache)
+        self.write(self.md_path, "# Other\n\nChanged", mtime_ns=source_key(self.md_path)[1] + 1_000_000_000)
+        html = render_page(self.md_path, self.template_path, cache)
+        self.assertIn('<h1 id="other">Other</h1>', html)
+
+    def test_template_change_invalidates(self):
+        cache = RenderCache()
+        render_page(self.md_path, self.template_path, cache)
+        self.write(self.template_path, "<h1>{{ Title }}</h1>", mtime_ns=source_key(self.template_path)[1] + 1_000_000_000)
+        self.assertEqual(render_page(self.md_path, self.template_path, cache), "<h1>Title</h1>")
+
+    def test_partial_change_invalidates(self):
+        cache = RenderCache()
+        footer_path = os.path.join(self.tmp_dir.name, "footer.html")
+        self.write(footer_path, "<footer>one</footer>")
+        self.write(self.template_path, "{{ Title }}{% include \"footer.html\" %}")
+        self.assertEqual(render_page(self.md_path, self.template_path, cache), "Title<footer>one</footer>")
+        self.write(footer_path, "<footer>two</footer>", mtime_ns=source_key(footer_path)[1] + 1_000_000_000)
+        self.assertEqual(render_page(self.md_path, self.template_path, cache), "Title<footer>two</footer>")
+
+
+class TestFileHasher(unittest.TestCase):
+    def test_hash_is_stable_and_tracks_changes(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, "f.txt")
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write("one")
+            hasher = FileHasher()
+            first = hasher.hash_file(path)
+            self.assertEqual(first, hasher.hash_file(path))
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write("two!")
+            self.assertNotEqual(first, hasher.hash_file(path))
@@ -0,0 +1,83 @@
+import os
+import tempfile
+import unittest
+
+from config import BUILD_STAGES, BuildConfig, load_config, parse_config
+
+
+class TestParseConfig(unittest.TestCase):
+    def test_defaults(self):
+        config = parse_config({}, "/site")
+        self.assertEqual((config.content_dir, config.static_dir, config.template_path, config.public_dir, config.state_dir),
+                         ("/site/content", "/site/static", "/site/template.html", "/site/public", "/site/.build"))
+        self.assertEqual(config.workers, os.cpu_count() or 1)
+        self.assertIsNone(config.io_workers)
+        self.assertIsNone(config.render_cache_bytes)
+        self.assertEqual(config.stages, BUILD_STAGES)
+
+    def test_values(self):
+        config = parse_config({
+            "dirs": {"content": "pages", "public": "/srv/www"},
+            "build": {"workers": 2, "io_workers": 4},
+            "cache": {"dir": "state", "render_bytes": 1024, "intern_entries": 0, "mmap_min_size": 10},
+            "stages": {"feeds": False, "listings": True},
+        }, "/site")
+        self.assertEqual((config.content_dir, config.public_dir, config.state_dir), ("/site/pages", "/srv/www", "/site/state"))
+        self.assertEqual((config.workers, config.io_workers), (2, 4))
+        self.assertEqual((config.render_cache_bytes, config.intern_entries, config.mmap_min_size), (1024, 0, 10))
+        self.assertEqual(config.stages, ("static", "listings", "manifest"))
+
+    def test_invalid(self):
+        for data in [
+            {"server": {"port": 8888}},
+            {"dirs": "content"},
+            {"dirs": {"output": "public"}},
+            {"build": {"workers": "4"}},
+            {"build": {"workers": True}},
+            {"build": {"workers": 0}},
+            {"cache": {"render_bytes": -1}},
+            {"cache": {"mmap_min_size": 0}},
+            {"stages": {"feeds": "no"}},
+            {"stages": {"pages": False}},
+        ]:
+            with self.assertRaises(ValueError, msg=data):
+                parse_config(data, "/site")
+
+
+class TestLoadConfig(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def write(self, name, text):
+        path = os.path.join(self.tmp_dir.name, name)
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(text)
+        return path
+
+    def test_without_config_file(self):
+        config = load_config(self.tmp_dir.name)
+        self.assertIsInstance(config, BuildConfig)
+        self.assertEqual(config.content_dir, os.path.join(self.tmp_dir.name, "content"))
+
+    def test_site_toml(self):
+        self.write("site.toml", '[dirs]\ncontent = "docs"\n\n[build]\nworkers = 3\n')
+        config = load_config(self.tmp_dir.name)
+        self.assertEqual((config.content_dir, config.workers), (os.path.join(self.tmp_dir.name, "docs"), 3))
+
+    def test_dirs_are_relative_to_the_file(self):
+        os.makedirs(os.path.join(self.tmp_dir.name, "conf"))
+        path = self.write(os.path.join("conf", "prod.toml"), '[dirs]\npublic = "../dist"\n')
+        self.assertEqual(os.path.normpath(load_config("/elsewhere", path).public_dir), os.path.join(self.tmp_dir.name, "dist"))
+
+    def test_errors(self):
+        with self.assertRaisesRegex(ValueError, "does not exist"):
+            load_config(self.tmp_dir.name, os.path.join(self.tmp_dir.name, "missing.toml"))
+        with self.assertRaisesRegex(ValueError, "Invalid config file"):
+            load_config(self.tmp_dir.name, self.write("bad.toml", "[build\nworkers = 2\n"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,53 @@
+import os
+import tempfile
+import unittest
+
+from deps import DependencyGraph, local_asset_path
+
+
+class TestDependencyGraph(unittest.TestCase):
+    def setUp(self):
+        self.graph = DependencyGraph()
+        self.graph.add_output("blog/a/index.html", ["a.md", "template.html", "images/a.png"])
+        self.graph.add_output("blog/b/index.html", ["b.md", "post.html"])
+        self.graph.add_group("@section:blog", ["a.md", "b.md"])
+        self.graph.add_output("blog/index.html", ["template.html", "@section:blog"])
+
+    def test_dependencies_expand_groups(self):
+        self.assertEqual(self.graph.dependencies("blog/index.html"), ["template.html", "a.md", "b.md"])
+        with self.assertRaises(ValueError):
+            self.graph.dependencies("missing.html")
+
+    def test_dependents_and_rebuild_set(self):
+        self.assertEqual(self.graph.dependents("template.html"), ["blog/a/index.html", "blog/index.html"])
+        self.assertEqual(self.graph.dependents("unknown.md"), [])
+        self.assertEqual(self.graph.rebuild_set(["b.md", "images/a.png"]), ["blog/a/index.html", "blog/b/index.html", "blog/index.html"])
+
+    def test_group_names_are_prefixed(self):
+        with self.assertRaises(ValueError):
+            self.graph.add_group("pages", [])
+
+    def test_save_and_load(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, "deps.json")
+            self.graph.save(path)
+            loaded = DependencyGraph.load(path)
+        self.assertEqual(loaded.to_dict(), self.graph.to_dict())
+        self.assertEqual(loaded.dependents("a.md"), ["blog/a/index.html", "blog/index.html"])
+
+
+class TestLocalAssetPath(unittest.TestCase):
+    def test_resolves_static_files(self):
+        with tempfile.TemporaryDirectory() as static_dir:
+            os.makedirs(os.path.join(static_dir, "images"))
+            image_path = os.path.join(static_dir, "images", "a.png")
+            open(image_path, 'w').close()
+            self.assertEqual(local_asset_path(static_dir, "/blog/a", "/images/a.png?v=2"), image_path)
+            self.assertEqual(local_asset_path(static_dir, "/blog/a", "../../images/a.png"), image_path)
+            self.assertEqual(local_asset_path(static_dir, "/about.html", "images/a.png"), image_path)
+            self.assertIsNone(local_asset_path(static_dir, "/blog/a", "images/a.png"))
+            self.assertIsNone(local_asset_path(static_dir, "/", "https://example.com/images/a.png"))
+
+
+if __name__ == "__main__":
+    unittest.main()
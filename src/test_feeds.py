@@ -0,0 +1,107 @@
+import io
+import os
+import tempfile
+import unittest
+import xml.etree.ElementTree as ET
+
+from feeds import ATOM_NS, SITEMAP_NS, XMLWriter, date_to_timestamp, write_atom_feed, write_sitemaps
+from listing import PageRecord
+from manifest import hash_file
+
+
+class TestXMLWriter(unittest.TestCase):
+    def test_writes_escaped_elements(self):
+        stream = io.StringIO()
+        writer = XMLWriter(stream)
+        writer.start("root", {"a": 'x"y'})
+        writer.element("item", "a < b & c")
+        writer.element("empty", attrs={"href": "/x?a=1&b=2"})
+        writer.end("root")
+        writer.close()
+        root = ET.fromstring(stream.getvalue())
+        self.assertEqual(root.get("a"), 'x"y')
+        self.assertEqual(root.find("item").text, "a < b & c")
+        self.assertEqual(root.find("empty").get("href"), "/x?a=1&b=2")
+
+    def test_mismatched_end_raises(self):
+        writer = XMLWriter(io.StringIO())
+        writer.start("a")
+        with self.assertRaises(ValueError):
+            writer.end("b")
+
+    def test_close_with_open_elements_raises(self):
+        writer = XMLWriter(io.StringIO())
+        writer.start("a")
+        with self.assertRaises(ValueError):
+            writer.close()
+
+
+class TestDateToTimestamp(unittest.TestCase):
+    def test_conversions(self):
+        self.assertIsNone(date_to_timestamp(None))
+        self.assertEqual(date_to_timestamp("2024-01-15"), "2024-01-15T00:00:00Z")
+        self.assertEqual(date_to_timestamp("2024-01-15T10:00:00Z"), "2024-01-15T10:00:00Z")
+
+
+class TestSitemaps(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def parse(self, name):
+        return ET.parse(os.path.join(self.tmp_dir.name, name)).getroot()
+
+    def test_single_sitemap(self):
+        paths = write_sitemaps(iter([("/", None), ("/blog/tom", "2024-02-10")]), self.tmp_dir.name, "https://example.com/")
+        self.assertEqual(list(paths), [os.path.join(self.tmp_dir.name, "sitemap.xml")])
+        root = self.parse("sitemap.xml")
+        self.assertEqual(root.tag, f"{{{SITEMAP_NS}}}urlset")
+        locs = [loc.text for loc in root.iter(f"{{{SITEMAP_NS}}}loc")]
+        self.assertEqual(locs, ["https://example.com/", "https://example.com/blog/tom"])
+        self.assertEqual(root.find(f".//{{{SITEMAP_NS}}}lastmod").text, "2024-02-10")
+        self.assertEqual(sorted(os.listdir(self.tmp_dir.name)), ["sitemap.xml"])
+
+    def test_exactly_full_sitemap_stays_single(self):
+        write_sitemaps(((f"/{i}", None) for i in range(3)), self.tmp_dir.name, "https://example.com", max_urls=3)
+        self.assertEqual(sorted(os.listdir(self.tmp_dir.name)), ["sitemap.xml"])
+
+    def test_split_into_index(self):
+        paths = write_sitemaps(((f"/{i}", None) for i in range(7)), self.tmp_dir.name, "https://example.com", max_urls=3)
+        self.assertEqual(len(paths), 4)
+        self.assertEqual(paths, {path: hash_file(path) for path in paths})
+        index = self.parse("sitemap.xml")
+        self.assertEqual(index.tag, f"{{{SITEMAP_NS}}}sitemapindex")
+        locs = [loc.text for loc in index.iter(f"{{{SITEMAP_NS}}}loc")]
+        self.assertEqual(locs, [f"https://example.com/sitemap-{i}.xml" for i in (1, 2, 3)])
+        self.assertEqual(len(self.parse("sitemap-3.xml").findall(f"{{{SITEMAP_NS}}}url")), 1)
+
+    def test_empty_sitemap(self):
+        write_sitemaps(iter([]), self.tmp_dir.name, "https://example.com")
+        self.assertEqual(len(self.parse("sitemap.xml")), 0)
+
+
+class TestAtomFeed(unittest.TestCase):
+    def test_newest_entries_first(self):
+        records = [PageRecord(f"/blog/{i}", f"Post {i}", f"2024-01-{i:02d}", ["t"]) for i in range(1, 6)]
+        records.append(PageRecord("/blog/undated", "Undated"))
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, "atom.xml")
+            digest = write_atom_feed(iter(records), path, "https://example.com", "Site & Co", max_entries=3)
+            self.assertEqual(digest, hash_file(path))
+            root = ET.parse(path).getroot()
+        ns = {"a": ATOM_NS}
+        self.assertEqual(root.find("a:title", ns).text, "Site & Co")
+        self.assertEqual(root.find("a:updated", ns).text, "2024-01-05T00:00:00Z")
+        entries = root.findall("a:entry", ns)
+        self.assertEqual([entry.find("a:title", ns).text for entry in entries], ["Post 5", "Post 4", "Post 3"])
+        self.assertEqual(entries[0].find("a:link", ns).get("href"), "https://example.com/blog/5")
+        self.assertEqual(entries[0].find("a:category", ns).get("term"), "t")
+
+    def test_no_dated_records(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, "atom.xml")
+            write_atom_feed([PageRecord("/blog/a", "A")], path, "https://example.com", "Site")
+            root = ET.parse(path).getroot()
+        self.assertEqual(root.find(f"{{{ATOM_NS}}}updated").text, "1970-01-01T00:00:00Z")
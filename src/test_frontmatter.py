@@ -0,0 +1,135 @@
+import os
+import tempfile
+import unittest
+
+from frontmatter import parse_front_matter_value, read_front_matter, skip_front_matter, split_front_matter, split_front_matter_buffer
+from build import render_page
+
+
+class TestParseFrontMatterValue(unittest.TestCase):
+    def test_plain_string(self):
+        self.assertEqual(parse_front_matter_value(" Hello world "), "Hello world")
+
+    def test_quoted_string(self):
+        self.assertEqual(parse_front_matter_value('"true"'), "true")
+        self.assertEqual(parse_front_matter_value("'a: b'"), "a: b")
+
+    def test_booleans(self):
+        self.assertIs(parse_front_matter_value("true"), True)
+        self.assertIs(parse_front_matter_value("False"), False)
+
+    def test_integer(self):
+        self.assertEqual(parse_front_matter_value("42"), 42)
+
+    def test_date_stays_string(self):
+        self.assertEqual(parse_front_matter_value("2024-03-02"), "2024-03-02")
+
+    def test_inline_list(self):
+        self.assertEqual(parse_front_matter_value("[elves, 'the ring', ]"), ["elves", "the ring"])
+        self.assertEqual(parse_front_matter_value("[]"), [])
+
+
+class TestSplitFrontMatter(unittest.TestCase):
+    def test_no_front_matter(self):
+        text = "# Title\n\nBody"
+        self.assertEqual(split_front_matter(text), ({}, text))
+
+    def test_horizontal_rule_like_start_is_not_front_matter(self):
+        text = "---- not front matter"
+        self.assertEqual(split_front_matter(text), ({}, text))
+
+    def test_fields_and_body(self):
+        text = "---\ntitle: Hello\ndate: 2024-01-15\ntags: [a, b]\ndraft: true\n---\n# Body"
+        metadata, body = split_front_matter(text)
+        self.assertEqual(metadata, {"title": "Hello", "date": "2024-01-15", "tags": ["a", "b"], "draft": True})
+        self.assertEqual(body, "# Body")
+
+    def test_block_list_and_comments(self):
+        text = "---\n# a comment\ntags:\n  - one\n  - two\nTemplate: post.html\n---\n"
+        metadata, _ = split_front_matter(text)
+        self.assertEqual(metadata, {"tags": ["one", "two"], "template": "post.html"})
+
+    def test_invalid_line_raises(self):
+        with self.assertRaisesRegex(ValueError, "Invalid front matter line 1"):
+            split_front_matter("---\nnot a pair\n---\n")
+
+    def test_unterminated_raises(self):
+        with self.assertRaises(ValueError):
+            split_front_matter("---\ntitle: x\n")
+
+
+class TestSkipFrontMatter(unittest.TestCase):
+    def test_skips_header(self):
+        self.assertEqual(list(skip_front_matter(["---", "# note", "---", "# Title", "text"])), ["# Title", "text"])
+
+    def test_without_front_matter(self):
+        self.assertEqual(list(skip_front_matter(["# Title", "---"])), ["# Title", "---"])
+        self.assertEqual(list(skip_front_matter([])), [])
+
+    def test_agrees_with_split_front_matter(self):
+        for text in ["---\ntitle: x\n---\nbody\nmore", "no front matter\n---", "---  \n---\n"]:
+            self.assertEqual("\n".join(skip_front_matter(text.split("\n"))), split_front_matter(text)[1], text)
+
+
+class TestSplitFrontMatterBuffer(unittest.TestCase):
+    def test_matches_split_front_matter(self):
+        for text in ["# Title\n\nBody", "---- not front matter", "---\ntitle: Hello\ntags: [a, b]\n---\n# Body", "---\ntitle: x\n---"]:
+            metadata, body_start = split_front_matter_buffer(text.encode('utf-8'))
+            self.assertEqual((metadata, text.encode('utf-8')[body_start:].decode('utf-8')), split_front_matter(text), text)
+
+    def test_crlf(self):
+        buffer = b"---\r\ntitle: Hello\r\n---\r\n# Body"
+        metadata, body_start = split_front_matter_buffer(buffer)
+        self.assertEqual(metadata, {"title": "Hello"})
+        self.assertEqual(buffer[body_start:], b"# Body")
+
+    def test_unterminated_raises(self):
+        with self.assertRaises(ValueError):
+            split_front_matter_buffer(b"---\ntitle: x\n")
+
+
+class TestReadFrontMatter(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def write(self, name, text):
+        path = os.path.join(self.tmp_dir.name, name)
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(text)
+        return path
+
+    def test_reads_header_only(self):
+        # the body is not valid utf-8, so reading it would fail
+        path = self.write("page.md", "---\ntitle: Header\n---\n")
+        with open(path, 'ab') as f:
+            f.write(b"\xff\xfe broken body")
+        self.assertEqual(read_front_matter(path), {"title": "Header"})
+
+    def test_no_front_matter(self):
+        path = self.write("page.md", "# Just a page\n")
+        self.assertEqual(read_front_matter(path), {})
+
+    def test_unterminated_raises(self):
+        path = self.write("page.md", "---\ntitle: x\n")
+        with self.assertRaises(ValueError):
+            read_front_matter(path)
+
+    def test_render_page_uses_metadata(self):
+        self.write("post.html", "<h1>{{ Title }}</h1><time>{{ date }}</time><p>{{ tags }}</p>{{ Content }}")
+        template_path = self.write("template.html", "{{ Title }}")
+        md_path = self.write("page.md", "---\ntitle: From Meta\ndate: 2024-01-15\ntags: [a, b]\ntemplate: post.html\n---\n# Heading")
+        self.assertEqual(
+            render_page(md_path, template_path),
+            '<h1>From Meta</h1><time>2024-01-15</time><p>a, b</p><div><h1 id="heading">Heading</h1></div>',
+        )
+
+    def test_render_page_escapes_plain_text_variables(self):
+        template_path = self.write("template.html", "<title>{{ Title }}</title><p>{{ tags }}</p>{{ Content }}")
+        md_path = self.write("page.md", "---\ntags: [a&b]\n---\n# Fish & <Chips>")
+        self.assertEqual(
+            render_page(md_path, template_path),
+            '<title>Fish &amp; &lt;Chips&gt;</title><p>a&amp;b</p><div><h1 id="fish-chips">Fish &amp; &lt;Chips&gt;</h1></div>',
+        )
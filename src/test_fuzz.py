@@ -0,0 +1,63 @@
+import random
+import time
+import unittest
+
+from fuzz import PATHOLOGICAL_INPUTS, check_invariants, find_superlinear, random_markdown, run_fuzz, safe_markdown_to_html
+
+
+class TestRandomMarkdown(unittest.TestCase):
+    def test_same_seed_same_document(self):
+        self.assertEqual(random_markdown(random.Random(7)), random_markdown(random.Random(7)))
+
+    def test_block_count_matches_generated(self):
+        markdown, block_count = random_markdown(random.Random(3))
+        self.assertEqual(markdown.count("\n\n") + 1, block_count)
+
+
+class TestInvariants(unittest.TestCase):
+    def test_valid_document_passes(self):
+        self.assertEqual(check_invariants("# Title\n\nSome **text**", 2), [])
+
+    def test_raising_document_reported(self):
+        violations = check_invariants("unmatched **bold", 1)
+        self.assertEqual([invariant for invariant, _ in violations], ["never raises"])
+
+    def test_block_count_mismatch_reported(self):
+        violations = check_invariants("one\n\ntwo", 3)
+        self.assertEqual([invariant for invariant, _ in violations], ["block count"])
+
+
+class TestRunFuzz(unittest.TestCase):
+    def test_serial_run(self):
+        self.assertEqual(run_fuzz(150, shards=1, seed=1), [])
+
+    def test_sharded_run(self):
+        self.assertEqual(run_fuzz(100, shards=2, seed=2), [])
+
+    def test_hung_shard_reported(self):
+        failures = run_fuzz(40, shards=2, seed=3, timeout=0)
+        self.assertTrue(failures)
+        self.assertTrue(all(failure.invariant == "timeout" for failure in failures))
+
+
+class TestFindSuperlinear(unittest.TestCase):
+    def test_detects_quadratic(self):
+        def quadratic(text):
+            for _ in text:
+                for _ in range(len(text) // 10):
+                    pass
+        result = find_superlinear(quadratic, lambda n: "a" * n, [500, 4000])
+        self.assertIsNotNone(result)
+        self.assertEqual(result[:2], (500, 4000))
+
+    def test_linear_passes(self):
+        def linear(text):
+            for _ in text:
+                pass
+        self.assertIsNone(find_superlinear(linear, lambda n: "a" * n, [100000, 400000]))
+
+    def test_bracket_runs_parse_quickly(self):
+        for name in ["open brackets", "open parens", "bracket paren runs", "unclosed image", "many links"]:
+            start = time.perf_counter()
+            safe_markdown_to_html(PATHOLOGICAL_INPUTS[name](20000))
+            self.assertLess(time.perf_counter() - start, 2.0, name)
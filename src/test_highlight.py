@@ -0,0 +1,61 @@
+import unittest
+
+from highlight import HighlightCache, RegexTokenizer, get_tokenizer, highlight, register_tokenizer
+
+
+class TestRegexTokenizer(unittest.TestCase):
+    def test_plain_text_between_tokens(self):
+        tokenizer = RegexTokenizer([("number", r"\d+")])
+        self.assertEqual(list(tokenizer.tokenize("a 12 b 3")), [(None, "a "), ("number", "12"), (None, " b "), ("number", "3")])
+
+    def test_no_matches(self):
+        tokenizer = RegexTokenizer([("number", r"\d+")])
+        self.assertEqual(list(tokenizer.tokenize("abc")), [(None, "abc")])
+        self.assertEqual(list(tokenizer.tokenize("")), [])
+
+    def test_rule_order_wins(self):
+        # the comment rule comes first, so keywords inside comments stay comments
+        tokens = list(get_tokenizer("python").tokenize("x = 1  # return None"))
+        self.assertIn(("comment", "# return None"), tokens)
+        self.assertNotIn(("keyword", "return"), tokens)
+
+    def test_tokens_round_trip(self):
+        code = "def f(s='#x'):\n    return \"a\" + s  # done\n"
+        self.assertEqual("".join(text for _, text in get_tokenizer("py").tokenize(code)), code)
+
+
+class TestHighlight(unittest.TestCase):
+    def test_unknown_language(self):
+        self.assertIsNone(highlight("elflang", "func main(){}"))
+
+    def test_language_names_case_insensitive(self):
+        self.assertEqual(highlight("JSON", "true"), (("keyword", "true"),))
+
+    def test_register_tokenizer(self):
+        register_tokenizer(["test-lang"], RegexTokenizer([("keyword", r"\bzap\b")]))
+        self.assertEqual(highlight("test-lang", "zap it"), (("keyword", "zap"), (None, " it")))
+
+
+class TestHighlightCache(unittest.TestCase):
+    def test_hits_and_misses(self):
+        cache = HighlightCache()
+        tokenizer = get_tokenizer("python")
+        first = cache.get_or_tokenize("python", "pass", tokenizer)
+        second = cache.get_or_tokenize("python", "pass", tokenizer)
+        self.assertIs(first, second)
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+
+    def test_language_is_part_of_key(self):
+        cache = HighlightCache()
+        cache.get_or_tokenize("python", "true", get_tokenizer("python"))
+        self.assertEqual(cache.get_or_tokenize("json", "true", get_tokenizer("json")), (("keyword", "true"),))
+        self.assertEqual(cache.misses, 2)
+
+    def test_evicts_oldest(self):
+        cache = HighlightCache(max_entries=2)
+        tokenizer = get_tokenizer("python")
+        for code in ["a", "b", "c"]:
+            cache.get_or_tokenize("python", code, tokenizer)
+        self.assertEqual(len(cache), 2)
+        cache.get_or_tokenize("python", "a", tokenizer)
+        self.assertEqual(cache.misses, 4)
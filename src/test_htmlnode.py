@@ -1,6 +1,10 @@
+import os
 import unittest
 
-from htmlnode import HTMLNode, LeafNode, ParentNode, convert_newlines_to_spaces, parse_code_block, parse_heading_block, parse_ordered_list_block, parse_quote_block, parse_unordered_list_block, text_node_to_html_node, markdown_to_html_node
+from frontmatter import split_front_matter
+from parsing import ParseBudget, ParseBudgetExceeded, ParseError, markdown_to_blocks
+from htmlnode import HTMLNode, LazyBlockNode, LeafInterner, LeafNode, SharedLeafNode, TableOfContents, collect_headings, escape_attr, escape_html, ParentNode, convert_newlines_to_spaces, iter_blocks_html, parse_code_block, parse_heading_block, parse_ordered_list_block, parse_quote_block, parse_table_block, parse_unordered_list_block, text_node_to_html, text_node_to_html_node, markdown_to_html, markdown_to_html_node
+from stats import ParseStats
 from textnode import TextNode, TextType
 
 class TestHTMLNode(unittest.TestCase):
@@ -108,6 +112,34 @@ class TestLeafNode(unittest.TestCase):
         self.assertIn("children=None", rep)
         self.assertIn("props={'class': 'badge'}", rep)
 
+class TestEscaping(unittest.TestCase):
+    def test_escape_html_fast_path_returns_same_string(self):
+        text = "nothing special here, not even \"quotes\""
+        self.assertIs(escape_html(text), text)
+
+    def test_escape_html(self):
+        self.assertEqual(escape_html("a < b && c > d"), "a &lt; b &amp;&amp; c &gt; d")
+        self.assertEqual(escape_html("&lt;"), "&amp;lt;")
+
+    def test_escape_attr(self):
+        self.assertEqual(escape_attr('say "hi" & <go>'), "say &quot;hi&quot; &amp; &lt;go&gt;")
+        value = "/plain/url"
+        self.assertIs(escape_attr(value), value)
+
+    def test_leaf_escapes_value_and_props(self):
+        node = LeafNode("a", "x < y", {"href": "/search?a=1&b=\"2\""})
+        self.assertEqual(node.to_html(), '<a href="/search?a=1&amp;b=&quot;2&quot;">x &lt; y</a>')
+
+    def test_untagged_leaf_escapes(self):
+        self.assertEqual(LeafNode(None, "<script>").to_html(), "&lt;script&gt;")
+
+    def test_code_block_escapes(self):
+        self.assertEqual(
+            markdown_to_html_node("```\nif a < b && c:\n```").to_html(),
+            "<div><pre><code>if a &lt; b &amp;&amp; c:\n</code></pre></div>",
+        )
+
+
 class TestParentNode(unittest.TestCase):
     def test_parent_basic(self):
         parent = ParentNode(
@@ -239,6 +271,56 @@ class TestTextNodeToHTMLNode(unittest.TestCase):
             text_node_to_html_node(text_node)
 
 
+class TestLeafInterner(unittest.TestCase):
+    def test_identical_leaves_are_shared(self):
+        interner = LeafInterner()
+        home = interner.leaf("a", "Home", {"href": "/"})
+        self.assertIs(interner.leaf("a", "Home", {"href": "/"}), home)
+        self.assertIsNot(interner.leaf("a", "Home", {"href": "/home"}), home)
+        self.assertEqual(interner.stats(), {"entries": 2, "max_entries": 4096, "hits": 1, "misses": 2})
+
+    def test_equal_to_plain_leaves(self):
+        shared = LeafInterner().leaf("a", "Home", {"href": "/"})
+        self.assertEqual(shared, LeafNode("a", "Home", {"href": "/"}))
+        self.assertEqual(LeafNode("a", "Home", {"href": "/"}), shared)
+        self.assertNotEqual(LeafNode("a", "Home", {"href": "/x"}), shared)
+        self.assertNotEqual(shared, ParentNode("a", [LeafNode(None, "Home")], {"href": "/"}))
+
+    def test_immutable(self):
+        shared = LeafInterner().leaf("a", "Home", {"href": "/"})
+        with self.assertRaises(AttributeError):
+            shared.value = "Away"
+        with self.assertRaises(TypeError):
+            shared.props["href"] = "/away"
+
+    def test_html_is_rendered_once(self):
+        shared = SharedLeafNode("code", "a < b")
+        self.assertEqual(shared.to_html(), "<code>a &lt; b</code>")
+        self.assertIs(shared.to_html(), shared.to_html())
+
+    def test_bounded(self):
+        interner = LeafInterner(max_entries=2)
+        first = interner.leaf("b", "1")
+        interner.leaf("b", "2")
+        interner.leaf("b", "1")
+        interner.leaf("b", "3")
+        # the least recently used leaf was dropped
+        self.assertEqual(len(interner), 2)
+        self.assertIs(interner.leaf("b", "1"), first)
+        self.assertEqual(interner.stats()["misses"], 3)
+
+    def test_long_values_are_not_interned(self):
+        interner = LeafInterner(max_length=5)
+        self.assertIs(type(interner.leaf(None, "longer text")), LeafNode)
+        self.assertEqual(len(interner), 0)
+
+    def test_parsed_trees_share_leaves(self):
+        tree = markdown_to_html_node("[Home](/) and [Home](/)\n\n- [Home](/)")
+        paragraph, items = tree.children
+        self.assertIs(paragraph.children[0], paragraph.children[2])
+        self.assertIs(items.children[0].children[0], paragraph.children[0])
+
+
 class TestConvertNewlinesToSpaces(unittest.TestCase):
     def test_simple_newline(self):
         text = "This is a line.\nThis is another line."
@@ -258,9 +340,9 @@ class TestConvertNewlinesToSpaces(unittest.TestCase):
 
 class TestParseHeadingBlock(unittest.TestCase):
     def test_valid_h1_heading(self):
-        self.assertEqual(parse_heading_block("# Heading 1"), ParentNode("h1", [LeafNode(None, "Heading 1")]))
-        self.assertEqual(parse_heading_block("#   Heading 1   "), ParentNode("h1", [LeafNode(None, "Heading 1")]))
-        self.assertEqual(parse_heading_block("# Heading with inner # hash"), ParentNode("h1", [LeafNode(None, "Heading with inner # hash")]))
+        self.assertEqual(parse_heading_block("# Heading 1"), ParentNode("h1", [LeafNode(None, "Heading 1")], {"id": "heading-1"}))
+        self.assertEqual(parse_heading_block("#   Heading 1   "), ParentNode("h1", [LeafNode(None, "Heading 1")], {"id": "heading-1"}))
+        self.assertEqual(parse_heading_block("# Heading with inner # hash"), ParentNode("h1", [LeafNode(None, "Heading with inner # hash")], {"id": "heading-with-inner-hash"}))
 
     def test_h2_heading_with_inlines(self):
         self.assertEqual(
@@ -274,13 +356,14 @@ class TestParseHeadingBlock(unittest.TestCase):
                     LeafNode("i", "italic"),
                     LeafNode(None, " text"),
                 ],
+                {"id": "heading-with-bold-and-italic-text"},
             ),
         )
 
     def test_heading_partial_lines(self):
         self.assertEqual(
             parse_heading_block("# Heading\nwith partial line\nwhoops"),
-            ParentNode("h1", [LeafNode(None, "Heading with partial line whoops")])
+            ParentNode("h1", [LeafNode(None, "Heading with partial line whoops")], {"id": "heading-with-partial-line-whoops"})
         )
 
     def test_heading_with_inline_at_borders(self):
@@ -295,12 +378,13 @@ class TestParseHeadingBlock(unittest.TestCase):
                     LeafNode(None, " at end "),
                     LeafNode("code", "with code"),
                 ],
+                {"id": "bold-at-start-and-italic-at-end-with-code"},
             ),
         )
 
     def test_valid_h6_heading(self):
-        self.assertEqual(parse_heading_block("###### Heading 6"), ParentNode("h6", [LeafNode(None, "Heading 6")]))
-        self.assertEqual(parse_heading_block("######    Heading 6    "), ParentNode("h6", [LeafNode(None, "Heading 6")]))
+        self.assertEqual(parse_heading_block("###### Heading 6"), ParentNode("h6", [LeafNode(None, "Heading 6")], {"id": "heading-6"}))
+        self.assertEqual(parse_heading_block("######    Heading 6    "), ParentNode("h6", [LeafNode(None, "Heading 6")], {"id": "heading-6"}))
 
     def test_invalid_heading_too_many_hashes(self):
         self.assertRaises(ValueError, parse_heading_block, "####### Too many hashes")
@@ -312,6 +396,43 @@ class TestParseHeadingBlock(unittest.TestCase):
         self.assertRaises(ValueError, parse_heading_block, "Just some text without heading")
 
 
+class TestTableOfContents(unittest.TestCase):
+    def test_ids_are_deduplicated(self):
+        toc = TableOfContents()
+        self.assertEqual([toc.add(2, "Setup"), toc.add(2, "Setup"), toc.add(3, "Setup 1"), toc.add(2, "Setup")], ["setup", "setup-1", "setup-1-1", "setup-2"])
+
+    def test_empty_slug(self):
+        toc = TableOfContents()
+        self.assertEqual([toc.add(1, "!!!"), toc.add(1, "?")], ["section", "section-1"])
+
+    def test_nested_html(self):
+        toc = TableOfContents()
+        for level, text in [(2, "A"), (3, "B & C"), (3, "D"), (2, "E"), (4, "F"), (1, "G")]:
+            toc.add(level, text)
+        self.assertEqual(
+            toc.to_html(),
+            '<ul><li><a href="#a">A</a><ul><li><a href="#b-c">B &amp; C</a></li><li><a href="#d">D</a></li></ul></li>'
+            '<li><a href="#e">E</a><ul><li><a href="#f">F</a></li></ul></li><li><a href="#g">G</a></li></ul>',
+        )
+
+    def test_empty(self):
+        self.assertEqual(TableOfContents().to_html(), "")
+
+    def test_collected_while_rendering(self):
+        md = "# Intro\n\n## Use `code` _here_\n\ntext\n\n## Intro"
+        tree_toc, direct_toc = TableOfContents(), TableOfContents()
+        html = markdown_to_html_node(md, toc=tree_toc).to_html()
+        self.assertEqual(html, markdown_to_html(md, toc=direct_toc))
+        self.assertIn('<h2 id="use-code-here">Use <code>code</code> <i>here</i></h2><p>text</p><h2 id="intro-1">Intro</h2>', html)
+        self.assertEqual(tree_toc.entries, [(1, "intro", "Intro"), (2, "use-code-here", "Use code here"), (2, "intro-1", "Intro")])
+        self.assertEqual(direct_toc.entries, tree_toc.entries)
+        self.assertEqual(collect_headings(markdown_to_blocks(md)).entries, tree_toc.entries)
+
+    def test_ids_are_per_document(self):
+        self.assertEqual(markdown_to_html("# A"), markdown_to_html("# A"))
+        self.assertEqual(markdown_to_html("# A"), '<div><h1 id="a">A</h1></div>')
+
+
 class TestParseCodeBlock(unittest.TestCase):
     def test_valid_code_block(self):
         code = """```i am a code block```"""
@@ -329,6 +450,30 @@ class TestParseCodeBlock(unittest.TestCase):
         self.assertEqual(parse_code_block(code), expected)
 
 
+    def test_language_info_string_highlighted(self):
+        code = """```python
+def foo():
+    return 1
+```"""
+        expected = ParentNode("pre", children=[ParentNode("code", props={"class": "language-python"}, children=[
+            LeafNode("span", "def", {"class": "tok-keyword"}),
+            LeafNode(None, " foo():\n    "),
+            LeafNode("span", "return", {"class": "tok-keyword"}),
+            LeafNode(None, " "),
+            LeafNode("span", "1", {"class": "tok-number"}),
+            LeafNode(None, "\n"),
+        ])])
+        self.assertEqual(parse_code_block(code), expected)
+
+    def test_unknown_language_not_highlighted(self):
+        code = "```elflang\nfunc main(){}\n```"
+        expected = ParentNode("pre", children=[LeafNode("code", "func main(){}\n", {"class": "language-elflang"})])
+        self.assertEqual(parse_code_block(code), expected)
+
+    def test_empty_code_with_language(self):
+        self.assertEqual(parse_code_block("```python\n```").to_html(), '<pre><code class="language-python"></code></pre>')
+
+
 class TestParseQuoteBlock(unittest.TestCase):
     def test_single_line_quote(self):
         quote = "> This is a quote"
@@ -422,6 +567,42 @@ has an ![image block](http://example.com)
         self.assertEqual(result, expected)
 
 
+    def test_nested_lists(self):
+        ul = """- First
+  - Nested one
+  - Nested two
+    1. Deep ordered
+- Second
+continued"""
+        expected = ParentNode("ul", children=[
+            ParentNode("li", children=[
+                LeafNode(None, "First"),
+                ParentNode("ul", children=[
+                    ParentNode("li", children=[LeafNode(None, "Nested one")]),
+                    ParentNode("li", children=[
+                        LeafNode(None, "Nested two"),
+                        ParentNode("ol", children=[ParentNode("li", children=[LeafNode(None, "Deep ordered")])]),
+                    ]),
+                ]),
+            ]),
+            ParentNode("li", children=[LeafNode(None, "Second continued")]),
+        ])
+        self.assertEqual(parse_unordered_list_block(ul), expected)
+
+    def test_slightly_indented_items_are_siblings(self):
+        ul = "- First\n - Second"
+        self.assertEqual(parse_unordered_list_block(ul).to_html(), "<ul><li>First</li><li>Second</li></ul>")
+
+    def test_indented_top_level_list(self):
+        # regression: the first item's indent is stripped with the block, the others kept theirs
+        self.assertEqual(markdown_to_html("Intro\n\n  - one\n  - two\n  - three"), "<div><p>Intro</p><ul><li>one</li><li>two</li><li>three</li></ul></div>")
+        self.assertEqual(markdown_to_html_node("  1. one\n    - nested\n  2. two").to_html(), "<div><ol><li>one<ul><li>nested</li></ul></li><li>two</li></ol></div>")
+
+    def test_empty_item_dropped(self):
+        ul = "- First\n-\n- Third"
+        self.assertEqual(parse_unordered_list_block(ul).to_html(), "<ul><li>First</li><li>Third</li></ul>")
+
+
 class TestParseOrderedListBlock(unittest.TestCase):
     def test_single_item_list(self):
         ol = """1. Single item"""
@@ -466,6 +647,120 @@ class TestParseOrderedListBlock(unittest.TestCase):
         self.assertEqual(parse_ordered_list_block(ol), expected)
 
 
+class TestParseTableBlock(unittest.TestCase):
+    def test_table_with_alignment_and_inlines(self):
+        table = "| Name | Score |\n| :--- | ---: |\n| **Frodo** | 1 |\n| Sam |  |"
+        expected = ParentNode("table", children=[
+            ParentNode("thead", children=[ParentNode("tr", children=[
+                ParentNode("th", [LeafNode(None, "Name")], {"align": "left"}),
+                ParentNode("th", [LeafNode(None, "Score")], {"align": "right"}),
+            ])]),
+            ParentNode("tbody", children=[
+                ParentNode("tr", children=[
+                    ParentNode("td", [LeafNode("b", "Frodo")], {"align": "left"}),
+                    ParentNode("td", [LeafNode(None, "1")], {"align": "right"}),
+                ]),
+                ParentNode("tr", children=[
+                    ParentNode("td", [LeafNode(None, "Sam")], {"align": "left"}),
+                    LeafNode("td", "", {"align": "right"}),
+                ]),
+            ]),
+        ])
+        self.assertEqual(parse_table_block(table), expected)
+
+    def test_header_only_table_has_no_body(self):
+        self.assertEqual(
+            parse_table_block("| a |\n| - |").to_html(),
+            "<table><thead><tr><th>a</th></tr></thead></table>",
+        )
+
+    def test_cell_with_no_inline_nodes(self):
+        # `` parses to no inline nodes, which still renders as an empty cell in both renderers
+        md_text = "| a | `` |\n| - | - |\n| `` | b |"
+        html = "<div><table><thead><tr><th>a</th><th></th></tr></thead><tbody><tr><td></td><td>b</td></tr></tbody></table></div>"
+        self.assertEqual(markdown_to_html(md_text), html)
+        self.assertEqual(markdown_to_html_node(md_text).to_html(), markdown_to_html(md_text))
+
+    def test_large_table(self):
+        rows = "\n".join(f"| {i} | row {i} |" for i in range(10000))
+        html = markdown_to_html(f"| n | text |\n| - | - |\n{rows}")
+        self.assertEqual(html.count("<tr>"), 10001)
+        self.assertEqual(html, markdown_to_html_node(f"| n | text |\n| - | - |\n{rows}").to_html())
+
+    def test_streamed_table_yields_rows(self):
+        rows = "\n".join(f"| {i} | row {i} |" for i in range(100))
+        md = f"# Scores\n\n| n | text |\n| - | - |\n{rows}\n\nafter"
+        pieces = list(iter_blocks_html(markdown_to_blocks(md)))
+        self.assertEqual("".join(pieces), markdown_to_html(md))
+        self.assertIn("<tr><td>7</td><td>row 7</td></tr>", pieces)
+        self.assertLess(max(len(piece) for piece in pieces), 100)
+
+    def test_streamed_table_error_records_block(self):
+        block = "| a |\n| - |\n| _open |"
+        with self.assertRaises(ParseError) as raised:
+            list(iter_blocks_html(markdown_to_blocks(f"# T\n\n{block}")))
+        self.assertEqual(raised.exception.block, block)
+
+
+class TestLazyMarkdownToHTMLNode(unittest.TestCase):
+    MARKDOWN = "# Title\n\nSome **bold** [link](/a)\n\n```python\nx = 1\n```\n\n> quote\n\n- a\n- b\n\n1. one\n\n| a |\n| - |\n| 1 |\n\n## Title"
+
+    def test_same_tree_and_html(self):
+        lazy = markdown_to_html_node(self.MARKDOWN, lazy=True)
+        eager = markdown_to_html_node(self.MARKDOWN)
+        self.assertEqual(lazy.to_html(), eager.to_html())
+        self.assertEqual(lazy, eager)
+        self.assertEqual(eager, lazy)
+
+    def test_blocks_parse_on_first_access(self):
+        lazy = markdown_to_html_node(self.MARKDOWN, lazy=True)
+        lazy_blocks = [child for child in lazy.children if isinstance(child, LazyBlockNode)]
+        self.assertEqual(len(lazy_blocks), 6)
+        # tags are known without parsing
+        self.assertEqual([child.tag for child in lazy.children], [child.tag for child in markdown_to_html_node(self.MARKDOWN).children])
+        self.assertFalse(any(child.materialized for child in lazy_blocks))
+        paragraph = lazy_blocks[0]
+        self.assertEqual(paragraph.children[1], LeafNode("b", "bold"))
+        self.assertIs(paragraph.materialize(), paragraph.materialize())
+        self.assertEqual([child.materialized for child in lazy_blocks], [True, False, False, False, False, False])
+
+    def test_headings_are_parsed_up_front(self):
+        toc = TableOfContents()
+        lazy = markdown_to_html_node(self.MARKDOWN, toc=toc, lazy=True)
+        self.assertEqual(toc.entries, [(1, "title", "Title"), (2, "title-1", "Title")])
+        self.assertEqual(lazy.children[-1], ParentNode("h2", [LeafNode(None, "Title")], {"id": "title-1"}))
+
+    def test_budget_is_charged_up_front(self):
+        with self.assertRaises(ParseBudgetExceeded):
+            markdown_to_html_node(self.MARKDOWN, budget=ParseBudget(max_steps=10), lazy=True)
+
+    def test_no_stats(self):
+        with self.assertRaises(ValueError):
+            markdown_to_html_node(self.MARKDOWN, stats=ParseStats(), lazy=True)
+
+    def test_errors_wait_for_access(self):
+        lazy = markdown_to_html_node("# Title\n\n> ", lazy=True)
+        with self.assertRaises(ValueError):
+            lazy.to_html()
+
+
+class TestParseErrorBlocks(unittest.TestCase):
+    def test_every_renderer_records_the_failing_block(self):
+        md = "# Title\n\nfine\n\na _broken\nparagraph"
+        renderers = [markdown_to_html, lambda text: markdown_to_html_node(text).to_html(), lambda text: markdown_to_html_node(text, lazy=True).to_html()]
+        for render in renderers:
+            with self.assertRaises(ParseError) as raised:
+                render(md)
+            self.assertEqual(raised.exception.block, "a _broken\nparagraph")
+            self.assertEqual(raised.exception.fragment, "_broken paragraph")
+            self.assertEqual((raised.exception.locate(md, "page.md").line, raised.exception.locate(md, "page.md").column), (5, 3))
+
+    def test_block_level_errors(self):
+        with self.assertRaises(ParseError) as raised:
+            markdown_to_html("# Title\n\n> ")
+        self.assertEqual(raised.exception.block, ">")
+
+
 class TestMarkdownToHTMLNode(unittest.TestCase):
     def test_headings(self):
         md_text = """# Heading 1
@@ -478,7 +773,7 @@ class TestMarkdownToHTMLNode(unittest.TestCase):
 """
         html_node = markdown_to_html_node(md_text)
         html_str = html_node.to_html()
-        expected_html = "<div><h1>Heading 1</h1><h2>Heading 2 <i>with italic</i></h2><h3>Heading 3 with <code>code</code></h3><h4><b>Heading 4</b> begins with a bold character</h4></div>"
+        expected_html = '<div><h1 id="heading-1">Heading 1</h1><h2 id="heading-2-with-italic">Heading 2 <i>with italic</i></h2><h3 id="heading-3-with-code">Heading 3 with <code>code</code></h3><h4 id="heading-4-begins-with-a-bold-character"><b>Heading 4</b> begins with a bold character</h4></div>'
         self.assertEqual(html_str, expected_html)
 
     def test_codeblocks(self):
@@ -499,7 +794,7 @@ and possibly extra blocks
 
 now it's the end and we can go back to **normal text**"""
         html_str = markdown_to_html_node(md_text).to_html()
-        expected_html = "<div><h1>Code Block testing</h1><pre><code>a code block</code></pre><p>just some text</p><pre><code>another code block with\nmultiple lines\n\nand possibly extra blocks\n\n*oh no* it shouldnt be replacing these **markdown** inside the code block\n</code></pre><p>now it's the end and we can go back to <b>normal text</b></p></div>"
+        expected_html = "<div><h1 id=\"code-block-testing\">Code Block testing</h1><pre><code>a code block</code></pre><p>just some text</p><pre><code>another code block with\nmultiple lines\n\nand possibly extra blocks\n\n*oh no* it shouldnt be replacing these **markdown** inside the code block\n</code></pre><p>now it's the end and we can go back to <b>normal text</b></p></div>"
         self.assertEqual(html_str, expected_html)
 
     def test_quote_blocks(self):
@@ -518,7 +813,7 @@ with partial lines
 > and some _embedded markdown_
 """
         html_str = markdown_to_html_node(md_text).to_html()
-        expected_html = "<div><h1>Quote Block test</h1><p>This is a test for quote blocks.</p><blockquote>here is a quote\nacross multiple lines</blockquote><p>Ooh a random paragraph</p><blockquote>another quote with partial lines\nand some <i>embedded markdown</i></blockquote></div>"
+        expected_html = "<div><h1 id=\"quote-block-test\">Quote Block test</h1><p>This is a test for quote blocks.</p><blockquote>here is a quote\nacross multiple lines</blockquote><p>Ooh a random paragraph</p><blockquote>another quote with partial lines\nand some <i>embedded markdown</i></blockquote></div>"
         self.assertEqual(html_str, expected_html)
 
     def test_lists(self):
@@ -539,7 +834,7 @@ with partial lines
 Done!"""
         self.maxDiff = None
         html_str = markdown_to_html_node(md_text).to_html()
-        expected_html = '<div><h1>List test</h1><h2>Unordered list</h2><ul><li>First item</li><li>Second item <a href="test">has a link</a></li><li><b>Bolded third item</b></li></ul><h2>Ordered list</h2><ol><li>First item</li><li><img src="test" alt="image"></img> Second item starts with an <code>image</code></li></ol><p>Done!</p></div>'
+        expected_html = '<div><h1 id="list-test">List test</h1><h2 id="unordered-list">Unordered list</h2><ul><li>First item</li><li>Second item <a href="test">has a link</a></li><li><b>Bolded third item</b></li></ul><h2 id="ordered-list">Ordered list</h2><ol><li>First item</li><li><img src="test" alt="image"></img> Second item starts with an <code>image</code></li></ol><p>Done!</p></div>'
         self.assertEqual(html_str, expected_html)
 
     def test_general(self):
@@ -570,4 +865,84 @@ the **same** even with inline stuff
         self.assertEqual(
             html,
             "<div><pre><code>This is text that _should_ remain\nthe **same** even with inline stuff\n</code></pre></div>",
-        )
\ No newline at end of file
+        )
+
+
+# markdown snippets used to check that the direct renderer matches the node tree renderer
+DIFFERENTIAL_CORPUS = [
+    "# Heading 1\n\n## Heading 2 _with italic_\n\n### Heading 3 with `code`",
+    "```\nsome code\n\nwith **markdown**\n```\n\nand a **bold** paragraph",
+    "    ```a code block```\n\n    just some text",
+    "> here is a quote\n> across multiple lines\n\n> another quote\nwith partial lines\n> and _embedded markdown_",
+    "- First item\n- Second item [has a link](test)\n- **Bolded third item**",
+    "1. First item\n2. ![image](test) Second item starts with an `image`",
+    "This is **bolded** paragraph\ntext in a p\ntag here\n\nanother _one_",
+    "``````",
+    "- top\n  - nested **bold**\n    1. deep\n    2. deeper\n  - back\n- second\ncontinued",
+    "1. one\n   - unordered child\n2. two",
+    "| a | b |\n|:-:|--|\n| `code` | [link](/x) |\n| only one |",
+    "```js\n// comment\nconst x = 'str';\n```\n\n```elflang\nplain\n```\n\n```python\n```",
+    "# Fish & <Chips>\n\n```python\nif a < b: print(\"&\")\n```\n\n```\n<b>raw</b>\n```\n\n[a & b](/x?a=1&b=\"2\") ![<alt>](/i.png) `<tag>`",
+    "| a < b | c |\n|---|---|\n| & | **>** |",
+]
+
+def _content_corpus() -> list[str]:
+    """Collect the markdown files shipped under content/ as extra differential inputs"""
+    content_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "content")
+    corpus = []
+    for root, _, files in os.walk(content_dir):
+        for name in sorted(files):
+            if name.endswith(".md"):
+                with open(os.path.join(root, name), 'r', encoding='utf-8') as f:
+                    corpus.append(split_front_matter(f.read())[1])
+    return corpus
+
+
+class TestMarkdownToHTML(unittest.TestCase):
+    def test_text_node_to_html_matches_leaf(self):
+        text_nodes = [
+            TextNode("plain", TextType.TEXT),
+            TextNode("bold", TextType.BOLD),
+            TextNode("italic", TextType.ITALIC),
+            TextNode("code", TextType.CODE),
+            TextNode("link", TextType.HYPERLINK, "https://www.boot.dev"),
+            TextNode("alt", TextType.IMAGE, "/images/tom.png"),
+        ]
+        for text_node in text_nodes:
+            self.assertEqual(text_node_to_html(text_node), text_node_to_html_node(text_node).to_html())
+
+    def test_text_node_to_html_raises_without_url(self):
+        with self.assertRaisesRegex(ValueError, "Hyperlink TextNode must have a URL"):
+            text_node_to_html(TextNode("link", TextType.HYPERLINK))
+        with self.assertRaisesRegex(ValueError, "Image TextNode must have a URL"):
+            text_node_to_html(TextNode("alt", TextType.IMAGE))
+
+    def test_differential_corpus(self):
+        self.maxDiff = None
+        for md_text in DIFFERENTIAL_CORPUS + _content_corpus():
+            with self.subTest(md_text=md_text[:40]):
+                self.assertEqual(markdown_to_html(md_text), markdown_to_html_node(md_text).to_html())
+
+    def test_same_errors_as_tree(self):
+        for md_text in ["", "# ``", "this has an **unmatched delimiter"]:
+            with self.subTest(md_text=md_text):
+                with self.assertRaises(ValueError):
+                    markdown_to_html_node(md_text).to_html()
+                with self.assertRaises(ValueError):
+                    markdown_to_html(md_text)
+
+    def test_parse_budget(self):
+        md_text = "# Title\n\n" + "\n\n".join("paragraph" for _ in range(100))
+        with self.assertRaises(ParseBudgetExceeded):
+            markdown_to_html(md_text, budget=ParseBudget(max_steps=500))
+        with self.assertRaises(ParseBudgetExceeded):
+            markdown_to_html_node(md_text, budget=ParseBudget(max_steps=500))
+        self.assertEqual(markdown_to_html(md_text, budget=ParseBudget(max_steps=10000)), markdown_to_html(md_text))
+
+    def test_parse_budget_charged_within_a_block(self):
+        # a single block within the per block charge still runs out while its links are split
+        md_text = " ".join(f"[link {i}](/page/{i})" for i in range(1000))
+        with self.assertRaises(ParseBudgetExceeded):
+            markdown_to_html(md_text, budget=ParseBudget(max_steps=len(md_text) + 100))
+        with self.assertRaises(ParseBudgetExceeded):
+            markdown_to_html_node(md_text, budget=ParseBudget(max_steps=len(md_text) + 100))
@@ -0,0 +1,115 @@
+import unittest
+
+from htmlnode import TableOfContents
+from listing import ListingPage, PageRecord, external_sort, generate_listing_pages, paginate, paginated_listing, slugify, tag_slug
+
+
+def make_records(count:int) -> list[PageRecord]:
+    return [PageRecord(f"/blog/post-{i}", f"Post {i}", f"2024-01-{i % 28 + 1:02d}", ["even" if i % 2 == 0 else "odd"]) for i in range(count)]
+
+
+class TestPageRecord(unittest.TestCase):
+    def test_from_metadata(self):
+        record = PageRecord.from_metadata("/blog/tom", "Tom", {"date": "2024-02-10", "tags": ["a", "b"], "draft": False})
+        self.assertEqual(record, PageRecord("/blog/tom", "Tom", "2024-02-10", ["a", "b"]))
+
+    def test_from_metadata_single_tag_and_no_date(self):
+        record = PageRecord.from_metadata("/x", "X", {"tags": "solo"})
+        self.assertIsNone(record.date)
+        self.assertEqual(record.tags, ["solo"])
+
+    def test_from_metadata_scalar_tags(self):
+        self.assertEqual(PageRecord.from_metadata("/x", "X", {"tags": 2024}).tags, ["2024"])
+        self.assertEqual(PageRecord.from_metadata("/x", "X", {"tags": True}).tags, ["True"])
+
+    def test_undated_sorts_oldest(self):
+        self.assertLess(PageRecord("/a", "A").sort_key(), PageRecord("/b", "B", "2020-01-01").sort_key())
+
+
+class TestExternalSort(unittest.TestCase):
+    def test_in_memory_run(self):
+        self.assertEqual(list(external_sort([3, 1, 2], key=lambda x: x)), [1, 2, 3])
+
+    def test_spilled_runs_merge(self):
+        items = [(i * 7919) % 1000 for i in range(1000)]
+        result = list(external_sort(items, key=lambda x: x, run_size=64))
+        self.assertEqual(result, sorted(items))
+
+    def test_spilled_runs_reverse_with_records(self):
+        records = make_records(100)
+        result = list(external_sort(records, key=PageRecord.sort_key, reverse=True, run_size=7))
+        self.assertEqual(result, sorted(records, key=PageRecord.sort_key, reverse=True))
+
+    def test_empty(self):
+        self.assertEqual(list(external_sort([], key=lambda x: x)), [])
+
+
+class TestPaginate(unittest.TestCase):
+    def test_pages_and_next_flags(self):
+        self.assertEqual(list(paginate(range(5), 2)), [([0, 1], True), ([2, 3], True), ([4], False)])
+
+    def test_exact_multiple(self):
+        self.assertEqual(list(paginate(range(4), 2)), [([0, 1], True), ([2, 3], False)])
+
+    def test_empty(self):
+        self.assertEqual(list(paginate([], 2)), [])
+
+
+class TestSlugify(unittest.TestCase):
+    def test_slugify(self):
+        self.assertEqual(slugify("Lord of the Rings!"), "lord-of-the-rings")
+        self.assertEqual(slugify("  Elves_and--Men "), "elves-and-men")
+
+
+class TestListingPages(unittest.TestCase):
+    def test_paginated_listing_links(self):
+        pages = list(paginated_listing(make_records(5), "Blog posts", "/blog", per_page=2))
+        self.assertEqual([page.url for page in pages], ["/blog", "/blog/page/2", "/blog/page/3"])
+        self.assertEqual(pages[0].nav_links, [("Older posts >", "/blog/page/2")])
+        self.assertEqual(pages[2].nav_links, [("< Newer posts", "/blog/page/2")])
+        self.assertEqual(pages[1].title, "Blog posts (page 2)")
+        self.assertTrue(pages[1].to_html_node(TableOfContents()).to_html().startswith('<div><h1 id="blog-posts-page-2">Blog posts (page 2)</h1>'))
+
+    def test_archive_sorted_newest_first(self):
+        records = [
+            PageRecord("/blog/old", "Old", "2023-01-01"),
+            PageRecord("/blog/new", "New", "2024-05-01"),
+            PageRecord("/blog/mid", "Mid", "2023-06-01"),
+        ]
+        archive = next(generate_listing_pages(records))
+        self.assertEqual(archive.url, "/blog")
+        self.assertEqual(archive.links, [("New", "/blog/new", "2024-05-01"), ("Mid", "/blog/mid", "2023-06-01"), ("Old", "/blog/old", "2023-01-01")])
+
+    def test_tag_pages_with_spilled_sort(self):
+        pages = {page.url: page for page in generate_listing_pages(make_records(30), per_page=10, run_size=4)}
+        self.assertEqual(
+            sorted(pages),
+            ["/blog", "/blog/page/2", "/blog/page/3", "/tags", "/tags/even", "/tags/even/page/2", "/tags/odd", "/tags/odd/page/2"],
+        )
+        self.assertIn(("even", "/tags/even", "15"), pages["/tags"].links)
+        self.assertEqual(pages["/tags/odd"].title, "Posts tagged odd")
+
+    def test_titles_and_tags_are_not_markdown(self):
+        records = [PageRecord("/blog/a", "*Not* `code` [x] a_b", "2024-01-01", ["snake_case"])]
+        pages = {page.url: page for page in generate_listing_pages(records)}
+        toc = TableOfContents()
+        html = pages["/tags/snake-case"].to_html_node(toc).to_html()
+        self.assertEqual(html, '<div><h1 id="posts-tagged-snake-case">Posts tagged snake_case</h1><ul><li><a href="/blog/a">*Not* `code` [x] a_b</a> (2024-01-01)</li></ul></div>')
+        self.assertEqual(toc.entries, [(1, "posts-tagged-snake-case", "Posts tagged snake_case")])
+
+    def test_tag_without_slug(self):
+        urls = [page.url for page in generate_listing_pages([PageRecord("/blog/a", "A", tags=["!!!", "???"])])]
+        self.assertEqual(sorted(urls), sorted(["/blog", "/tags", f"/tags/{tag_slug('!!!')}", f"/tags/{tag_slug('???')}"]))
+        self.assertTrue(tag_slug("!!!").startswith("tag-"))
+        self.assertNotEqual(tag_slug("!!!"), tag_slug("???"))
+        self.assertEqual(tag_slug("Snake_Case"), "snake-case")
+
+    def test_listing_page_html(self):
+        page = ListingPage("/tags", "Tags & more", [("a", "/tags/a", "2"), ("b", "/tags/b", None)], [("< Newer posts", "/x"), ("Older posts >", "/y")])
+        self.assertEqual(page.to_html_node(TableOfContents()).to_html(),
+                         '<div><h1 id="tags-more">Tags &amp; more</h1><ul><li><a href="/tags/a">a</a> (2)</li><li><a href="/tags/b">b</a></li></ul>'
+                         '<p><a href="/x">&lt; Newer posts</a> | <a href="/y">Older posts &gt;</a></p></div>')
+
+    def test_no_tags_no_tag_index(self):
+        pages = list(generate_listing_pages([PageRecord("/blog/a", "A")]))
+        self.assertEqual([page.url for page in pages], ["/blog"])
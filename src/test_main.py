@@ -0,0 +1,61 @@
+import contextlib
+import io
+import os
+import subprocess
+import sys
+import unittest
+
+import build
+import htmlnode
+import main
+from test_build import SiteSourcesMixin
+
+
+class TestMain(SiteSourcesMixin, unittest.TestCase):
+    def setUp(self):
+        super().setUp()
+        limits = build.cache_limits()
+        self.addCleanup(build.set_cache_limits, *limits)
+
+    def build(self, config):
+        config_path = os.path.join(self.tmp_dir.name, "site.toml")
+        self.write(config_path, config)
+        with contextlib.redirect_stdout(io.StringIO()) as output:
+            main.main("build", config_path=config_path)
+        return output.getvalue()
+
+    def test_main_reads_config(self):
+        self.build('[dirs]\npublic = "out"\n\n[build]\nworkers = 1\n\n[cache]\ndir = "state"\nintern_entries = 0\n\n[stages]\nfeeds = false\n')
+        output_dir = os.path.join(self.tmp_dir.name, "out")
+        self.assertTrue(os.path.exists(os.path.join(output_dir, "blog", "a", "index.html")))
+        self.assertTrue(os.path.exists(os.path.join(output_dir, "tags", "x", "index.html")))
+        self.assertFalse(os.path.exists(os.path.join(output_dir, "atom.xml")))
+        self.assertTrue(os.path.exists(os.path.join(self.tmp_dir.name, "state", "manifest.json")))
+        self.assertIsNone(htmlnode.LEAF_NODES)
+
+    def test_invalid_config(self):
+        with self.assertRaises(SystemExit):
+            self.build('[build]\nworkers = "all"\n')
+        self.assertFalse(os.path.exists(self.dest_dir))
+
+
+class TestStartup(unittest.TestCase):
+    SLOW_MODULES = ["build", "htmlnode", "asyncio", "multiprocessing", "xml.sax", "tomllib"]
+
+    def run_python(self, *args):
+        return subprocess.run([sys.executable, *args], cwd=os.path.dirname(os.path.abspath(main.__file__)), capture_output=True, text=True, check=True)
+
+    def test_import_skips_build_modules(self):
+        # the build and the modules only some commands use are imported when first needed
+        result = self.run_python("-c", f"import sys, main; print(' '.join(name for name in {self.SLOW_MODULES!r} if name in sys.modules))")
+        self.assertEqual(result.stdout.strip(), "")
+
+    def test_help_skips_build_modules(self):
+        result = self.run_python("-X", "importtime", "main.py", "--help")
+        self.assertIn("usage:", result.stdout)
+        imported = {line.rsplit("|", 1)[1].strip() for line in result.stderr.splitlines() if line.startswith("import time:")}
+        self.assertEqual(imported & set(self.SLOW_MODULES), set())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,78 @@
+import hashlib
+import os
+import tempfile
+import unittest
+
+from manifest import TARGET_MANIFEST_NAME, ManifestDelta, copy_hashed, deploy, hash_file, hash_tree, read_manifest
+
+
+def sha256(text):
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+class TestManifestDelta(unittest.TestCase):
+    def test_between(self):
+        old = {"index.html": "1", "about.html": "2", "old.html": "3"}
+        new = {"index.html": "1", "about.html": "4", "new.html": "5"}
+        delta = ManifestDelta.between(old, new)
+        self.assertEqual(delta.to_dict(), {"added": {"new.html": "5"}, "modified": {"about.html": "4"}, "deleted": {"old.html": "3"}})
+        self.assertFalse(ManifestDelta.between(new, new))
+
+
+class TestDeploy(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.source_dir = os.path.join(self.tmp_dir.name, "public")
+        self.target_dir = os.path.join(self.tmp_dir.name, "target")
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def write(self, rel_path, text):
+        path = os.path.join(self.source_dir, *rel_path.split("/"))
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(text)
+
+    def test_hash_tree(self):
+        self.write("index.html", "home")
+        self.write("blog/a/index.html", "a")
+        self.assertEqual(hash_tree(self.source_dir), {"blog/a/index.html": sha256("a"), "index.html": sha256("home")})
+
+    def test_copy_hashed(self):
+        self.write("index.css", "body {}")
+        source_path = os.path.join(self.source_dir, "index.css")
+        os.chmod(source_path, 0o640)
+        target_path = os.path.join(self.tmp_dir.name, "copy.css")
+        self.assertEqual(copy_hashed(source_path, target_path), sha256("body {}"))
+        self.assertEqual(hash_file(target_path), sha256("body {}"))
+        self.assertEqual(os.stat(target_path).st_mode, os.stat(source_path).st_mode)
+
+    def test_mirrors_only_the_delta(self):
+        self.write("index.html", "home")
+        self.write("blog/a/index.html", "a")
+        self.write("blog/b/index.html", "b")
+        first = deploy(self.source_dir, hash_tree(self.source_dir), self.target_dir)
+        self.assertEqual(sorted(first.added), ["blog/a/index.html", "blog/b/index.html", "index.html"])
+
+        self.write("index.html", "new home")
+        os.remove(os.path.join(self.source_dir, "blog", "b", "index.html"))
+        os.rmdir(os.path.join(self.source_dir, "blog", "b"))
+        second = deploy(self.source_dir, hash_tree(self.source_dir), self.target_dir)
+        self.assertEqual(second.to_dict(), {"added": {}, "modified": {"index.html": sha256("new home")}, "deleted": {"blog/b/index.html": sha256("b")}})
+        self.assertEqual(hash_tree(self.target_dir), hash_tree(self.source_dir))
+        # emptied directories are pruned along with the deleted files
+        self.assertFalse(os.path.exists(os.path.join(self.target_dir, "blog", "b")))
+        self.assertEqual(read_manifest(os.path.join(self.target_dir, TARGET_MANIFEST_NAME)), hash_tree(self.source_dir))
+
+    def test_changed_source_is_not_deployed(self):
+        self.write("index.html", "home")
+        manifest = hash_tree(self.source_dir)
+        self.write("index.html", "edited after the build")
+        with self.assertRaises(ValueError):
+            deploy(self.source_dir, manifest, self.target_dir)
+        self.assertEqual(os.listdir(self.target_dir), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,3 +1,5 @@
+import pickle
+import time
 import unittest
 
 from parsing import *
@@ -209,6 +211,126 @@ class TestExtractMarkdownLinks(unittest.TestCase):
         self.assertEqual(extract_markdown_links(text), [])
 
 
+class TestFindBracketLinks(unittest.TestCase):
+    def test_nested_brackets_do_not_match(self):
+        self.assertEqual(extract_markdown_links("[a [b](c)"), [("[b](c)", "b", "c")])
+
+    def test_empty_text_or_url_do_not_match(self):
+        self.assertEqual(extract_markdown_links("[](x) [a]() [b](y)"), [("[b](y)", "b", "y")])
+
+    def test_parens_in_url_do_not_match(self):
+        self.assertEqual(extract_markdown_links("[a](b(c)) [d](e)"), [("[d](e)", "d", "e")])
+
+    def test_image_then_link(self):
+        text = "![img](i.png)[link](l)"
+        self.assertEqual(extract_markdown_images(text), [("![img](i.png)", "img", "i.png")])
+        self.assertEqual(extract_markdown_links(text), [("[link](l)", "link", "l")])
+
+    def test_adversarial_runs_are_fast(self):
+        for text in ["[" * 200000, "(" * 200000, "[](" * 100000, "[a](" * 100000, "![a" * 100000, "[a]" * 100000]:
+            start = time.perf_counter()
+            self.assertEqual(extract_markdown_links(text), [])
+            self.assertEqual(extract_markdown_images(text), [])
+            self.assertLess(time.perf_counter() - start, 2.0)
+
+    def test_many_links_split_quickly(self):
+        text = " ".join(f"[link {i}](/page/{i})" for i in range(8000))
+        start = time.perf_counter()
+        nodes = split_nodes_links([TextNode(text, TextType.TEXT)])
+        self.assertLess(time.perf_counter() - start, 2.0)
+        self.assertEqual(len(nodes), 15999)
+        self.assertEqual(nodes[-1], TextNode("link 7999", TextType.HYPERLINK, "/page/7999"))
+
+    def test_find_bracket_spans(self):
+        text = "see [a](b) and ![c](d)"
+        self.assertEqual(find_bracket_spans(text, images=False), [(4, 10, "a", "b")])
+        self.assertEqual(find_bracket_spans(text, images=True), [(15, 22, "c", "d")])
+
+
+class TestParseBudget(unittest.TestCase):
+    def test_within_budget(self):
+        budget = ParseBudget(max_steps=10)
+        budget.charge(10)
+        self.assertEqual(budget.steps, 10)
+
+    def test_steps_exceeded(self):
+        budget = ParseBudget(max_steps=10)
+        budget.charge(6)
+        with self.assertRaisesRegex(ParseBudgetExceeded, "11 steps, limit is 10"):
+            budget.charge(5)
+
+    def test_time_exceeded(self):
+        budget = ParseBudget(max_seconds=0)
+        time.sleep(0.001)
+        with self.assertRaisesRegex(ParseBudgetExceeded, "longer than 0s"):
+            budget.charge(1)
+
+    def test_is_a_value_error(self):
+        self.assertTrue(issubclass(ParseBudgetExceeded, ValueError))
+
+    def test_inline_splitters_charge(self):
+        text = "[a](b) plain ![c](d) **bold**"
+        budget = ParseBudget()
+        text_to_textnodes(text, budget)
+        self.assertGreaterEqual(budget.steps, len(text))
+        with self.assertRaises(ParseBudgetExceeded):
+            split_nodes_links([TextNode(text, TextType.TEXT)], ParseBudget(max_steps=5))
+
+
+class TestParseError(unittest.TestCase):
+    SOURCE = "---\ntitle: t\n---\n# Title\n\nSome **bold\n  and more text\n"
+
+    def test_unmatched_delimiter_records_fragment(self):
+        with self.assertRaises(ParseError) as raised:
+            split_nodes_delimiter([TextNode("a **b** and **c d", TextType.TEXT)], "**", TextType.BOLD)
+        self.assertEqual(raised.exception.fragment, "**c d")
+
+    def test_locate_inline_error(self):
+        error = ParseError("Found unmatched delimiter", block="Some **bold\n  and more text", fragment="**bold and more text", offset=26)
+        located = error.locate(self.SOURCE, "content/page.md")
+        self.assertEqual((located.path, located.line, located.column), ("content/page.md", 6, 6))
+        self.assertEqual(str(located), "content/page.md:6:6: Found unmatched delimiter")
+
+    def test_locate_from_body_start(self):
+        body_start = self.SOURCE.index("# Title")
+        located = ParseError("Invalid", block="# Title", offset=0).locate(self.SOURCE, "page.md", body_start)
+        self.assertEqual((located.line, located.column), (4, 1))
+
+    def test_locate_fragment_on_dedented_line(self):
+        source = "Intro\n\n  a\n  b **c\n"
+        block = markdown_to_blocks(source)[1]
+        located = ParseError("Unmatched", block=block, fragment="**c", offset=block.offset).locate(source, "page.md")
+        self.assertEqual((located.line, located.column), (4, 5))
+
+    def test_duplicated_block_text(self):
+        # the same text in an earlier code block must not take the error's position
+        source = "# T\n\n```\nsome **bold\n```\n\nsome **bold\n"
+        blocks = markdown_to_blocks(source)
+        self.assertEqual([block.offset for block in blocks], [0, 5, 26])
+        error = block_error(ParseError("Unmatched", fragment="**bold"), blocks[2])
+        self.assertEqual((error.locate(source, "page.md").line, error.locate(source, "page.md").column), (7, 6))
+
+    def test_without_offset(self):
+        located = ParseError("Invalid", block="not split from the source").locate(self.SOURCE, "page.md")
+        self.assertEqual(str(located), "page.md: Invalid")
+
+    def test_unlocated_message(self):
+        self.assertEqual(str(ParseError("Invalid", block="# Title")), "Invalid")
+        self.assertIsInstance(ParseError("Invalid"), ValueError)
+
+    def test_pickles_with_position(self):
+        error = pickle.loads(pickle.dumps(ParseError("Invalid", Block("block", 7), "frag", "page.md", 3, 4, 7)))
+        self.assertEqual((error.message, error.block, error.fragment, error.path, error.line, error.column, error.offset), ("Invalid", "block", "frag", "page.md", 3, 4, 7))
+        self.assertEqual(pickle.loads(pickle.dumps(Block("text", 3))).offset, 3)
+
+    def test_block_error(self):
+        inline = ParseError("Unmatched", fragment="**x")
+        self.assertIs(block_error(inline, Block("a **x", 12)), inline)
+        self.assertEqual((inline.block, inline.offset), ("a **x", 12))
+        wrapped = block_error(ValueError("Invalid heading block"), "####### x")
+        self.assertEqual((wrapped.message, wrapped.block, wrapped.offset), ("Invalid heading block", "####### x", None))
+
+
 class TestSplitReplaceStringsWithNodes(unittest.TestCase):
     def test_empty_splits_returns_original(self):
         nodes = [TextNode("some text", TextType.TEXT)]
@@ -672,6 +794,55 @@ class TestBlockSplitter(unittest.TestCase):
         )
 
 
+
+class TestBlockText(unittest.TestCase):
+    def test_removes_shared_indent(self):
+        self.assertEqual(markdown_to_blocks("Intro\n\n  - one\n    - nested\n  - two"), ["Intro", "- one\n  - nested\n- two"])
+
+    def test_keeps_relative_indent(self):
+        self.assertEqual(block_text("- one\n  - nested\n"), "- one\n  - nested")
+        self.assertEqual(block_text("\n  a\n b\n"), "a\nb")
+
+
+class TestIterBufferBlocks(unittest.TestCase):
+    TEXTS = [
+        "# Heading\n\nParagraph one\nstill one\n  \t\n- list\n  - nested",
+        "Here is a code block:  \t  ```This code block\n\nNew Block\nNew Line\n\nAnother block.```  \n\nEnd Text.",
+        "inline ```code``` stays\n\n\n\n```\nunclosed",
+        "a\n\u3000\nb",
+        "Intro\n\n  - one\n    - nested\n  - two\n\n\t1. tabbed",
+        "\n\n",
+        "",
+    ]
+
+    def test_matches_markdown_to_blocks(self):
+        for text in self.TEXTS:
+            self.assertEqual(list(iter_buffer_blocks(text.encode('utf-8'))), markdown_to_blocks(text), text)
+
+    def test_offsets(self):
+        for text in self.TEXTS + ["é  x\r\n\r\n ü **y\rz"]:
+            data = text.encode('utf-8')
+            translated = text.replace("\r\n", "\n").replace("\r", "\n")
+            blocks = markdown_to_blocks(translated)
+            self.assertEqual([buffer_text_offset(data, block.offset) for block in iter_buffer_blocks(data)], [block.offset for block in blocks], text)
+            for block in blocks:
+                self.assertEqual(translated[block.offset], block[0], text)
+
+    def test_translates_line_endings(self):
+        for text in self.TEXTS:
+            crlf = text.replace("\n", "\r\n").encode('utf-8')
+            self.assertEqual(list(iter_buffer_blocks(crlf)), markdown_to_blocks(text), text)
+        self.assertEqual(list(iter_buffer_blocks(b"a\rb\r\rc")), ["a\nb", "c"])
+
+    def test_start_offset(self):
+        self.assertEqual(list(iter_buffer_blocks(b"skip\n\nkeep me", start=6)), ["keep me"])
+
+    def test_is_lazy(self):
+        # the invalid utf-8 after the first block is never decoded
+        blocks = iter_buffer_blocks(b"first\n\n\xff\xfe")
+        self.assertEqual(next(blocks), "first")
+
+
 class TestBlockToBlockType(unittest.TestCase):
     def test_heading_block(self):
         self.assertEqual(block_to_block_type("# Heading"), BlockType.HEADING)
@@ -707,6 +878,19 @@ class TestBlockToBlockType(unittest.TestCase):
         self.assertEqual(block_to_block_type("321. item1\n   332. item2"), BlockType.ORDERED_LIST)
         self.assertNotEqual(block_to_block_type("1.itemA"), BlockType.ORDERED_LIST)
 
+    def test_table_block(self):
+        self.assertEqual(block_to_block_type("| a | b |\n| --- | --- |\n| 1 | 2 |"), BlockType.TABLE)
+        self.assertEqual(block_to_block_type("a | b\n:-|-:"), BlockType.TABLE)
+        self.assertEqual(block_to_block_type("a | b\nno delimiter row"), BlockType.PARAGRAPH)
+        self.assertEqual(block_to_block_type("no pipe\n---"), BlockType.PARAGRAPH)
+
+    def test_prose_with_pipe_before_dashes_is_not_a_table(self):
+        # the delimiter row must have as many cells as the header
+        self.assertEqual(block_to_block_type("Cats | dogs are both fine\n---"), BlockType.PARAGRAPH)
+        self.assertEqual(block_to_block_type("x | y\n-"), BlockType.PARAGRAPH)
+        self.assertEqual(block_to_block_type("| a | b |\n| --- |\n| 1 | 2 |"), BlockType.PARAGRAPH)
+        self.assertEqual(block_to_block_type("a \\| b | c\n--|--"), BlockType.TABLE)
+
     def test_paragraph_block(self):
         self.assertEqual(block_to_block_type("Just a paragraph."), BlockType.PARAGRAPH)
         self.assertEqual(block_to_block_type("1) not an ordered list"), BlockType.PARAGRAPH)
@@ -746,4 +930,117 @@ class TestExtractTitle(unittest.TestCase):
 
     def test_multiple_level_1_headings_only_first_used(self):
         text = "# First Title\n# Second Title\n# Third Title"
-        self.assertEqual(extract_title(text), "First Title")
\ No newline at end of file
+        self.assertEqual(extract_title(text), "First Title")
+
+    def test_ignores_headings_in_code_blocks(self):
+        text = "```\n# not a title\n```\n\n# Real Title"
+        self.assertEqual(extract_title(text), "Real Title")
+
+    def test_inline_code_fence_does_not_open_block(self):
+        text = "```inline code```\n# Real Title"
+        self.assertEqual(extract_title(text), "Real Title")
+
+    def test_only_heading_in_code_block_raises(self):
+        with self.assertRaises(ValueError):
+            extract_title("```\n# comment\n```")
+
+    def test_not_level_1(self):
+        with self.assertRaises(ValueError):
+            extract_title("#NoSpace\n## Level two")
+
+    def test_stops_at_first_heading(self):
+        consumed = []
+        def lines():
+            for line in ["intro", "# Title", "# Second"]:
+                consumed.append(line)
+                yield line
+        self.assertEqual(find_title_line(lines()), "Title")
+        self.assertEqual(consumed, ["intro", "# Title"])
+
+
+class TestParseListBlock(unittest.TestCase):
+    def test_flat_list(self):
+        list_block = parse_list_block("- a\n- b\n- c", ordered=False)
+        self.assertFalse(list_block.ordered)
+        self.assertEqual([item.text() for item in list_block.items], ["a", "b", "c"])
+
+    def test_continuation_lines(self):
+        list_block = parse_list_block("1. a\nmore a\n   and more\n2. b", ordered=True)
+        self.assertEqual([item.text() for item in list_block.items], ["a more a and more", "b"])
+
+    def test_other_marker_at_same_depth_continues_item(self):
+        list_block = parse_list_block("- a\n1. not an item", ordered=False)
+        self.assertEqual([item.text() for item in list_block.items], ["a 1. not an item"])
+
+    def test_nested_levels(self):
+        list_block = parse_list_block("- a\n  1. a1\n     - a1x\n  2. a2\n- b", ordered=False)
+        self.assertEqual([item.text() for item in list_block.items], ["a", "b"])
+        nested = list_block.items[0].sublists[0]
+        self.assertTrue(nested.ordered)
+        self.assertEqual([item.text() for item in nested.items], ["a1", "a2"])
+        self.assertEqual(nested.items[0].sublists[0].items[0].text(), "a1x")
+
+    def test_dedent_to_intermediate_depth_opens_new_sublist(self):
+        list_block = parse_list_block("- a\n    - deep\n  - mid", ordered=False)
+        self.assertEqual([[item.text() for item in sub.items] for sub in list_block.items[0].sublists], [["deep"], ["mid"]])
+
+    def test_tabs_count_as_indent(self):
+        list_block = parse_list_block("- a\n\t- b", ordered=False)
+        self.assertEqual(list_block.items[0].sublists[0].items[0].text(), "b")
+
+    def test_long_list_is_linear(self):
+        block = "\n".join(f"- item {i}" for i in range(20000))
+        list_block = parse_list_block(block, ordered=False)
+        self.assertEqual(len(list_block.items), 20000)
+
+
+class TestTableParsing(unittest.TestCase):
+    def test_split_table_row(self):
+        self.assertEqual(split_table_row("| a | **b** |"), ["a", "**b**"])
+        self.assertEqual(split_table_row("a | b"), ["a", "b"])
+        self.assertEqual(split_table_row("| a \\| pipe | |"), ["a | pipe", ""])
+
+    def test_alignments(self):
+        self.assertEqual(parse_table_alignments("| --- | :-- | :-: | --: |"), [None, "left", "center", "right"])
+
+    def test_split_table_block_pads_and_truncates(self):
+        header, alignments, rows = split_table_block("| a | b |\n| - | :-: |\n| 1 |\n| 1 | 2 | 3 |\n")
+        self.assertEqual(header, ["a", "b"])
+        self.assertEqual(alignments, [None, "center"])
+        self.assertEqual(list(rows), [["1", ""], ["1", "2"]])
+
+    def test_rows_are_lazy(self):
+        _, _, rows = split_table_block("| a |\n| - |\n| 1 |\n| 2 |")
+        self.assertEqual(next(rows), ["1"])
+        self.assertEqual(next(rows), ["2"])
+        with self.assertRaises(StopIteration):
+            next(rows)
+
+
+class TestIterLines(unittest.TestCase):
+    def test_matches_split(self):
+        for text in ["", "one", "one\ntwo", "one\n", "\n\n"]:
+            self.assertEqual(list(iter_lines(text)), text.split("\n"))
+
+
+class TestExtractTitleFromBlocks(unittest.TestCase):
+    def test_matches_extract_title(self):
+        texts = [
+            "# This is the Title\n\nSome other text.",
+            "Some intro text.\n\n# Actual Title\n\nMore content.",
+            "#   Title with Spaces   \n\nContent follows.",
+            "# \n\nNo title text.",
+            "```\n# not a title\n```\n\n# Real Title",
+            "paragraph line\n# Title inside a paragraph block",
+        ]
+        for text in texts:
+            with self.subTest(text=text):
+                self.assertEqual(extract_title_from_blocks(markdown_to_blocks(text)), extract_title(text))
+
+    def test_skips_code_blocks(self):
+        blocks = ["```\n# comment\n```", "## Sub", "# Title"]
+        self.assertEqual(extract_title_from_blocks(blocks), "Title")
+
+    def test_no_title_raises(self):
+        with self.assertRaises(ValueError):
+            extract_title_from_blocks(["## Subtitle Only", "No main title here."])
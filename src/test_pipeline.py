@@ -0,0 +1,86 @@
+import threading
+import time
+import unittest
+from concurrent.futures import ProcessPoolExecutor
+
+from pipeline import run_pipeline
+
+
+def square(item, loaded):
+    return loaded * loaded
+
+
+class TestRunPipeline(unittest.TestCase):
+    def test_results_in_item_order(self):
+        written = []
+
+        def read(item):
+            # later items finish reading first
+            time.sleep(0.001 * (10 - item))
+            return item
+
+        def write(item, rendered):
+            written.append(item)
+            return rendered + 1
+
+        self.assertEqual(run_pipeline(range(10), read, lambda item, loaded: loaded * 10, write, io_workers=4), [i * 10 + 1 for i in range(10)])
+        self.assertEqual(sorted(written), list(range(10)))
+
+    def test_no_items(self):
+        self.assertEqual(run_pipeline([], str, square, lambda item, rendered: rendered), [])
+
+    def test_loaded_items_are_bounded(self):
+        lock = threading.Lock()
+        in_flight = 0
+        peak = 0
+
+        def read(item):
+            nonlocal in_flight, peak
+            with lock:
+                in_flight += 1
+                peak = max(peak, in_flight)
+            return item
+
+        def render(item, loaded):
+            # a slow stage holds up the reads instead of letting them pile up
+            time.sleep(0.002)
+            return loaded
+
+        def write(item, rendered):
+            nonlocal in_flight
+            with lock:
+                in_flight -= 1
+
+        run_pipeline(range(100), read, render, write, io_workers=2, queue_size=3)
+        self.assertLessEqual(peak, 2 * 3 + 2 + 1)
+
+    def test_io_overlaps(self):
+        def read(item):
+            time.sleep(0.05)
+            return item
+
+        start = time.perf_counter()
+        run_pipeline(range(8), read, square, lambda item, rendered: rendered, io_workers=8)
+        self.assertLess(time.perf_counter() - start, 8 * 0.05)
+
+    def test_first_error_is_raised(self):
+        def render(item, loaded):
+            if item == 5:
+                raise ValueError("bad item")
+            return loaded
+
+        with self.assertRaisesRegex(ValueError, "bad item"):
+            run_pipeline(range(50), lambda item: item, render, lambda item, rendered: rendered, queue_size=2)
+
+    def test_process_pool(self):
+        with ProcessPoolExecutor(max_workers=2) as executor:
+            results = run_pipeline(range(20), lambda item: item, square, lambda item, rendered: rendered, executor, render_slots=4)
+        self.assertEqual(results, [i * i for i in range(20)])
+
+    def test_invalid_sizes(self):
+        with self.assertRaises(ValueError):
+            run_pipeline([1], str, square, print, queue_size=0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,69 @@
+import os
+import tempfile
+import unittest
+
+from listing import PageRecord
+from shards import ShardBuild, find_shard_builds, parse_shard, shard_directory, shard_of
+
+
+class TestParseShard(unittest.TestCase):
+    def test_valid(self):
+        self.assertEqual(parse_shard("1/1"), (1, 1))
+        self.assertEqual(parse_shard("3/4"), (3, 4))
+
+    def test_invalid(self):
+        for spec in ["0/4", "5/4", "4", "a/4", "-1/4", "1/0", "1/4/2", ""]:
+            with self.assertRaises(ValueError, msg=spec):
+                parse_shard(spec)
+
+
+class TestShardOf(unittest.TestCase):
+    def test_stable(self):
+        # fixed by the hash of the path, the same on every host and every run
+        self.assertEqual([shard_of(path, 4) for path in ["index.md", "blog/tom/index.md", "contact/index.md", "a.md"]], [4, 1, 2, 2])
+        self.assertEqual(shard_of(os.path.join("blog", "tom", "index.md"), 4), 1)
+
+    def test_spreads_pages(self):
+        counts = [0] * 4
+        for i in range(1000):
+            counts[shard_of(f"blog/post-{i}.md", 4) - 1] += 1
+        self.assertTrue(all(200 < count < 300 for count in counts), counts)
+
+    def test_single_shard(self):
+        self.assertEqual(shard_of("index.md", 1), 1)
+
+
+class TestShardBuild(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def save(self, index, count):
+        shard_dir = shard_directory(self.tmp_dir.name, index, count)
+        os.makedirs(shard_dir)
+        build = ShardBuild(index, count, ["a.md", "b.md"], [PageRecord("/a.html", "A", "2024-01-01", ["x"], "a.md")], {"a.html": "00"}, {"a.html": ["/src/a.md"]})
+        build.save(os.path.join(shard_dir, "shard.json"))
+        return build
+
+    def test_round_trip(self):
+        build = self.save(2, 3)
+        loaded = ShardBuild.load(os.path.join(shard_directory(self.tmp_dir.name, 2, 3), "shard.json"))
+        self.assertEqual(loaded.to_dict(), build.to_dict())
+        self.assertEqual(loaded.records, build.records)
+
+    def test_find_complete_set(self):
+        for index in range(1, 3):
+            self.save(index, 2)
+        builds = find_shard_builds(self.tmp_dir.name)
+        self.assertEqual([build.index for build, _ in builds], [1, 2])
+        self.assertEqual(builds[1][1], os.path.join(shard_directory(self.tmp_dir.name, 2, 2), "public"))
+
+    def test_find_without_shards(self):
+        with self.assertRaisesRegex(ValueError, "No shard builds"):
+            find_shard_builds(self.tmp_dir.name)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,76 @@
+import json
+import unittest
+
+from htmlnode import markdown_to_html, markdown_to_html_node
+from stats import ParseStats, SiteStats
+
+
+class TestParseStats(unittest.TestCase):
+    def test_counts_blocks_text_nodes_and_tree(self):
+        stats = ParseStats()
+        md = "# Title\n\nSome **bold** text\n\n- one\n  - _two_\n\n```\ncode\n```"
+        tree = markdown_to_html_node(md, stats=stats)
+        self.assertEqual(stats.blocks, {"heading": 1, "paragraph": 1, "unordered_list": 1, "codeblock": 1})
+        self.assertEqual(stats.text_nodes, {"text": 4, "bold": 1, "italic": 1})
+        # div > ul > li > ul > li > i is the deepest path
+        self.assertEqual(stats.max_depth, 6)
+        self.assertEqual(stats.html_nodes, 15)
+        self.assertEqual(tree.to_html(), markdown_to_html(md))
+
+    def test_shared_leaves_are_counted_once(self):
+        stats = ParseStats()
+        tree = markdown_to_html_node("[home](/) and [home](/)\n\n[home](/)", stats=stats)
+        links = [child for paragraph in tree.children for child in paragraph.children if child.tag == "a"]
+        self.assertEqual(len(links), 3)
+        self.assertEqual(len({id(link) for link in links}), 1)
+        # div, two p, the shared link and the " and " text
+        self.assertEqual(stats.html_nodes, 5)
+        self.assertEqual(stats.max_depth, 3)
+
+    def test_without_stats_nothing_is_counted(self):
+        self.assertEqual(markdown_to_html_node("# a").to_html(), '<div><h1 id="a">a</h1></div>')
+
+    def test_output_bytes_are_utf8(self):
+        stats = ParseStats()
+        stats.count_output("Éowyn")
+        self.assertEqual(stats.output_bytes, 6)
+
+    def test_merge(self):
+        first, second = ParseStats(), ParseStats()
+        markdown_to_html_node("# a\n\nb", stats=first)
+        markdown_to_html_node("- x\n  - y", stats=second)
+        first.merge(second)
+        self.assertEqual(first.blocks, {"heading": 1, "paragraph": 1, "unordered_list": 1})
+        self.assertEqual(first.text_nodes, {"text": 4})
+        self.assertEqual(first.max_depth, 6)
+
+
+class TestSiteStats(unittest.TestCase):
+    def setUp(self):
+        self.site_stats = SiteStats()
+        for url, md in [("/a", "# a"), ("/b", "b\n\nc")]:
+            page_stats = ParseStats()
+            page_stats.pages = 1
+            markdown_to_html_node(md, stats=page_stats)
+            self.site_stats.add_page(url, page_stats)
+
+    def test_to_json(self):
+        exported = json.loads(self.site_stats.to_json())
+        self.assertEqual(exported["total"]["pages"], 2)
+        self.assertEqual(exported["total"]["blocks"], {"heading": 1, "paragraph": 2})
+        self.assertEqual(exported["pages"]["/b"]["html_nodes"], 5)
+
+    def test_to_prometheus(self):
+        exported = self.site_stats.to_prometheus()
+        self.assertIn("# TYPE site_blocks_total counter\n", exported)
+        self.assertIn('site_blocks_total{type="paragraph"} 2\n', exported)
+        self.assertIn("site_pages_total 2\n", exported)
+        self.assertIn("site_tree_depth_max 3\n", exported)
+
+    def test_unknown_format(self):
+        with self.assertRaises(ValueError):
+            self.site_stats.export("xml")
+
+
+if __name__ == "__main__":
+    unittest.main()
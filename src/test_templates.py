@@ -0,0 +1,80 @@
+import os
+import tempfile
+import unittest
+
+from cache import FileHasher
+from templates import TemplateCache, compile_template
+
+
+class TestCompileTemplate(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def write(self, name, text, mtime_ns=None):
+        path = os.path.join(self.tmp_dir.name, *name.split("/"))
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(text)
+        if mtime_ns is not None:
+            os.utime(path, ns=(mtime_ns, mtime_ns))
+        return path
+
+    def render(self, name, variables):
+        return compile_template(os.path.join(self.tmp_dir.name, name)).render(variables)
+
+    def test_variables(self):
+        self.write("page.html", "<title>{{ Title }}</title>{{ tags }} {{ missing }} {{ Content }}")
+        self.assertEqual(
+            self.render("page.html", {"Title": "T", "tags": ["a", "b"], "Content": "{{ Title }}"}),
+            "<title>T</title>a, b {{ missing }} {{ Title }}",
+        )
+
+    def test_includes_resolve_relative_to_the_including_file(self):
+        self.write("partials/header.html", "<header>{{ Title }}{% include \"nav.html\" %}</header>")
+        self.write("partials/nav.html", "<nav/>")
+        self.write("page.html", "{% include \"partials/header.html\" %}{{ Content }}")
+        self.assertEqual(self.render("page.html", {"Title": "T", "Content": "C"}), "<header>T<nav/></header>C")
+
+    def test_layouts_and_blocks(self):
+        self.write("base.html", "<title>{% block title %}{{ Title }}{% endblock %}</title>{% block body %}<main>{% block content %}{% endblock %}</main>{% endblock %}")
+        self.write("post.html", "{% extends \"base.html\" %}ignored{% block content %}<article>{{ Content }}</article>{% endblock content %}")
+        self.write("layouts/wide.html", "{% extends \"../post.html\" %}{% block title %}Wide: {{ Title }}{% endblock %}{% block content %}{% include \"footer.html\" %}{% endblock %}")
+        self.write("layouts/footer.html", "<footer/>")
+        self.assertEqual(self.render("post.html", {"Title": "T", "Content": "C"}), "<title>T</title><main><article>C</article></main>")
+        self.assertEqual(self.render("layouts/wide.html", {"Title": "T"}), "<title>Wide: T</title><main><footer/></main>")
+
+    def test_files_lists_every_template_used(self):
+        self.write("base.html", "{% include \"nav.html\" %}{% block content %}{% endblock %}")
+        self.write("nav.html", "<nav/>")
+        path = self.write("post.html", "{% extends \"base.html\" %}{% block content %}{{ Content }}{% endblock %}")
+        self.assertEqual(sorted(compile_template(path).files), sorted(os.path.join(self.tmp_dir.name, name) for name in ["base.html", "nav.html", "post.html"]))
+
+    def test_errors(self):
+        self.write("cycle.html", "{% include \"cycle.html\" %}")
+        self.write("unclosed.html", "{% block content %}")
+        self.write("unknown.html", "{% for x %}")
+        self.write("stray.html", "{% endblock %}")
+        self.write("missing.html", "{% extends \"nowhere.html\" %}")
+        for name in ["cycle.html", "unclosed.html", "unknown.html", "stray.html", "missing.html"]:
+            with self.assertRaises(ValueError, msg=name):
+                self.render(name, {})
+
+    def test_cache_recompiles_when_a_partial_changes(self):
+        self.write("nav.html", "<nav>one</nav>", mtime_ns=1_000_000_000)
+        path = self.write("page.html", "{% include \"nav.html\" %}")
+        cache = TemplateCache(FileHasher())
+        first = cache.get(path)
+        self.assertIs(cache.get(path), first)
+        self.assertEqual((cache.compiles, cache.hits), (1, 1))
+        self.write("nav.html", "<nav>two</nav>", mtime_ns=2_000_000_000)
+        second = cache.get(path)
+        self.assertEqual(second.render({}), "<nav>two</nav>")
+        self.assertNotEqual(second.digest, first.digest)
+        self.assertEqual(cache.compiles, 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -2,7 +2,14 @@
 set -euo pipefail
 
 if command -v uv >/dev/null 2>&1; then
-	uv run --python 3.11 -- python -m unittest discover -s src
+	PYTHON=(uv run --python 3.11 -- python)
 else
-	python3 -m unittest discover -s src
-fi
\ No newline at end of file
+	PYTHON=(python3)
+fi
+JOBS="${JOBS:-$(getconf _NPROCESSORS_ONLN 2>/dev/null || echo 2)}"
+
+cd "$(dirname "$0")/src"
+# each test module runs in its own process, JOBS at a time; xargs fails if any module fails
+ls test_*.py | sed 's/\.py$//' | xargs -P "$JOBS" -I{} "${PYTHON[@]}" -m unittest {}
+# property based fuzzing of the parser, sharded over the same number of processes
+"${PYTHON[@]}" fuzz.py --iterations "${FUZZ_ITERATIONS:-2000}" --shards "$JOBS"